@@ -0,0 +1,196 @@
+##########################################
+# File: archive.py                       #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Archive of many saved meets in one file
+# Each meet is a separately compressed pickle (see `pickle_`), so any one
+# can be loaded without reading the others, followed by a JSON index of the
+# members and a footer of the index offset and size:
+#   MAGIC | member | member | ... | index | offset, size (<u8) | MAGIC
+# Adding to an archive appends the new members and then a new index and
+# footer, so the archive is readable (without them) until it is closed, and
+# replaced members and old indices are left unreferenced
+
+# Imports
+from collections import namedtuple
+import json
+import os
+import struct
+
+import pickle_
+
+# all
+__all__ = [
+    'Archive',
+    'Member'
+]
+
+# Constants
+MAGIC = 'PLARCH01'
+FOOTER = struct.Struct('<QQ')
+FOOTER_SIZE = FOOTER.size + len(MAGIC)
+
+# Member
+Member = namedtuple('Member', 'name offset size compression')
+
+# Archive
+class Archive(object):
+    def __init__(self, path, mode='r', compression='gzip'):
+        # `mode` is 'r' (read), 'w' (new archive) or 'a' (add to an
+        # archive, created if required)
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError, 'mode "%s" not in [r, w, a]' % mode
+
+        self.path = path
+        self.mode = mode
+        self.compression = compression
+
+        # Members in the order added, and by name
+        self.members = []
+        self.by_name = {}
+
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            self.file = open(path, 'w+b')
+            self.file.write(MAGIC)
+            self.end = len(MAGIC)
+        else:
+            self.file = open(path, 'rb' if mode == 'r' else 'r+b')
+            self.read_index()
+
+        self.changed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def names(self):
+        return [m.name for m in self.members]
+
+    def read_index(self):
+        self.file.seek(0)
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError, '"%s" is not an archive' % self.path
+
+        self.file.seek(-FOOTER_SIZE, 2)
+        footer = self.file.read(FOOTER_SIZE)
+        if footer[FOOTER.size:] != MAGIC:
+            raise ValueError, '"%s" has no index' % self.path
+
+        offset, size = FOOTER.unpack(footer[:FOOTER.size])
+
+        self.file.seek(offset)
+        for entry in json.loads(self.file.read(size).decode('utf-8')):
+            self.add_member(Member(*entry))
+
+        # New members are appended
+        self.file.seek(0, 2)
+        self.end = self.file.tell()
+
+    def add_member(self, member):
+        if member.name in self.by_name:
+            self.members.remove(self.by_name[member.name])
+
+        self.members.append(member)
+        self.by_name[member.name] = member
+
+    # Reading
+    def load(self, name):
+        member = self.by_name[name]
+
+        self.file.seek(member.offset)
+        return pickle_.load(self.file, member.size)
+
+    def extract(self, name, path):
+        # Save the member `name` to `path` (compressed by its extension)
+        pickle_.dump(path, self.load(name))
+
+    # Writing
+    def add(self, name, obj):
+        # Add (or replace) `obj` as `name`
+        if self.mode == 'r':
+            raise ValueError, 'archive opened read only'
+
+        self.file.seek(self.end)
+        pickle_.dump(self.file, obj, self.compression)
+
+        offset, self.end = self.end, self.file.tell()
+        self.add_member(Member(name, offset, self.end - offset,
+                               self.compression))
+
+        self.changed = True
+
+    def add_file(self, path, name=None):
+        # Add the meet saved at `path` (as its file name by default)
+        if name is None:
+            name = os.path.basename(path)
+
+        self.add(name, pickle_.load(path))
+
+    def write_index(self):
+        index = json.dumps([list(m) for m in self.members]).encode('utf-8')
+
+        self.file.seek(self.end)
+        self.file.write(index)
+        self.file.write(FOOTER.pack(self.end, len(index)))
+        self.file.write(MAGIC)
+        self.file.truncate()
+
+    def close(self):
+        if self.mode == 'w' or self.changed:
+            self.write_index()
+
+        self.file.close()
+
+# main
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Archive of saved meets')
+    subparsers = parser.add_subparsers(dest='command')
+
+    pack = subparsers.add_parser('pack', help='add meets to an archive')
+    pack.add_argument('archive')
+    pack.add_argument('meets', nargs='+')
+    pack.add_argument('--compression', default='gzip',
+        choices=sorted(pickle_.EXTENSIONS.values()))
+
+    list_ = subparsers.add_parser('list', help='list the meets')
+    list_.add_argument('archive')
+
+    extract = subparsers.add_parser('extract', help='save a meet')
+    extract.add_argument('archive')
+    extract.add_argument('name')
+    extract.add_argument('path', nargs='?', default=None)
+
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        with Archive(args.archive, 'a', args.compression) as archive:
+            for path in args.meets:
+                archive.add_file(path)
+
+    elif args.command == 'list':
+        with Archive(args.archive) as archive:
+            for member in archive.members:
+                print '%-40s %12d %s' % (member.name, member.size,
+                    member.compression)
+
+    else:
+        with Archive(args.archive) as archive:
+            archive.extract(args.name,
+                args.name if args.path is None else args.path)
+
+if __name__ == '__main__':
+    main()
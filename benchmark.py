@@ -0,0 +1,166 @@
+##########################################
+# File: benchmark.py                     #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Small benchmark suite for the lifter model
+#
+# `bench_team_scoring` compares the vectorised team scoring against the
+# original per-lifter loop. Only a cache hit (no lifter changed since the
+# last call) is orders of magnitude faster. After any change the columns
+# are rebuilt and the speedup is about 7x, most of it spent in
+# `LifterCollection.columns`.
+
+# Imports
+import sys
+import timeit
+import numpy as np
+
+from lifter import Lifter, LifterCollection
+
+# Constants
+REPEAT = 3
+NUMBER = 100000
+
+# time_per_call
+def time_per_call(f, number=NUMBER, repeat=REPEAT):
+    return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+# lifter_size
+def lifter_size(lifter):
+    # Size of the instance and the objects it owns (shared strings and
+    # numbers are ignored)
+    size = sys.getsizeof(lifter)
+    size += sys.getsizeof(lifter.lifts)
+    size += sys.getsizeof(lifter.lift_record)
+    size += sys.getsizeof(lifter.times)
+
+    for attr in ['__dict__', 'extras']:
+        try:
+            size += sys.getsizeof(object.__getattribute__(lifter, attr))
+        except AttributeError:
+            pass
+
+    return size
+
+# make_lifter
+def make_lifter(i=0):
+    lifter = Lifter('Lifter%d' % i, Lifter.GENDERS[i % 2],
+        55. + (i % 60), 10, team='Team%d' % (i % 20), flight=i % 4)
+
+    for lift in Lifter.LIFTS:
+        lifter.enter_lift(lift, 0, 100.)
+        lifter.validate_lift(lift, 0, True)
+
+    return lifter
+
+# make_collection
+def make_collection(n, top=3):
+    collection = LifterCollection(top=top)
+    for i in xrange(n):
+        collection.add(make_lifter(i))
+
+    return collection
+
+# reference_overall_info
+def reference_overall_info(collection):
+    # Original loop over lifters sorted by points, kept for comparison
+    lifters = collection.sorted_by('REV_points', 'weight')
+
+    ret = {}
+    for lifter in lifters:
+        try:
+            l = ret[lifter.team]
+        except KeyError:
+            l = [0., []]
+            ret[lifter.team] = l
+
+        if len(l[1]) >= collection.top:
+            continue
+
+        l[0] += lifter.points
+        l[1].append(lifter)
+
+    return ret
+
+# Benchmarks
+
+# bench_lifter
+def bench_lifter():
+    lifter = make_lifter()
+
+    results = [
+        ('lifter_size [bytes]', lifter_size(lifter)),
+        ('squat_0 [ns]', 1e9 * time_per_call(lambda: lifter.squat_0)),
+        ('get_lift [ns]',
+            1e9 * time_per_call(lambda: lifter.get_lift('bench', 2))),
+        ('best_lift [ns]',
+            1e9 * time_per_call(lambda: lifter.best_lift('deadlift'))),
+        ('total [ns]', 1e9 * time_per_call(lambda: lifter.total)),
+    ]
+
+    return results
+
+# bench_team_scoring
+def bench_team_scoring(n=3000):
+    collection = make_collection(n, top=6)
+
+    # Check the vectorised scoring against the reference
+    reference = reference_overall_info(collection)
+    ret = collection.overall_info()[2]
+    assert sorted(reference) == sorted(ret)
+    for team, info in ret.iteritems():
+        assert info[0] == reference[team][0]
+
+    def columns():
+        # Force the columns to be rebuilt
+        collection.generation += 1
+        collection.columns()
+
+    def team_scores():
+        # Force the columns to be rebuilt (so includes `columns`)
+        collection.generation += 1
+        collection.team_scores()
+
+    reference = 1e3 * time_per_call(lambda: reference_overall_info(collection),
+                                    number=1)
+    rebuilt = 1e3 * time_per_call(team_scores, number=10)
+    cached = 1e3 * time_per_call(collection.team_scores, number=10)
+
+    rebuilt_speedup = reference / rebuilt
+    results = [
+        ('reference_overall_info [ms]', reference),
+        ('columns (rebuilt) [ms]', 1e3 * time_per_call(columns, number=10)),
+        ('team_scores (rebuilt) [ms]', rebuilt),
+        ('team_scores (cached) [ms]', cached),
+        ('speedup (rebuilt) [x]', rebuilt_speedup),
+        ('speedup (cached) [x]', reference / max(cached, 1e-6)),
+        'Only a cache hit is orders of magnitude faster: after any change '
+        'the\n    columns are rebuilt and team_scores is %.0fx faster than '
+        'the reference' % rebuilt_speedup,
+    ]
+
+    return results
+
+# BENCHMARKS
+BENCHMARKS = [
+    bench_lifter,
+    bench_team_scoring,
+]
+
+# main
+def main():
+    for bench in BENCHMARKS:
+        print bench.__name__
+        for result in bench():
+            # Results are (name, value) pairs or notes
+            if isinstance(result, str):
+                print '    %s' % result
+            else:
+                print '    %-30s %12.1f' % result
+
+if __name__ == '__main__':
+    main()
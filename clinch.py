@@ -0,0 +1,120 @@
+##########################################
+# File: clinch.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Lowest and highest team totals still reachable from the remaining attempts,
+# and the teams which have clinched or are mathematically eliminated
+
+# Imports
+from collections import namedtuple
+import numpy as np
+
+import wilks
+from lifter import Lifter, best_lifts
+
+# all
+__all__ = [
+    'Standings',
+    'MAX_JUMP',
+    'reachable_totals',
+    'standings'
+]
+
+# Largest increase of an attempt over the previous attempt of the lift
+# (fraction), rounded up to INCREMENT (kg)
+MAX_JUMP = 0.15
+INCREMENT = 2.5
+
+# Standings
+# `low` and `high` are the lowest and highest reachable total of each team
+# scoring group present (labelled by `teams`)
+Standings = namedtuple('Standings', 'teams low high clinched eliminated')
+
+# reachable_totals
+def reachable_totals(c, max_jump=MAX_JUMP, increment=INCREMENT):
+    # Lowest and highest total of each lifter of columns `c`
+    # Set attempts are taken at their weight, and blank attempts at most
+    # `max_jump` over the previous attempt (unbounded for a blank first
+    # attempt)
+    N = len(c.lifters)
+    shape = (N, len(Lifter.LIFTS), 3)
+    lifts = c.lifts.reshape(shape)
+    records = c.records.reshape(shape)
+
+    best = best_lifts(c.lifts, c.records)
+
+    pending = (records == Lifter.BLANK_CODE) | (records == Lifter.SET_CODE)
+    is_blank = records == Lifter.BLANK_CODE
+
+    # Highest weight of each remaining attempt in turn
+    high = best.copy()
+    previous = np.zeros(shape[:2], dtype=float)
+    for attempt in [0,1,2]:
+        weight = lifts[..., attempt]
+
+        jumped = np.ceil(previous * (1. + max_jump) / increment) * increment
+        if attempt == 0:
+            jumped = np.inf
+        weight = np.where(is_blank[..., attempt], jumped, weight)
+
+        high = np.where(pending[..., attempt], np.maximum(high, weight), high)
+        previous = weight
+
+    # A lift without a good attempt so far may still bomb out
+    low_total = np.where(np.all(best > 0, axis=1), np.sum(best, axis=1), 0.)
+    high_total = np.where(np.all(high > 0, axis=1), np.sum(high, axis=1), 0.)
+
+    out = (c.status == Lifter.BOMBED_OUT) | (c.status == Lifter.WITHDRAWN)
+    low_total[out] = 0.
+    high_total[out] = 0.
+
+    return low_total, high_total
+
+# standings
+def standings(collection, max_jump=MAX_JUMP, increment=INCREMENT):
+    # Reachable totals of each team scoring group, which have clinched (their
+    # lowest is above the highest of every other) and which are eliminated
+    # (their highest is below the lowest of another)
+    c = collection.columns()
+
+    low_total, high_total = reachable_totals(c, max_jump, increment)
+
+    coefficients = wilks.coefficients(c.gender, c.weight)
+    low = c._replace(total=low_total, points=low_total * coefficients)
+    high = c._replace(total=high_total, points=high_total * coefficients)
+
+    team_scoring = collection.team_scoring
+    n_teams = len(collection.team_names)
+    low_totals, high_totals = team_scoring.bounds(low, high, collection.top,
+        n_teams)
+
+    # Only groups with lifters
+    group, n_groups = team_scoring.groups(c, n_teams)
+    present = np.flatnonzero(np.bincount(group, minlength=n_groups) > 0)
+    labels = team_scoring.group_labels(collection.team_names)
+
+    teams = [labels[i] for i in present]
+    low_totals = low_totals[present]
+    high_totals = high_totals[present]
+
+    # Best of the other groups from the first and second highest
+    def best_of_others(values):
+        others = np.empty(len(values), dtype=float)
+        if len(values) < 2:
+            others.fill(-np.inf)
+            return others
+
+        order = np.argsort(values)
+        others.fill(values[order[-1]])
+        others[order[-1]] = values[order[-2]]
+
+        return others
+
+    clinched = low_totals > best_of_others(high_totals)
+    eliminated = high_totals < best_of_others(low_totals)
+
+    return Standings(teams, low_totals, high_totals, clinched, eliminated)
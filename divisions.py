@@ -0,0 +1,93 @@
+##########################################
+# File: divisions.py                     #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Places of every lifter within their division (every combination of the
+# values of `lifter.DIVISIONS`) and weight class, in one group-by over the
+# columns of the collection, and the awards of each
+
+# Imports
+from collections import namedtuple
+import numpy as np
+
+from lifter import Lifter, DIVISIONS, CLASS_STRIDE, weight_class_label
+from scoring import group_order
+
+# all
+__all__ = [
+    'Standings',
+    'standings',
+    'awards',
+    'group_label'
+]
+
+# Standings
+# `keys` are the division codes and weight class code of each group (in
+# order), `group` and `place` are the group and place (from 1, 0 if not
+# placed) of each row of the columns, and `order` is the rows by group and
+# place, with the rows of group i in order[starts[i]:starts[i + 1]]
+Standings = namedtuple('Standings', 'keys group place order starts')
+
+# standings
+def standings(collection):
+    c = collection.columns()
+    n = len(c.lifters)
+
+    # Group by the division codes (from -1) and weight class as one code
+    dims = [len(d.values) + 1 for d in DIVISIONS] + \
+        [len(Lifter.GENDERS) * CLASS_STRIDE]
+    combined = np.ravel_multi_index(
+        [c.divisions[:, j] + 1 for j in xrange(len(DIVISIONS))] +
+        [c.weight_class], dims)
+    combined, group = np.unique(combined, return_inverse=True)
+
+    keys = np.column_stack(np.unravel_index(combined, dims))
+    keys[:, :-1] -= 1
+
+    # Placed (by total, then the lighter lifter, then lifter_id) if they
+    # have a total and a value of every division
+    order, rank = group_order(group, -c.total, c.weight, c.lifter_id)
+
+    placed = (c.total > 0.) & np.all(c.divisions >= 0, axis=1)
+
+    place = np.zeros(n, dtype=int)
+    place[order] = rank + 1
+    place[~placed] = 0
+
+    starts = np.r_[0, np.cumsum(np.bincount(group, minlength=len(keys)))]
+
+    return Standings(keys, group, place, order, starts)
+
+# group_label
+def group_label(key):
+    # Label of a group from its division codes and weight class code
+    values = [division.values[code] if code >= 0 else '?'
+              for division, code in zip(DIVISIONS, key[:-1])]
+    gender = Lifter.GENDERS[key[-1] // CLASS_STRIDE]
+
+    return '%s %s %s' % (' '.join(values), gender,
+        weight_class_label(key[-1]))
+
+# awards
+def awards(collection, places=3):
+    # (label, [(place, lifter, total, points)]) of every group with a placed
+    # lifter, for places up to `places`
+    s = collection.division_standings()
+    c = collection.columns()
+
+    result = []
+    for i, key in enumerate(s.keys):
+        rows = s.order[s.starts[i]:s.starts[i + 1]][:places]
+        rows = rows[s.place[rows] > 0]
+        if len(rows) == 0:
+            continue
+
+        result.append((group_label(key),
+            [(s.place[r], c.lifters[r], c.total[r], c.points[r])
+             for r in rows]))
+
+    return result
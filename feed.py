@@ -0,0 +1,148 @@
+##########################################
+# File: feed.py                          #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Change feed of a `LifterCollection` (independent of Qt)
+# Subscribers receive lists of events, either synchronously (as each change
+# is made, or at the end of a batch) or queued to be taken later (e.g. from
+# another thread)
+
+# Imports
+from collections import namedtuple
+from contextlib import contextmanager
+import Queue
+import threading
+
+# Setup logger
+from log import getLogger
+logger = getLogger('basic')
+
+# all
+__all__ = [
+    'LifterAdded',
+    'LifterRemoved',
+    'AttributeChanged',
+    'AttemptEntered',
+    'AttemptValidated',
+    'ChangeFeed',
+    'Subscription'
+]
+
+# Events
+# `generation` is the collection generation after the change
+LifterAdded = namedtuple('LifterAdded', 'generation lifter')
+LifterRemoved = namedtuple('LifterRemoved', 'generation lifter')
+AttributeChanged = namedtuple('AttributeChanged',
+    'generation lifter attribute old new')
+
+# `old` and `new` are (weight, record) for an entered attempt and the record
+# for a validated attempt
+AttemptEntered = namedtuple('AttemptEntered',
+    'generation lifter index old new')
+AttemptValidated = namedtuple('AttemptValidated',
+    'generation lifter index old new')
+
+# Subscription
+class Subscription(object):
+    def __init__(self, feed, callback=None, queued=False):
+        self.feed = feed
+        self.callback = callback
+        self.queued = queued
+
+        # Batches of events waiting to be taken (if queued)
+        self.queue = Queue.Queue() if queued else None
+
+    def deliver(self, events):
+        if self.queued:
+            self.queue.put(events)
+        else:
+            self.callback(events)
+
+    def get(self, block=True, timeout=None):
+        # Take the next batch of events (raises `Queue.Empty`)
+        return self.queue.get(block, timeout)
+
+    def drain(self):
+        # Take all waiting events (as a single list), passing each batch to
+        # the callback if there is one
+        events = []
+        while True:
+            try:
+                batch = self.queue.get_nowait()
+            except Queue.Empty:
+                break
+
+            if self.callback is not None:
+                self.callback(batch)
+            events.extend(batch)
+
+        return events
+
+    def close(self):
+        self.feed.unsubscribe(self)
+
+# ChangeFeed
+class ChangeFeed(object):
+    def __init__(self):
+        self.subscriptions = []
+
+        # Depth of nested batches and the events held until the outermost
+        # batch ends, per thread (so writers on other threads neither join
+        # nor deliver each other's batches)
+        self.local = threading.local()
+
+    def __len__(self):
+        return len(self.subscriptions)
+
+    def subscribe(self, callback=None, queued=False):
+        # Synchronous subscriptions need a callback
+        if not queued and callback is None:
+            raise ValueError, 'callback required if not queued'
+
+        subscription = Subscription(self, callback, queued)
+        self.subscriptions.append(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        try:
+            self.subscriptions.remove(subscription)
+        except ValueError:
+            pass
+
+    def publish(self, event):
+        if getattr(self.local, 'depth', 0) > 0:
+            self.local.pending.append(event)
+        else:
+            self.deliver([event])
+
+    def deliver(self, events):
+        # A failing subscriber must not stop the others (or the change)
+        for subscription in self.subscriptions[:]:
+            try:
+                subscription.deliver(events)
+            except Exception:
+                logger.exception('Subscriber %r failed',
+                    subscription.callback)
+
+    @contextmanager
+    def batch(self):
+        # Deliver the events of the block (on this thread) together at its
+        # end
+        local = self.local
+        if getattr(local, 'depth', 0) == 0:
+            local.depth = 0
+            local.pending = []
+
+        local.depth += 1
+        try:
+            yield self
+        finally:
+            local.depth -= 1
+            if local.depth == 0 and local.pending:
+                events, local.pending = local.pending, []
+                self.deliver(events)
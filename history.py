@@ -0,0 +1,369 @@
+##########################################
+# File: history.py                       #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Streaming scorer for large historical result datasets (CSV with a header
+# line), e.g. open data exports with millions of rows
+# Rows are read in chunks and scored with vectorised formulas, and only a
+# bounded summary is kept: the best `top` of each weight class and a
+# histogram of points for percentiles
+
+# Imports
+import csv
+import os
+import multiprocessing
+import numpy as np
+
+import wilks
+from lifter import Lifter, weight_class_codes, weight_class_label
+from scoring import group_order
+
+# Setup logger
+from log import getLogger
+logger = getLogger('basic')
+
+# all
+__all__ = [
+    'COLUMNS',
+    'FORMULAS',
+    'Summary',
+    'read_chunks',
+    'score_chunk',
+    'score_file'
+]
+
+# Dataset columns used (mapped to the header names of the dataset)
+COLUMNS = {
+    'name' : 'Name',
+    'sex' : 'Sex',
+    'weight' : 'BodyweightKg',
+    'squat' : 'Best3SquatKg',
+    'bench' : 'Best3BenchKg',
+    'deadlift' : 'Best3DeadliftKg',
+    'total' : 'TotalKg',
+}
+
+# Scoring formulas of (genders, weights, totals)
+FORMULAS = {
+    'wilks' : wilks.points_array,
+}
+
+# Defaults
+CHUNK_SIZE = 100000
+TOP = 100
+BIN_WIDTH = 1.
+MAX_POINTS = 1000.
+
+# Summary row
+SUMMARY_DTYPE = [
+    ('name', object),
+    ('sex', 'S1'),
+    ('weight', float),
+    ('total', float),
+    ('points', float),
+]
+
+# Summary
+class Summary(object):
+    def __init__(self, top=TOP, bin_width=BIN_WIDTH, max_points=MAX_POINTS):
+        self.top = top
+        self.bin_width = bin_width
+        self.n_bins = int(np.ceil(max_points / bin_width)) + 1
+
+        # Best `top` rows of each weight class code (sorted by points)
+        self.best = {}
+
+        # Histogram of points for each weight class code
+        self.counts = {}
+
+        self.rows = 0
+
+        # Rows skipped as too short
+        self.skipped = 0
+
+    def add(self, chunk, skipped=0):
+        # Add a scored chunk (see `score_chunk`)
+        self.rows += len(chunk)
+        self.skipped += skipped
+
+        if len(chunk) == 0:
+            return
+
+        classes = chunk['weight_class']
+
+        # Histograms
+        bins = np.minimum((chunk['points'] / self.bin_width).astype(int),
+            self.n_bins - 1)
+        for code in np.unique(classes):
+            counts = np.bincount(bins[classes == code],
+                minlength=self.n_bins)
+            try:
+                self.counts[code] += counts
+            except KeyError:
+                self.counts[code] = counts
+
+        # Best of each class in the chunk, merged with the current best
+        order, rank = group_order(classes, -chunk['points'])
+        rows = order[rank < self.top]
+        for code in np.unique(classes[rows]):
+            best = chunk[rows[classes[rows] == code]]
+            self.merge_best(code, best)
+
+    def merge_best(self, code, best):
+        try:
+            best = np.concatenate((self.best[code], best))
+        except KeyError:
+            pass
+
+        # Stable so earlier rows win ties
+        order = np.argsort(-best['points'], kind='mergesort')
+        self.best[code] = best[order[:self.top]]
+
+    def merge(self, other):
+        # Merge a summary (e.g. from another process)
+        self.rows += other.rows
+        self.skipped += other.skipped
+
+        for code, counts in other.counts.iteritems():
+            try:
+                self.counts[code] += counts
+            except KeyError:
+                self.counts[code] = counts.copy()
+
+        for code, best in other.best.iteritems():
+            self.merge_best(code, best)
+
+    def percentile(self, weight_class, points):
+        # Percentage of the weight class with fewer points than `points`
+        try:
+            counts = self.counts[weight_class]
+        except KeyError:
+            return None
+
+        bin_ = min(int(points / self.bin_width), self.n_bins - 1)
+        return 100. * np.sum(counts[:bin_]) / np.sum(counts)
+
+    def rank_lifter(self, lifter):
+        # Percentile of a `Lifter` against its weight class
+        code = weight_class_codes(np.array([lifter.gender]),
+            np.array([lifter.weight]))[0]
+        return self.percentile(code, lifter.points)
+
+    def write(self, file_):
+        # Write the rankings atomically (so that a partial run can be read
+        # while the rest of the file is processed)
+        tmp_file = file_ + '.tmp'
+        with open(tmp_file, 'w') as fp:
+            fp.write('Weight class\tRank\tName\tSex\tBodyweight\tTotal\t'
+                     'Points\tLifters\n')
+
+            for code in sorted(self.best):
+                n = np.sum(self.counts[code])
+                label = weight_class_label(code)
+                for rank, row in enumerate(self.best[code]):
+                    fp.write('%s\t%d\t%s\t%s\t%.1f\t%.1f\t%.2f\t%d\n' % \
+                        (label, rank + 1, row['name'], row['sex'],
+                         row['weight'], row['total'], row['points'], n))
+
+        if os.path.exists(file_):
+            os.remove(file_)
+        os.rename(tmp_file, file_)
+
+# Reading
+
+# read_header
+def read_header(file_, columns=COLUMNS):
+    # Return the index of each of `columns` in the header of `file_`
+    with open(file_, 'rb') as fp:
+        header = csv.reader(fp).next()
+
+    indices = {}
+    for key, heading in columns.iteritems():
+        try:
+            indices[key] = header.index(heading)
+        except ValueError:
+            if key != 'total':
+                raise ValueError, 'Column "%s" not in header' % heading
+
+    return indices
+
+# line_ranges
+def line_ranges(file_, n):
+    # Split `file_` (after its header) into `n` byte ranges aligned to lines
+    size = os.path.getsize(file_)
+
+    with open(file_, 'rb') as fp:
+        fp.readline()
+        start = fp.tell()
+
+        ranges = []
+        for i in xrange(1, n + 1):
+            if i == n:
+                end = size
+            else:
+                fp.seek(max(start, size * i // n))
+                fp.readline()
+                end = fp.tell()
+
+            if end > start:
+                ranges.append((start, end))
+            start = end
+
+    return ranges
+
+# read_chunks
+def read_chunks(file_, indices, chunk_size=CHUNK_SIZE, start=None, end=None):
+    # Yield lists of at most `chunk_size` rows, reading the bytes [start, end)
+    # (or the whole file after the header)
+    # NOTE Ranges split on lines, so quoted fields must not contain newlines
+    with open(file_, 'rb') as fp:
+        if start is None:
+            fp.readline()
+        else:
+            fp.seek(start)
+
+        # Read lines lazily up to `end`
+        def lines():
+            while end is None or fp.tell() < end:
+                line = fp.readline()
+                if not line:
+                    return
+                yield line
+
+        chunk = []
+        for row in csv.reader(lines()):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+# to_float
+def to_float(values):
+    # Convert strings to floats (empty or invalid are NaN)
+    out = np.empty(len(values), dtype=float)
+    for i, value in enumerate(values):
+        try:
+            out[i] = float(value)
+        except ValueError:
+            out[i] = np.nan
+
+    return out
+
+# score_chunk
+def score_chunk(rows, indices, formula='wilks'):
+    # Score rows into a structured array of `SUMMARY_DTYPE` and weight class,
+    # dropping rows without a (known) sex, bodyweight or total, and return
+    # it with the number of rows skipped as too short (e.g. blank lines)
+    # (which `zip` would otherwise truncate every row to)
+    width = max(indices.itervalues()) + 1
+    n = len(rows)
+    rows = [row for row in rows if len(row) >= width]
+    skipped = n - len(rows)
+
+    columns = zip(*rows) or [()] * width
+
+    sex = np.array(columns[indices['sex']])
+    weight = to_float(columns[indices['weight']])
+
+    if 'total' in indices:
+        total = to_float(columns[indices['total']])
+    else:
+        # Failed lifts are negative in some datasets
+        best = np.c_[tuple(to_float(columns[indices[lift]])
+                           for lift in Lifter.LIFTS)]
+        with np.errstate(invalid='ignore'):
+            total = np.where(np.all(best > 0, axis=1),
+                np.sum(best, axis=1), 0.)
+
+    with np.errstate(invalid='ignore'):
+        keep = np.in1d(sex, Lifter.GENDERS) & (weight > 0) & (total > 0)
+    sex, weight, total = sex[keep].astype('S1'), weight[keep], total[keep]
+
+    chunk = np.empty(len(sex), dtype=SUMMARY_DTYPE + [('weight_class', int)])
+    chunk['name'] = np.array(columns[indices['name']], dtype=object)[keep]
+    chunk['sex'] = sex
+    chunk['weight'] = weight
+    chunk['total'] = total
+    chunk['points'] = FORMULAS[formula](sex, weight, total)
+    chunk['weight_class'] = weight_class_codes(sex, weight)
+
+    return chunk, skipped
+
+# score_range
+def score_range(args):
+    # Score a byte range of a file into a `Summary` (for a process pool)
+    file_, indices, start, end, chunk_size, formula, top = args
+
+    summary = Summary(top)
+    for rows in read_chunks(file_, indices, chunk_size, start, end):
+        summary.add(*score_chunk(rows, indices, formula))
+
+    return summary
+
+# score_file
+def score_file(file_, output=None, chunk_size=CHUNK_SIZE, processes=1,
+    formula='wilks', top=TOP, columns=COLUMNS):
+    # Score `file_`, writing the rankings to `output` after each chunk (or
+    # after each range if run with a process pool)
+    indices = read_header(file_, columns)
+
+    summary = Summary(top)
+
+    if processes <= 1:
+        for rows in read_chunks(file_, indices, chunk_size):
+            summary.add(*score_chunk(rows, indices, formula))
+            logger.debug('%d rows', summary.rows)
+
+            if output is not None:
+                summary.write(output)
+    else:
+        ranges = line_ranges(file_, processes)
+        args = [(file_, indices, start, end, chunk_size, formula, top)
+                for start, end in ranges]
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            for range_summary in pool.imap_unordered(score_range, args):
+                summary.merge(range_summary)
+
+                if output is not None:
+                    summary.write(output)
+        finally:
+            pool.close()
+            pool.join()
+
+    if output is not None and not os.path.exists(output):
+        summary.write(output)
+
+    return summary
+
+# main
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Score a historical results CSV by weight class')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--processes', type=int, default=1)
+    parser.add_argument('--formula', choices=sorted(FORMULAS),
+        default='wilks')
+    parser.add_argument('--top', type=int, default=TOP)
+    args = parser.parse_args()
+
+    summary = score_file(args.input, args.output, args.chunk_size,
+        args.processes, args.formula, args.top)
+
+    print '%d rows scored (%d skipped as too short)' % (summary.rows,
+        summary.skipped)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,465 @@
+##########################################
+# File: ingest.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Ingestion of attempt entries and referee decisions from client devices on
+# the local network
+# Clients send JSON lines of the form:
+#   {"client": "ref-1", "seq": 12, "type": "decision", "lifter_id": 3,
+#    "lift": "squat", "attempt": 0, "valid": true}
+#   {"client": "table", "seq": 4, "type": "enter", "lifter_id": 3,
+#    "lift": "bench", "attempt": 1, "weight": 102.5}
+# where `valid` is true (good), false (fail) or null (pass), and each is
+# answered with a JSON line of the result:
+#   {"client": "ref-1", "seq": 12, "status": "applied", "record": "G"}
+# Submissions are queued by the server threads and applied in batches (by
+# `IngestQueue.apply_pending`, e.g. from a Qt timer in the GUI thread)
+# A (client, seq) is applied at most once: resubmissions are answered with
+# the first result
+# Decisions on an attempt are held (answered "queued") until every referee
+# (a client) has voted, or DECISION_TIMEOUT after the first vote, and are
+# then resolved together, so the result doesn't depend on which batch each
+# vote arrives in
+
+# Imports
+from collections import namedtuple, deque
+import json
+import socket
+import SocketServer
+import threading
+
+from lifter import Lifter, clock
+
+# Setup logger
+from log import getLogger
+logger = getLogger('basic')
+
+# all
+__all__ = [
+    'Submission',
+    'IngestQueue',
+    'IngestServer',
+    'Client',
+    'LocalClient',
+    'resolve_decisions'
+]
+
+# Defaults
+PORT = 9870
+REPLY_TIMEOUT = 5.
+RESULT_WINDOW = 10000
+REFEREES = 3
+DECISION_TIMEOUT = 30.
+
+# Submission types in the order applied to an attempt
+TYPES = ['enter', 'decision']
+
+# Submission
+Submission = namedtuple('Submission',
+    'client seq type lifter_id lift attempt value')
+
+# parse_submission
+def parse_submission(message):
+    # `Submission` from a decoded message (raises ValueError if invalid)
+    try:
+        client = unicode(message['client'])
+        seq = int(message['seq'])
+        type_ = message['type']
+        lifter_id = int(message['lifter_id'])
+        lift = message['lift']
+        attempt = int(message['attempt'])
+
+        if type_ == 'enter':
+            value = float(message['weight'])
+        elif type_ == 'decision':
+            value = message['valid']
+        else:
+            raise ValueError, 'type "%s" not in %s' % (type_, TYPES)
+    except (KeyError, TypeError), ex:
+        raise ValueError, 'Invalid submission: %r (%s)' % (message, ex)
+
+    if lift not in Lifter.LIFTS:
+        raise ValueError, 'lift "%s" not in %s' % (lift, Lifter.LIFTS)
+
+    if attempt not in [0,1,2]:
+        raise ValueError, 'attempt %d not in [0, 1, 2]' % attempt
+
+    # (`1 in (True, False, None)`, so the type is checked)
+    if type_ == 'decision' and value is not None and \
+        not isinstance(value, bool):
+        raise ValueError, 'valid must be true, false or null'
+
+    return Submission(client, seq, type_, lifter_id, lift, attempt, value)
+
+# resolve_decisions
+def resolve_decisions(votes):
+    # Decision of an attempt from conflicting `valid` values (True, False,
+    # None), independent of their order: a pass only if all pass, and
+    # otherwise good only with a majority of good decisions (so a tie fails)
+    votes = list(votes)
+    if all(v is None for v in votes):
+        return None
+
+    good = sum(1 for v in votes if v is True)
+    return good > len(votes) - good
+
+# IngestQueue
+class IngestQueue(object):
+    def __init__(self, result_window=RESULT_WINDOW, referees=REFEREES,
+        decision_timeout=DECISION_TIMEOUT):
+        self.lock = threading.Lock()
+
+        # Decisions are resolved once `referees` clients have voted on an
+        # attempt, or `decision_timeout` seconds after its first vote
+        self.referees = referees
+        self.decision_timeout = decision_timeout
+
+        # Held decisions by (lifter_id, index), as (time of the first vote,
+        # {client : latest submission}) (only used by `apply_pending`)
+        self.held = {}
+
+        # Submissions waiting to be applied, with an event set on their
+        # result
+        self.pending = []
+        self.waiting = {}
+
+        # Results of applied (client, seq), oldest first
+        self.results = {}
+        self.result_order = deque()
+        self.result_window = result_window
+
+    def submit(self, submission):
+        # Queue `submission` and return an event set when it has a result
+        # (see `result`)
+        key = (submission.client, submission.seq)
+
+        with self.lock:
+            if key in self.results:
+                event = threading.Event()
+                event.set()
+                return event
+
+            try:
+                return self.waiting[key]
+            except KeyError:
+                event = threading.Event()
+                self.waiting[key] = event
+                self.pending.append(submission)
+                return event
+
+    def result(self, client, seq):
+        with self.lock:
+            return self.results.get((client, seq))
+
+    def set_result(self, submission, status, **kwargs):
+        key = (submission.client, submission.seq)
+        result = dict(client=submission.client, seq=submission.seq,
+                      status=status, **kwargs)
+
+        with self.lock:
+            self.results[key] = result
+            self.result_order.append(key)
+            while len(self.result_order) > self.result_window:
+                del self.results[self.result_order.popleft()]
+
+            event = self.waiting.pop(key, None)
+
+        if event is not None:
+            event.set()
+
+    # Application
+    def apply_pending(self, collection):
+        # Apply all queued submissions to `collection` as one batch and
+        # return the lifters changed
+        with self.lock:
+            submissions, self.pending = self.pending, []
+
+        # Group by attempt, applied in lifter and attempt order (so earlier
+        # attempts are completed first) with entries before decisions
+        attempts = {}
+        for submission in submissions:
+            index = Lifter.LIFT_OFFSET[submission.lift] + submission.attempt
+            key = (submission.lifter_id, index)
+            attempts.setdefault(key, []).append(submission)
+
+        # Attempts whose held decisions have timed out
+        now = clock()
+        for key, (first, votes) in self.held.iteritems():
+            if now - first >= self.decision_timeout:
+                attempts.setdefault(key, [])
+
+        if not attempts:
+            return []
+
+        changed = []
+        with collection.feed.batch():
+            for key in sorted(attempts):
+                lifter = self.apply_attempt(collection, key, attempts[key],
+                                            now)
+                if lifter is not None and lifter not in changed:
+                    changed.append(lifter)
+
+        return changed
+
+    def apply_attempt(self, collection, key, submissions, now):
+        # Apply the submissions for one attempt and return the lifter if
+        # changed
+        lifter_id, index = key
+
+        try:
+            lifter = collection[lifter_id]
+        except KeyError:
+            first, votes = self.held.pop(key, (now, {}))
+            for submission in submissions + votes.values():
+                self.set_result(submission, 'rejected',
+                    error='lifter_id=%d not found' % lifter_id)
+            return None
+
+        by_type = dict((type_, []) for type_ in TYPES)
+        for submission in submissions:
+            by_type[submission.type].append(submission)
+
+        changed = False
+        with collection.writing(lifter):
+            # Conflicting entries: the greatest (client, seq) wins
+            entries = sorted(by_type['enter'], key=lambda s: (s.client, s.seq))
+            if entries:
+                changed |= self.apply_entry(lifter, index, entries)
+
+            # Conflicting decisions are resolved as a whole (with those
+            # held)
+            decisions = by_type['decision']
+            if decisions or key in self.held:
+                changed |= self.apply_decisions(lifter, key, decisions, now)
+
+        return lifter if changed else None
+
+    def apply_entry(self, lifter, index, entries):
+        winner = entries[-1]
+
+        # Decided attempts are only re-entered at the table
+        if lifter.lift_record[index] in Lifter.COMPLETED_CODE:
+            for submission in entries:
+                self.set_result(submission, 'rejected',
+                    error='Attempt already decided',
+                    record=chr(lifter.lift_record[index]))
+            return False
+
+        try:
+            lifter.enter_lift(winner.lift, winner.attempt, winner.value)
+        except ValueError, ex:
+            for submission in entries:
+                self.set_result(submission, 'rejected', error=str(ex))
+            return False
+
+        for submission in entries[:-1]:
+            self.set_result(submission, 'overruled', weight=winner.value)
+        self.set_result(winner, 'applied', weight=winner.value)
+
+        return True
+
+    def apply_decisions(self, lifter, key, decisions, now):
+        lifter_id, index = key
+        first, votes = self.held.pop(key, (now, {}))
+
+        # The latest vote of each referee counts
+        for submission in sorted(decisions, key=lambda s: s.seq):
+            previous = votes.get(submission.client)
+            if previous is not None and previous.seq > submission.seq:
+                self.set_result(submission, 'replaced',
+                    replaced_by=previous.seq)
+                continue
+
+            if previous is not None:
+                self.set_result(previous, 'replaced',
+                    replaced_by=submission.seq)
+            votes[submission.client] = submission
+
+        record = lifter.lift_record[index]
+        if record != Lifter.SET_CODE:
+            # Decided (or never entered)
+            error = 'Attempt already decided' \
+                if record in Lifter.COMPLETED_CODE else 'Attempt not entered'
+            for submission in votes.values():
+                self.set_result(submission, 'rejected', error=error,
+                    record=chr(record))
+            return False
+
+        # Held until every referee has voted (or the timeout)
+        if len(votes) < self.referees and \
+            now - first < self.decision_timeout:
+            self.held[key] = (first, votes)
+            return False
+
+        votes = votes.values()
+        valid = resolve_decisions(s.value for s in votes)
+
+        lifter.validate_lift(votes[0].lift, votes[0].attempt, valid)
+        record = chr(lifter.lift_record[index])
+
+        for submission in votes:
+            status = 'applied' if submission.value == valid else 'overruled'
+            self.set_result(submission, status, record=record)
+
+        return True
+
+# IngestHandler
+class IngestHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        queue = self.server.queue
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                submission = parse_submission(json.loads(line))
+            except ValueError, ex:
+                self.reply(dict(status='rejected', error=str(ex)))
+                continue
+
+            event = queue.submit(submission)
+            event.wait(self.server.reply_timeout)
+
+            result = queue.result(submission.client, submission.seq)
+            if result is None:
+                # Still queued (resubmit for the result)
+                result = dict(client=submission.client, seq=submission.seq,
+                              status='queued')
+
+            self.reply(result)
+
+    def reply(self, result):
+        self.wfile.write(json.dumps(result) + '\n')
+        self.wfile.flush()
+
+# IngestServer
+class IngestServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, queue, port=PORT, host='',
+        reply_timeout=REPLY_TIMEOUT):
+        SocketServer.TCPServer.__init__(self, (host, port), IngestHandler)
+
+        self.queue = queue
+        self.reply_timeout = reply_timeout
+
+        self.thread = None
+
+    def start(self):
+        # Serve from a daemon thread
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        logger.info('Ingesting on port %d', self.server_address[1])
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+# Clients
+
+# Client
+class Client(object):
+    def __init__(self, name, host='localhost', port=PORT, seq=0):
+        self.name = name
+        self.seq = seq
+
+        self.socket = socket.create_connection((host, port))
+        self.file = self.socket.makefile('rb+')
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+    def message(self, type_, lifter_id, lift, attempt, seq=None):
+        if seq is None:
+            self.seq += 1
+            seq = self.seq
+
+        return dict(client=self.name, seq=seq, type=type_,
+                    lifter_id=lifter_id, lift=lift, attempt=attempt)
+
+    def send(self, message):
+        self.file.write(json.dumps(message) + '\n')
+        self.file.flush()
+
+        return json.loads(self.file.readline())
+
+    def enter(self, lifter_id, lift, attempt, weight, seq=None):
+        message = self.message('enter', lifter_id, lift, attempt, seq)
+        message['weight'] = weight
+        return self.send(message)
+
+    def decide(self, lifter_id, lift, attempt, valid, seq=None):
+        message = self.message('decision', lifter_id, lift, attempt, seq)
+        message['valid'] = valid
+        return self.send(message)
+
+# LocalClient
+class LocalClient(Client):
+    # Stand-in client submitting straight to a queue (without a server)
+    def __init__(self, name, queue, seq=0):
+        self.name = name
+        self.seq = seq
+        self.queue = queue
+
+    def close(self):
+        pass
+
+    def send(self, message):
+        # Returns the result if applied, otherwise 'queued' (see
+        # `IngestQueue.apply_pending`)
+        submission = parse_submission(message)
+        self.queue.submit(submission)
+
+        result = self.queue.result(submission.client, submission.seq)
+        if result is None:
+            result = dict(client=submission.client, seq=submission.seq,
+                          status='queued')
+
+        return result
+
+# main
+def main():
+    # Stand-in client: send lines of "enter lifter_id lift attempt weight" or
+    # "decision lifter_id lift attempt good|fail|pass" from stdin
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Stand-in ingest client')
+    parser.add_argument('name')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--seq', type=int, default=0)
+    args = parser.parse_args()
+
+    decisions = {'good' : True, 'fail' : False, 'pass' : None}
+
+    client = Client(args.name, args.host, args.port, args.seq)
+    try:
+        for line in sys.stdin:
+            fields = line.split()
+            if not fields:
+                continue
+
+            type_, lifter_id, lift, attempt, value = fields
+            if type_ == 'enter':
+                result = client.enter(int(lifter_id), lift, int(attempt),
+                    float(value))
+            else:
+                result = client.decide(int(lifter_id), lift, int(attempt),
+                    decisions[value])
+
+            print json.dumps(result)
+    finally:
+        client.close()
+
+if __name__ == '__main__':
+    main()
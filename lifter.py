@@ -10,11 +10,22 @@
 import numpy as np
 import wilks
 import weakref
+import threading
+import time
+import scoring
+import feed
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
 
 # Setup logger
 from log import getLogger
 logger = getLogger('basic')
 
+# clock
+# Monotonic where available (Python 3.3+), otherwise the system time
+clock = getattr(time, 'monotonic', time.time)
+
 # WeightClasses
 WEIGHT_CLASSES_IPF2011 = {
     'M' : np.array([59, 66, 74, 83, 93, 105, 120], dtype=float),
@@ -43,10 +54,43 @@ class Lifter(object):
     PASS_LIFT = 'P'
     COMPLETED_LIFT = [GOOD_LIFT, FAIL_LIFT, PASS_LIFT]
 
+    # Byte codes of the records as stored in `lift_record`
+    BLANK_CODE = ord(BLANK_LIFT)
+    SET_CODE = ord(SET_LIFT)
+    GOOD_CODE = ord(GOOD_LIFT)
+    FAIL_CODE = ord(FAIL_LIFT)
+    PASS_CODE = ord(PASS_LIFT)
+    COMPLETED_CODE = frozenset([GOOD_CODE, FAIL_CODE, PASS_CODE])
+
     LIFTS = ['squat', 'bench', 'deadlift']
+    LIFT_OFFSET = dict((lift, 3*i) for i, lift in enumerate(LIFTS))
+
+    # Status
+    ACTIVE = 0
+    BOMBED_OUT = 1
+    FINISHED = 2
+    WITHDRAWN = 3
+    STATUS_NAMES = ['Active', 'Bombed out', 'Finished', 'Withdrawn']
+
     ATTRIBUTES = ['name', 'gender', 'weight', 'rack_height',
                   'team', 'flight', 'lifter_id',
-                  'lifts', 'lift_record']
+                  'lifts', 'lift_record', 'extras', 'withdrawn', 'times']
+
+    # Changes to these attributes increment `revision` and are notified to
+    # the collection
+    NOTIFY_ATTRIBUTES = frozenset(ATTRIBUTES) - frozenset(['times'])
+
+    # `times` holds the time (from `clock`) each attempt was entered and then
+    # validated (NaN if not)
+    ENTERED_OFFSET = 0
+    VALIDATED_OFFSET = 9
+
+    # Defaults of attributes kept in `extras` (see `register_division`)
+    EXTRA_DEFAULTS = {}
+
+    # No per-instance `__dict__`; further keyword arguments are kept in
+    # `extras`
+    __slots__ = ATTRIBUTES + ['collection', 'revision']
 
     def __init__(self, name, gender, weight, rack_height, team=None, flight=0,
         lifter_id=None, collection=None, **kwargs):
@@ -55,6 +99,10 @@ class Lifter(object):
         if gender not in self.GENDERS:
             raise ValueError, 'gender "%s" not in %s' % (gender, self.GENDERS)
 
+        # No collection until all properties are set
+        self.collection = None
+        self.revision = 0
+
         # Set base properties
         self.name = name
         self.gender = gender
@@ -63,10 +111,12 @@ class Lifter(object):
         self.team = team
         self.lifter_id = lifter_id
         self.flight = flight
+        self.withdrawn = False
 
         # Set lift records
-        self.lifts = np.zeros(9, dtype=float)
-        self.lift_record = [self.BLANK_LIFT] * 9
+        self.lifts = array('d', [0.]) * 9
+        self.lift_record = bytearray(self.BLANK_LIFT * 9)
+        self.times = array('d', [np.nan]) * 18
 
         # Save reference to collection if available
         if collection is not None:
@@ -74,10 +124,59 @@ class Lifter(object):
         else:
             self.collection = None
 
-        # Set any further keyword arguments
+        # Set any further keyword arguments (e.g. opening attempts)
+        self.extras = {}
         for attr, val in kwargs.iteritems():
             setattr(self, attr, val)
 
+    # Extras
+    def __getattr__(self, attr):
+        # Only called when `attr` is not a slot (or an unset slot)
+        if attr in Lifter.__slots__:
+            raise AttributeError, attr
+
+        try:
+            return self.extras[attr]
+        except KeyError:
+            pass
+
+        try:
+            return self.EXTRA_DEFAULTS[attr]
+        except KeyError:
+            raise AttributeError, \
+                "'Lifter' object has no attribute '%s'" % attr
+
+    def __setattr__(self, attr, value):
+        notify = attr in self.NOTIFY_ATTRIBUTES
+        if notify and self.collection is not None:
+            old = getattr(self, attr, None)
+        else:
+            old = None
+
+        # Only attributes not defined on the class (slots and properties)
+        # are extras, so assigning a read-only property still raises
+        if hasattr(type(self), attr):
+            object.__setattr__(self, attr, value)
+        else:
+            self.extras[attr] = value
+
+        if notify:
+            self.changed(None, attr, old)
+
+    # Change notification
+    def changed(self, index=None, attribute=None, old=None):
+        # `index` is the lift record index for an entered (`attribute` is
+        # 'lifts') or validated (`attribute` is 'lift_record') lift, and
+        # `old` is the previous value
+        self.revision += 1
+
+        if self.collection is None:
+            return
+
+        collection = self.collection()
+        if collection is not None:
+            collection.lifter_changed(self, index, attribute, old)
+
     def __repr__(self):
         str_ = 'Lifter(%r, %r, %.1f, ' % \
             (self.name, self.gender, self.weight)
@@ -108,66 +207,102 @@ class Lifter(object):
 
     # Lift enter/validation/getter
     def lift_index(self, lift, attempt):
-        base_index = self.LIFTS.index(lift)
-        return 3*base_index + (attempt % 3)
+        return self.LIFT_OFFSET[lift] + (attempt % 3)
 
     def enter_lift(self, lift, attempt, weight):
         # Check previous attempt is completed
         if attempt > 0:
             index = self.lift_index(lift, attempt - 1)
-            if self.lift_record[index] not in self.COMPLETED_LIFT:
+            if self.lift_record[index] not in self.COMPLETED_CODE:
                 raise ValueError, \
                     'lift=%s, attempt=%d: Previous attempt not completed' % \
                     (lift, attempt)
 
         # Get index from lift and attempt
         index = self.lift_index(lift, attempt)
+        old = (self.lifts[index], chr(self.lift_record[index]))
 
         # Set lift
         self.lifts[index] = weight
 
         # Indicate that lift has been set
-        self.lift_record[index] = self.SET_LIFT
+        self.lift_record[index] = self.SET_CODE
+
+        self.times[self.ENTERED_OFFSET + index] = clock()
+        self.times[self.VALIDATED_OFFSET + index] = np.nan
+
+        self.changed(index, 'lifts', old)
 
     def validate_lift(self, lift, attempt, valid):
         index = self.lift_index(lift, attempt)
 
-        # Check that the lift has been set
-        if self.lift_record[index] == self.BLANK_LIFT:
-            self.lift_record[index] == self.PASS_LIFT
-
-        elif self.lift_record[index] != self.SET_LIFT:
+        # Check that the lift is blank or has been set
+        record = self.lift_record[index]
+        if record != self.BLANK_CODE and record != self.SET_CODE:
             logger.warning('lift=%s, attempt=%d is not in set position. ' \
                 'Set at %s for %r',
-                lift, attempt, self.lift_record[index], self)
+                lift, attempt, chr(record), self)
+
+        old = chr(record)
 
         # Set lift record
         if valid is None:       # Lift was passed
-            self.lift_record[index] = self.PASS_LIFT
+            self.lift_record[index] = self.PASS_CODE
         elif valid == True:     # Lift was good
-            self.lift_record[index] = self.GOOD_LIFT
+            self.lift_record[index] = self.GOOD_CODE
         else:                   # Lift was failed
-            self.lift_record[index] = self.FAIL_LIFT
+            self.lift_record[index] = self.FAIL_CODE
+
+        self.times[self.VALIDATED_OFFSET + index] = clock()
+
+        self.changed(index, 'lift_record', old)
 
     def get_lift(self, lift, attempt):
         # Return record and lift
         index = self.lift_index(lift, attempt)
 
-        return self.lift_record[index], self.lifts[index]
+        return chr(self.lift_record[index]), self.lifts[index]
 
     # Totals
     def best_lift(self, lift):
-        for attempt in [2,1,0]:
-            record, weight = self.get_lift(lift, attempt)
-            if record == self.GOOD_LIFT:
-                return weight
+        offset = self.LIFT_OFFSET[lift]
+        for index in [offset + 2, offset + 1, offset]:
+            if self.lift_record[index] == self.GOOD_CODE:
+                return self.lifts[index]
         else:
             return 0.
 
+    @property
+    def status(self):
+        if self.withdrawn:
+            return self.WITHDRAWN
+
+        # Bombed out if all attempts at a lift are completed without a good
+        # lift
+        record = self.lift_record
+        completed = [r in self.COMPLETED_CODE for r in record]
+
+        for offset in self.LIFT_OFFSET.itervalues():
+            if all(completed[offset:offset + 3]) and \
+                self.GOOD_CODE not in record[offset:offset + 3]:
+                return self.BOMBED_OUT
+
+        if all(completed):
+            return self.FINISHED
+
+        return self.ACTIVE
+
+    @property
+    def status_name(self):
+        return self.STATUS_NAMES[self.status]
+
     @property
     def total(self):
-        best_lifts = [self.best_lift(lift) for lift in self.LIFTS]
-        return np.sum(best_lifts)
+        # No total if bombed out or withdrawn
+        if self.status in (self.BOMBED_OUT, self.WITHDRAWN):
+            return 0.
+
+        return sum([self.best_lift(lift) for lift in self.LIFTS])
 
     @property
     def points(self):
@@ -178,6 +313,34 @@ class Lifter(object):
         required_total = wilks.required_total(self.gender, self.weight, points)
         return required_total - self.total()
 
+    # Attempts needed to move up a place in the weight class, into the team's
+    # counting lifters, or past the best lifter (None if none)
+    def needs(self):
+        collection = None
+        if self.collection is not None:
+            collection = self.collection()
+
+        if collection is None:
+            return (None, None, None)
+
+        needs = collection.needs()
+        row = np.searchsorted(needs.lifter_id, self.lifter_id)
+
+        return tuple(float(x[row]) if x[row] == x[row] else None
+                     for x in (needs.place, needs.team, needs.best))
+
+    @property
+    def need_place(self):
+        return self.needs()[0]
+
+    @property
+    def need_team(self):
+        return self.needs()[1]
+
+    @property
+    def need_best(self):
+        return self.needs()[2]
+
     # Overall info
     def overall_info(self):
         if self.collection is None:
@@ -195,17 +358,32 @@ class Lifter(object):
         return [getattr(self, attr) for attr in self.ATTRIBUTES]
 
     def __setstate__(self, state):
-        for i, attr in enumerate(self.ATTRIBUTES):
-            setattr(self, attr, state[i])
+        # Older pickles have no `extras` and store `lifts` as a NumPy array
+        # and `lift_record` as a list of characters
         self.collection = None
+        self.revision = 0
+        self.extras = {}
+        self.withdrawn = False
+        self.times = array('d', [np.nan]) * 18
+
+        for i, attr in enumerate(self.ATTRIBUTES[:len(state)]):
+            setattr(self, attr, state[i])
+
+        if not isinstance(self.lifts, array):
+            self.lifts = array('d', self.lifts)
+
+        if not isinstance(self.lift_record, bytearray):
+            self.lift_record = bytearray(''.join(self.lift_record))
 
 # Lifter 'squat', 'bench', and 'deadlift' properties
 for lift in Lifter.LIFTS:
     for attempt in [0,1,2]:
-        # property factory required so binding of lift and attempt is correct
+        # property factory required so binding of index is correct
         def make_property(lift, attempt):
+            index = Lifter.LIFT_OFFSET[lift] + attempt
+
             def getter(self):
-                return self.get_lift(lift, attempt)[1]
+                return self.lifts[index]
 
             def setter(self, value):
                 self.enter_lift(lift, attempt, value)
@@ -215,29 +393,500 @@ for lift in Lifter.LIFTS:
         attr = '%s_%d' % (lift, attempt)
         setattr(Lifter,attr, make_property(lift, attempt))
 
+# Divisions
+# Attributes (kept in `extras`) by which titles are awarded, with the values
+# each can take (in order) and the default; registered before any
+# collection is made, as their codes are columns of `LifterCollection`
+Division = namedtuple('Division', 'attribute label values default')
+DIVISIONS = []
+
+# register_division
+def register_division(attribute, label, values, default):
+    if default not in values:
+        raise ValueError, 'default "%s" not in %s' % (default, values)
+
+    division = Division(attribute, label, tuple(values), default)
+    DIVISIONS.append(division)
+
+    Lifter.EXTRA_DEFAULTS[attribute] = default
+    Lifter.NOTIFY_ATTRIBUTES = Lifter.NOTIFY_ATTRIBUTES | \
+        frozenset([attribute])
+
+    return division
+
+register_division('age_category', 'Age',
+    ['Sub-Junior', 'Junior', 'Open', 'Masters 1', 'Masters 2', 'Masters 3',
+     'Masters 4'], 'Open')
+register_division('equipment', 'Equipment', ['Raw', 'Equipped'], 'Raw')
+
+# division_codes
+def division_codes(lifters):
+    # N x len(DIVISIONS) index of the value of each division (-1 if not one
+    # of its values)
+    codes = np.empty((len(lifters), len(DIVISIONS)), dtype=int)
+    extras = [l.extras for l in lifters]
+    for j, division in enumerate(DIVISIONS):
+        # Divisions are extras, so read them directly rather than through
+        # `Lifter.__getattr__`
+        index = dict((v, i) for i, v in enumerate(division.values))
+        attribute, default = division.attribute, division.default
+        codes[:, j] = [index.get(e.get(attribute, default), -1)
+                       for e in extras]
+
+    return codes
+
+# Weight class codes are the gender index * CLASS_STRIDE + the class index,
+# where the class index equal to the number of classes is the "+" class
+CLASS_STRIDE = 100
+
+# weight_class_codes
+def weight_class_codes(gender, weight):
+    # Vectorised `Lifter.weight_class`
+    codes = np.empty(len(weight), dtype=int)
+    for i, g in enumerate(Lifter.GENDERS):
+        mask = gender == g
+        classes = Lifter.WEIGHT_CLASSES[g]
+        codes[mask] = i*CLASS_STRIDE + np.searchsorted(classes, weight[mask])
+
+    return codes
+
+# weight_class_label
+def weight_class_label(code):
+    gender, index = divmod(code, CLASS_STRIDE)
+    classes = Lifter.WEIGHT_CLASSES[Lifter.GENDERS[gender]]
+
+    if index >= len(classes):
+        return '%.1f+' % classes[-1]
+
+    return '%.1f' % classes[index]
+
+# Columns
+Columns = namedtuple('Columns',
+    'lifters lifter_id gender weight weight_class team lifts records '
+    'withdrawn status total points divisions')
+
+# best_lifts
+def best_lifts(lifts, records):
+    # Vectorised `Lifter.best_lift` over N x 9 lifts and records, returning
+    # an N x 3 array of the last good attempt of each lift
+    shape = (lifts.shape[0], len(Lifter.LIFTS), 3)
+    lifts = lifts.reshape(shape)
+    good = records.reshape(shape) == Lifter.GOOD_CODE
+
+    best = np.zeros(shape[:2], dtype=float)
+    for attempt in [0,1,2]:
+        best = np.where(good[..., attempt], lifts[..., attempt], best)
+
+    return best
+
+# lifter_status
+def lifter_status(records, withdrawn):
+    # Vectorised `Lifter.status` over N x 9 records
+    n = records.shape[0]
+    records = records.reshape(n, len(Lifter.LIFTS), 3)
+
+    completed = np.zeros(records.shape, dtype=bool)
+    for code in Lifter.COMPLETED_CODE:
+        completed |= records == code
+    good = (records == Lifter.GOOD_CODE).any(axis=2)
+
+    bombed_out = (completed.all(axis=2) & ~good).any(axis=1)
+    finished = completed.all(axis=2).all(axis=1)
+
+    status = np.empty(n, dtype=int)
+    status.fill(Lifter.ACTIVE)
+    status[finished] = Lifter.FINISHED
+    status[bombed_out] = Lifter.BOMBED_OUT
+    status[withdrawn] = Lifter.WITHDRAWN
+
+    return status
+
+# score_rows
+def score_rows(c, rows=slice(None)):
+    # (Re)compute the status, total and points of `rows` of columns `c`
+    status = lifter_status(c.records[rows], c.withdrawn[rows])
+
+    best = best_lifts(c.lifts[rows], c.records[rows])
+    total = best[:, 0] + best[:, 1] + best[:, 2]
+    total[(status == Lifter.BOMBED_OUT) | (status == Lifter.WITHDRAWN)] = 0.
+
+    c.status[rows] = status
+    c.total[rows] = total
+    c.points[rows] = wilks.points_array(c.gender[rows], c.weight[rows], total)
+
+# Columns updated when a lifter changes
+ROW_FIELDS = ['gender', 'weight', 'weight_class', 'team', 'lifts', 'records',
+              'withdrawn', 'status', 'total', 'points', 'divisions']
+
+# copy_columns
+def copy_columns(columns):
+    # Copy of `columns` sharing only the lifters
+    return Columns(*[list(x) if isinstance(x, list) else x.copy()
+                     for x in columns])
+
+# lifter_columns
+def lifter_columns(lifter, team):
+    # Columns of `lifter` alone (with team code `team`)
+    gender = np.array([lifter.gender], dtype='S1')
+    weight = np.array([lifter.weight], dtype=float)
+
+    c = Columns([lifter], np.array([lifter.lifter_id], dtype=int), gender,
+                weight, weight_class_codes(gender, weight),
+                np.array([team], dtype=int),
+                np.array([lifter.lifts], dtype=float),
+                np.frombuffer(bytes(lifter.lift_record),
+                              dtype=np.uint8).reshape(1, 9),
+                np.array([lifter.withdrawn], dtype=bool),
+                np.empty(1, dtype=int), np.empty(1, dtype=float),
+                np.empty(1, dtype=float), division_codes([lifter]))
+    score_rows(c)
+
+    return c
+
 # LifterCollection
 class LifterCollection(object):
-    ATTRIBUTES = ['map_', 'id_count', 'top']
+    ATTRIBUTES = ['map_', 'id_count', 'top', 'team_scoring', 'records']
 
-    def __init__(self, top=3):
+    # Copies `snapshot` attempts while writes are in progress before
+    # blocking new writes
+    SNAPSHOT_ATTEMPTS = 20
+
+    def __init__(self, top=3, team_scoring=None):
         self.map_ = {}
         self.id_count = 0
         self.top = top
 
+        self.setup_sync()
+
+        if team_scoring is None:
+            team_scoring = scoring.TopPoints()
+        self.team_scoring = team_scoring
+
+        # Federation records (`records.RecordsIndex`)
+        self.records = None
+
+        self.reset_cache()
+
+    def setup_sync(self):
+        # State which is not pickled: the change feed and the locks
+        self.feed = feed.ChangeFeed()
+
+        # Guards the collection's own state (map, team codes, generation,
+        # cached columns and records) and is only held briefly
+        self.lock_ = threading.Lock()
+
+        # Per-lifter locks for concurrent writers (see `writing`)
+        self.lifter_locks = {}
+
+        # Guards the records index, which is updated by every writer
+        self.records_lock = threading.Lock()
+
+        # Sequence is incremented as each write starts and ends, and
+        # `writers` is the number of writes in progress (see `snapshot`)
+        self.sequence = 0
+        self.writers = 0
+
+        # Number of snapshots blocking new writes, notified (with `lock_`)
+        # when the last write in progress ends or a snapshot stops blocking
+        self.blocking = 0
+        self.idle = threading.Condition(self.lock_)
+
+        # Depth of `writing` on each thread (nested writes never block)
+        self.local = threading.local()
+
+    def empty(self):
+        # Collection with the settings (and next lifter_id) of this one and
+        # no lifters
+        collection = LifterCollection(self.top, self.team_scoring)
+        collection.records = self.records
+        collection.id_count = self.id_count
+
+        return collection
+
+    def reset_cache(self):
+        # Team code <-> name tables
+        self.team_codes = {}
+        self.team_names = []
+
+        # Generation is incremented on every change to the collection
+        self.generation = 0
+        self.columns_ = None
+
+        # Results cached for a generation by key
+        self.cache_ = {}
+
     def add(self, lifter):
         # Add lifter_id
-        lifter.lifter_id = self.id_count
-        self.id_count += 1
+        with self.lock_:
+            lifter_id = self.id_count
+            self.id_count += 1
+
+        lifter.lifter_id = lifter_id
+
+        self.insert(lifter)
+
+    def insert(self, lifter):
+        # Add `lifter` keeping its lifter_id (e.g. from a saved meet)
+        with self.lock_:
+            if lifter.lifter_id in self.map_:
+                raise ValueError, 'lifter_id %d already in collection' % \
+                    lifter.lifter_id
+
+            self.id_count = max(self.id_count, lifter.lifter_id + 1)
 
         # Set weak reference to this collection
         lifter.collection = weakref.ref(self)
 
-        # Add lifter
-        self.map_[lifter.lifter_id] = lifter
+        # Add lifter (copy on write so that readers can iterate the map
+        # without a lock)
+        with self.lock_:
+            self.sequence += 1
+
+            map_ = dict(self.map_)
+            map_[lifter.lifter_id] = lifter
+            self.map_ = map_
+            self.team_code(lifter.team)
+
+            self.generation += 1
+            self.sequence += 1
+
+        if self.feed:
+            self.feed.publish(feed.LifterAdded(self.generation, lifter))
 
     def remove(self, lifter):
-        # Remove the lifter from the map
-        del self.map_[lifter.lifter_id]
+        # Remove the lifter from the map (copy on write)
+        with self.lock_:
+            self.sequence += 1
+
+            map_ = dict(self.map_)
+            del map_[lifter.lifter_id]
+            self.map_ = map_
+            self.lifter_locks.pop(lifter.lifter_id, None)
+
+            self.generation += 1
+            self.sequence += 1
+
+        if self.feed:
+            self.feed.publish(feed.LifterRemoved(self.generation, lifter))
+
+    def lifter_changed(self, lifter, index=None, attribute=None, old=None):
+        # The lifter's row is computed without the collection lock (writers
+        # of other lifters only wait on each other to apply their rows)
+        with self.lock_:
+            team = self.team_code(lifter.team)
+
+        # Check entered and validated lifts against the records
+        if index is not None and self.records is not None:
+            with self.records_lock:
+                self.records.update(lifter, index, self.map_)
+
+        row_columns = lifter_columns(lifter, team)
+
+        with self.lock_:
+            self.sequence += 1
+            self.update_lifter(lifter, row_columns)
+            generation = self.generation
+            self.sequence += 1
+
+        # Events are only made if there are subscribers (and are published
+        # without the lock, so subscribers can read the collection)
+        if self.feed:
+            self.feed.publish(self.change_event(generation, lifter, index,
+                attribute, old))
+
+    def update_lifter(self, lifter, row_columns):
+        # Copy the lifter's row (`lifter_columns`) into the columns in place
+        # (if current), with `lock_` held
+        up_to_date = self.columns_ is not None and \
+            self.columns_[0] == self.generation
+
+        self.generation += 1
+
+        if up_to_date:
+            c = self.columns_[1]
+            row = np.searchsorted(c.lifter_id, lifter.lifter_id)
+
+            # Removed lifters are not in the columns
+            if row >= len(c.lifter_id) or c.lifter_id[row] != lifter.lifter_id:
+                return
+
+            for field in ROW_FIELDS:
+                getattr(c, field)[row] = getattr(row_columns, field)[0]
+
+            self.columns_ = (self.generation, c)
+
+    def change_event(self, generation, lifter, index, attribute, old):
+        if index is None:
+            return feed.AttributeChanged(generation, lifter, attribute, old,
+                getattr(lifter, attribute, None))
+
+        record = chr(lifter.lift_record[index])
+        if attribute == 'lifts':
+            return feed.AttemptEntered(generation, lifter, index, old,
+                (lifter.lifts[index], record))
+
+        return feed.AttemptValidated(generation, lifter, index, old, record)
+
+    # Concurrent writers
+    def lifter_lock(self, lifter):
+        with self.lock_:
+            try:
+                return self.lifter_locks[lifter.lifter_id]
+            except KeyError:
+                lock = threading.RLock()
+                self.lifter_locks[lifter.lifter_id] = lock
+                return lock
+
+    @contextmanager
+    def writing(self, lifter):
+        # Hold the lock of `lifter` while it is changed, so that writers of
+        # different lifters don't wait on each other, and mark the write as
+        # in progress for `snapshot`
+        depth = getattr(self.local, 'depth', 0)
+
+        with self.lifter_lock(lifter):
+            with self.lock_:
+                # Wait while a snapshot is blocking new writes
+                while depth == 0 and self.blocking > 0:
+                    self.idle.wait()
+
+                self.writers += 1
+                self.sequence += 1
+
+            self.local.depth = depth + 1
+            try:
+                yield lifter
+            finally:
+                self.local.depth = depth
+
+                with self.lock_:
+                    self.writers -= 1
+                    self.sequence += 1
+
+                    if self.writers == 0:
+                        self.idle.notify_all()
+
+    def snapshot(self):
+        # Copy of `columns()` which is consistent while other threads write
+        # (through `writing`), returned with its generation
+        # The copy is retried (up to SNAPSHOT_ATTEMPTS) if any write was in
+        # progress or started while copying, and then new writes are
+        # blocked until the writes in progress end and it is copied under
+        # `lock_`
+        for attempt in xrange(self.SNAPSHOT_ATTEMPTS):
+            sequence = self.sequence
+            if self.writers > 0:
+                time.sleep(0)
+                continue
+
+            columns = self.columns()
+            generation = self.generation
+            copy = copy_columns(columns)
+
+            if self.sequence == sequence and self.writers == 0:
+                return generation, copy
+
+        with self.lock_:
+            self.blocking += 1
+            while self.writers > 0:
+                self.idle.wait()
+
+        try:
+            # Writers not using `writing` (e.g. the GUI thread) may still
+            # change the collection, so the copy is of current columns
+            while True:
+                columns = self.columns()
+                with self.lock_:
+                    if self.columns_ is not None and \
+                        self.columns_[0] == self.generation and \
+                        self.columns_[1] is columns:
+                        return self.generation, copy_columns(columns)
+        finally:
+            with self.lock_:
+                self.blocking -= 1
+                self.idle.notify_all()
+
+    # Records
+    def set_records(self, records):
+        self.records = records
+
+        # Check lifts already entered or validated
+        for lifter in self.map_.itervalues():
+            for index, record in enumerate(lifter.lift_record):
+                if record != Lifter.BLANK_CODE:
+                    records.update(lifter, index)
+
+        records.refresh(self.map_)
+
+        self.generation += 1
+
+    # Teams
+    def set_team_scoring(self, top, team_scoring):
+        self.top = top
+        self.team_scoring = team_scoring
+
+        self.generation += 1
+
+    def team_label(self, lifter):
+        # Key of the lifter's team in `overall_info`
+        return self.team_scoring.label(lifter.team, lifter.gender)
+
+    def team_code(self, team):
+        # Intern `team`
+        try:
+            return self.team_codes[team]
+        except KeyError:
+            code = len(self.team_names)
+            self.team_codes[team] = code
+            self.team_names.append(team)
+            return code
+
+    # Columns
+    def columns(self):
+        # Columnar view of all lifters (ordered by lifter_id), rebuilt at
+        # most once per generation
+        generation = self.generation
+        if self.columns_ is not None and self.columns_[0] == generation:
+            return self.columns_[1]
+
+        map_ = self.map_
+        lifters = [map_[i] for i in sorted(map_)]
+        n = len(lifters)
+
+        lifter_id = np.array([l.lifter_id for l in lifters], dtype=int)
+        gender = np.array([l.gender for l in lifters], dtype='S1')
+        weight = np.array([l.weight for l in lifters], dtype=float)
+        weight_class = weight_class_codes(gender, weight)
+
+        # Teams may be changed (and interned) by other threads
+        with self.lock_:
+            team = np.array([self.team_code(l.team) for l in lifters],
+                dtype=int)
+
+        # Writable N x 9 lifts and records (updated in place by
+        # `lifter_changed`)
+        lifts = np.frombuffer(
+            bytearray(''.join([l.lifts.tostring() for l in lifters])),
+            dtype=float).reshape(n, 9)
+
+        records = np.frombuffer(
+            bytearray().join([l.lift_record for l in lifters]),
+            dtype=np.uint8).reshape(n, 9)
+
+        withdrawn = np.array([l.withdrawn for l in lifters], dtype=bool)
+
+        columns = Columns(lifters, lifter_id, gender, weight, weight_class,
+                          team, lifts, records, withdrawn,
+                          np.empty(n, dtype=int), np.empty(n, dtype=float),
+                          np.empty(n, dtype=float), division_codes(lifters))
+        score_rows(columns)
+
+        # Only cached if nothing changed while building
+        with self.lock_:
+            if self.generation == generation:
+                self.columns_ = (generation, columns)
+
+        return columns
 
     def sorted_by(self, *el):
         # Initialise list
@@ -259,33 +908,108 @@ class LifterCollection(object):
 
         return l
 
+    def cached(self, key, function):
+        # Return `function(self)`, evaluated at most once per generation
+        try:
+            generation, value = self.cache_[key]
+        except KeyError:
+            generation = None
+
+        current = self.generation
+        if generation != current:
+            value = function(self)
+            self.cache_[key] = (current, value)
+
+        return value
+
+    def needs(self):
+        # Attempts each lifter needs (see `solver.solve`)
+        from solver import solve
+        return self.cached('needs', solve)
+
+    def standings(self):
+        # Reachable team totals (see `clinch.standings`)
+        from clinch import standings
+        return self.cached('standings', standings)
+
+    def division_standings(self):
+        # Places in every division and weight class (see
+        # `divisions.standings`)
+        from divisions import standings
+        return self.cached('division_standings', standings)
+
+    def ranked(self):
+        # Order of `columns()` by points (descending), then weight and
+        # lifter_id
+        c = self.columns()
+        return np.lexsort((c.lifter_id, c.weight, -c.points))
+
+    def team_scores(self):
+        # Team totals indexed by group code, the counting rows of
+        # `columns()` ordered by group and then score, the score of every
+        # lifter and the group labels (cached per generation, so not to be
+        # modified)
+        def team_scores(collection):
+            c = collection.columns()
+            totals, rows, scores = collection.team_scoring.score(c,
+                collection.top, len(collection.team_names))
+            labels = collection.team_scoring.group_labels(
+                collection.team_names)
+
+            return totals, rows, scores, labels
+
+        return self.cached('team_scores', team_scores)
+
+    def standing(self, lifter):
+        # Label and total of the team of `lifter` and the (label, total) of
+        # the best team, as `overall_info`
+        c = self.columns()
+        totals, rows, scores, labels = self.team_scores()
+        group, n_groups = self.team_scoring.groups(c, len(self.team_names))
+
+        row = np.searchsorted(c.lifter_id, lifter.lifter_id)
+        team = group[row]
+
+        best_total = (None, 0.)
+        if len(totals) > 0:
+            best = np.argmax(totals)
+            if totals[best] > 0.:
+                best_total = (labels[best], totals[best])
+
+        return labels[team], totals[team], best_total
+
     def overall_info(self):
-        # Get lifters sorted by points
-        # Guarantees correct order in return dictionary
-        lifters = self.sorted_by('REV_points', 'weight')
+        c = self.columns()
+        totals, rows, scores, labels = self.team_scores()
+        group, n_groups = self.team_scoring.groups(c, len(self.team_names))
 
-        # Assemble team info dictionary
+        # Assemble team info dictionary of total, counting lifters and their
+        # contributions
         ret = {}
-        for lifter in lifters:
+        for row in rows:
+            team = labels[group[row]]
             try:
-                l = ret[lifter.team]
+                l = ret[team]
             except KeyError:
-                l = [0., []]
-                ret[lifter.team] = l
+                l = [totals[group[row]], [], []]
+                ret[team] = l
 
-            if len(l[1]) >= self.top:
-                continue
+            l[1].append(c.lifters[row])
+            l[2].append(scores[row])
 
-            l[0] += lifter.points
-            l[1].append(lifter)
+        # Get best lifter and team
+        ranked = self.ranked()
+        if len(ranked) > 0:
+            best_lifter = c.lifters[ranked[0]]
+        else:
+            best_lifter = None
 
-        # Get best team
         best_total = (None, 0.)
         for team, info in ret.iteritems():
             if info[0] > best_total[1]:
                 best_total = (team, info[0])
 
-        return lifters[0], best_total, ret
+        return best_lifter, best_total, ret
 
     def flights(self):
         flights = []
@@ -304,12 +1028,24 @@ class LifterCollection(object):
         return [getattr(self, attr) for attr in self.ATTRIBUTES]
 
     def __setstate__(self, state):
-        for i, attr in enumerate(self.ATTRIBUTES):
+        # Older pickles have no `team_scoring` or `records`
+        self.team_scoring = scoring.TopPoints()
+        self.records = None
+
+        for i, attr in enumerate(self.ATTRIBUTES[:len(state)]):
             setattr(self, attr, state[i])
 
-        # Reset weak references
+        self.setup_sync()
+        self.reset_cache()
+
+        # Reset weak references and team codes
         for lifter in self.map_.itervalues():
             lifter.collection = weakref.ref(self)
+            self.team_code(lifter.team)
+
+        # Record attempts saved by older versions may be stale
+        if self.records is not None:
+            self.records.refresh(self.map_)
 
 # Tests
 
@@ -7,9 +7,10 @@
 ##########################################
 
 # Imports
-import logging, sys
+import logging, sys, time, threading
 from logging import getLogger, Handler
-from PyQt4 import QtGui
+from collections import deque
+from PyQt4 import QtCore, QtGui
 
 # basic_formatter
 BASIC_FMT = '<%(asctime)s> %(levelname)s::%(module)s.%(funcName)s [%(lineno)d]:: %(message)s'
@@ -24,56 +25,230 @@ basic_logger = logging.getLogger('basic')
 basic_logger.setLevel(logging.INFO)
 basic_logger.addHandler(basic_handler)
 
-# QtHandler
-class QtHandler(Handler):
-    MESSAGE_BOXES = {
-        logging.DEBUG : QtGui.QMessageBox.information,
-        logging.INFO : QtGui.QMessageBox.information,
-        logging.WARNING : QtGui.QMessageBox.warning,
-        logging.ERROR : QtGui.QMessageBox.critical,
-        logging.CRITICAL : QtGui.QMessageBox.critical
-    }
+# qt_formatter
+GUI_FMT = '<%(asctime)s> %(module)s.%(funcName)s [%(lineno)d]::\n%(message)s'
+GUI_DATEFMT = '%H:%M:%S'
+qt_formatter = logging.Formatter(GUI_FMT, GUI_DATEFMT)
 
-    def __init__(self, parent=None):
+# NotificationHandler
+class NotificationHandler(Handler):
+    # Records are only queued here (from any thread) and are formatted and
+    # shown by `LogPanel` in the GUI thread
+    # Records below CRITICAL are limited to RATE per second (with bursts of
+    # up to BURST), and the rest are counted as suppressed, as are the
+    # oldest records dropped when more than MAX_QUEUED are waiting
+    RATE = 10.
+    BURST = 50.
+    MAX_QUEUED = 1000
+
+    def __init__(self, rate=RATE, burst=BURST):
         Handler.__init__(self)
-        self.parent = parent
+
+        self.rate = rate
+        self.burst = burst
+
+        self.tokens = burst
+        self.last = time.time()
+        self.suppressed = 0
+
+        self.queue = deque(maxlen=self.MAX_QUEUED)
+        self.rate_lock = threading.Lock()
+
+    def allow(self):
+        # Token bucket
+        with self.rate_lock:
+            now = time.time()
+            self.tokens = min(self.burst,
+                self.tokens + (now - self.last) * self.rate)
+            self.last = now
+
+            if self.tokens < 1.:
+                self.suppressed += 1
+                return False
+
+            self.tokens -= 1.
+            return True
 
     def emit(self, record):
-        # Don't emit at levels with no message box
-        try:
-            msg_box = self.MESSAGE_BOXES[record.levelno]
-        except KeyError:
+        if record.levelno >= logging.CRITICAL or self.allow():
+            with self.rate_lock:
+                if len(self.queue) == self.queue.maxlen:
+                    self.suppressed += 1
+                self.queue.append(record)
+
+    def take(self):
+        # Queued records and the number suppressed since the last take
+        records = []
+        while True:
+            try:
+                records.append(self.queue.popleft())
+            except IndexError:
+                break
+
+        with self.rate_lock:
+            suppressed, self.suppressed = self.suppressed, 0
+
+        return records, suppressed
+
+# LogBuffer
+class LogBuffer(object):
+    # Bounded ring buffer of [created, levelno, message, count] where
+    # repeats of the same level and message within DEDUPLICATE_WINDOW
+    # seconds increment the count of the first
+    MAX_ENTRIES = 500
+    DEDUPLICATE_WINDOW = 10.
+
+    def __init__(self, max_entries=MAX_ENTRIES,
+        deduplicate_window=DEDUPLICATE_WINDOW):
+        self.entries = deque(maxlen=max_entries)
+        self.deduplicate_window = deduplicate_window
+
+        # Latest entry of each (levelno, message)
+        self.latest = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def add(self, created, levelno, message):
+        # Add and return the entry, and whether it is a repeat
+        key = (levelno, message)
+
+        entry = self.latest.get(key)
+        if entry is not None and \
+            created - entry[0] <= self.deduplicate_window:
+            entry[3] += 1
+            return entry, True
+
+        # Entries dropped from the buffer are not repeated
+        if len(self.entries) == self.entries.maxlen:
+            oldest = self.entries[0]
+            if self.latest.get((oldest[1], oldest[2])) is oldest:
+                del self.latest[(oldest[1], oldest[2])]
+
+        entry = [created, levelno, message, 1]
+        self.entries.append(entry)
+        self.latest[key] = entry
+
+        return entry, False
+
+# LogPanel
+class LogPanel(QtGui.QDockWidget):
+    # Non-modal panel of the records of `notification_handler`, with modal
+    # message boxes only for CRITICAL records
+    DRAIN_INTERVAL = 250   # ms
+
+    BRUSHES = {
+        logging.WARNING : QtGui.QBrush(QtGui.QColor(160, 100, 0)),
+        logging.ERROR : QtGui.QBrush(QtCore.Qt.red),
+        logging.CRITICAL : QtGui.QBrush(QtCore.Qt.red),
+    }
+
+    def __init__(self, parent=None, handler=None):
+        QtGui.QDockWidget.__init__(self, 'Log', parent)
+
+        if handler is None:
+            handler = notification_handler
+        self.handler = handler
+
+        self.buffer = LogBuffer()
+
+        # List item of each entry in the buffer
+        self.items = {}
+
+        self.setup_ui()
+
+        self.drain_timer = QtCore.QTimer(self)
+        self.drain_timer.timeout.connect(self.drain)
+        self.drain_timer.setInterval(self.DRAIN_INTERVAL)
+        self.drain_timer.start()
+
+    def setup_ui(self):
+        self.list_widget = QtGui.QListWidget(self)
+        self.list_widget.setUniformItemSizes(True)
+        self.setWidget(self.list_widget)
+
+        self.setObjectName('log_panel')
+
+    def entry_text(self, entry):
+        created, levelno, message, count = entry
+
+        text = '%s %s: %s' % (
+            time.strftime(GUI_DATEFMT, time.localtime(created)),
+            logging.getLevelName(levelno), message)
+
+        if count > 1:
+            text += ' (x%d)' % count
+
+        return text
+
+    def drain(self):
+        records, suppressed = self.handler.take()
+
+        for record in records:
+            self.add_entry(record.created, record.levelno,
+                record.getMessage())
+
+            if record.levelno >= logging.CRITICAL:
+                QtGui.QMessageBox.critical(self.parent(), record.levelname,
+                    qt_formatter.format(record))
+
+        if suppressed > 0:
+            self.add_entry(time.time(), logging.WARNING,
+                '%d messages suppressed' % suppressed)
+
+    def add_entry(self, created, levelno, message):
+        oldest = None
+        if len(self.buffer) == self.buffer.entries.maxlen:
+            oldest = self.buffer.entries[0]
+
+        entry, repeat = self.buffer.add(created, levelno, message)
+
+        if repeat:
+            self.items[id(entry)].setText(self.entry_text(entry))
             return
 
-        msg_box(
-            self.parent,
-            record.levelname,
-            self.format(record)
-        )
+        # Drop the item of the entry no longer buffered
+        if oldest is not None:
+            del self.items[id(oldest)]
+            self.list_widget.takeItem(0)
 
-# qt_formatter
-GUI_FMT = '<%(asctime)s> %(module)s.%(funcName)s [%(lineno)d]::\n%(message)s'
-GUI_DATEFMT = '%H:%M:%S'
-qt_formatter = logging.Formatter(GUI_FMT, GUI_DATEFMT)
+        item = QtGui.QListWidgetItem(self.entry_text(entry))
+        brush = self.BRUSHES.get(levelno)
+        if brush is not None:
+            item.setForeground(brush)
+
+        self.list_widget.addItem(item)
+        self.items[id(entry)] = item
+        self.list_widget.scrollToBottom()
+
+        # Show the panel for warnings and errors
+        if levelno >= logging.WARNING and not self.isVisible():
+            self.show()
 
 # qt_logger
 qt_logger = logging.getLogger('qt')
 qt_logger.setLevel(logging.INFO)
 
+# notification_handler
+# Records of both loggers are shown in the `LogPanel`
+notification_handler = NotificationHandler()
+qt_logger.addHandler(notification_handler)
+basic_logger.addHandler(notification_handler)
+
 # set_qt_parent
-qt_handler = None
+log_panel = None
 def set_qt_parent(parent):
-    # Remove and replace past qt_handler
-    global qt_handler
-
-    if qt_handler is not None:
-        qt_logger.removeHandler(qt_handler)
-
-    qt_handler = QtHandler(parent)
-    qt_handler.setFormatter(qt_formatter)
+    # Create the log panel of `parent` (a `QMainWindow`)
+    global log_panel
 
-    qt_logger.addHandler(qt_handler)
+    if log_panel is not None:
+        log_panel.drain_timer.stop()
+        log_panel.setParent(None)
 
-# qt_handler
-set_qt_parent(None)
+    log_panel = LogPanel(parent)
+    parent.addDockWidget(QtCore.Qt.BottomDockWidgetArea, log_panel)
 
+    return log_panel
@@ -8,14 +8,22 @@
 
 # Imports
 import sys
+import argparse
 from PyQt4 import QtGui
 from mainwindow import MainWindow
 
 # main
 def main():
-    qapp = QtGui.QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description='Powerlifting Meet Manager')
+    parser.add_argument('--port', type=int, default=None,
+        help='accept attempts and decisions from clients on this port')
+    parser.add_argument('--snapshot', default=None,
+        help='publish the standings to this file for other processes')
+    args, qt_argv = parser.parse_known_args()
 
-    mainwindow = MainWindow()
+    qapp = QtGui.QApplication(sys.argv[:1] + qt_argv)
+
+    mainwindow = MainWindow(port=args.port, snapshot_path=args.snapshot)
     mainwindow.show()
 
     qapp.exec_()
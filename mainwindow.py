@@ -10,8 +10,13 @@
 from PyQt4 import QtCore, QtGui
 import StringIO, traceback, sys
 
-from lifter import Lifter, LifterCollection
-from table import TableModel, TableView
+from lifter import Lifter, LifterCollection, DIVISIONS
+from table import TableModel, TableView, PaceDialog, LoadingPanel, \
+    MeetLoader
+import scoring
+import pickle_
+import ingest
+import snapshot
 
 import os
 
@@ -57,6 +62,20 @@ class AddLifterDialog(QtGui.QDialog):
 
             setattr(self, ti[0] + '_edit', edit)
 
+        # Divisions
+        offset = len(self.TRANSLATE_ATTRIBUTE)
+        for i, division in enumerate(DIVISIONS):
+            label = QtGui.QLabel(division.label)
+            combo = QtGui.QComboBox()
+            combo.addItems(list(division.values))
+            combo.setCurrentIndex(division.values.index(division.default))
+            label.setBuddy(combo)
+
+            input_layout.addWidget(label, offset + i, 0)
+            input_layout.addWidget(combo, offset + i, 1)
+
+            setattr(self, division.attribute + '_combo', combo)
+
         # Construct button layout
         self.add_pb = QtGui.QPushButton('&Add')
 
@@ -106,6 +125,10 @@ class AddLifterDialog(QtGui.QDialog):
 
             d[ti[0]] = val
 
+        for division in DIVISIONS:
+            combo = getattr(self, division.attribute + '_combo')
+            d[division.attribute] = division.values[combo.currentIndex()]
+
         # Construct lifter
         try:
             self.lifter_ = Lifter(**d)
@@ -119,27 +142,178 @@ class AddLifterDialog(QtGui.QDialog):
         self.accept()
         return
 
+# OptionsDialog
+class OptionsDialog(QtGui.QDialog):
+    def __init__(self, parent=None, flags=QtCore.Qt.Dialog):
+        QtGui.QDialog.__init__(self, parent, flags)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        # Team scoring strategy
+        self.strategy_combo = QtGui.QComboBox()
+        for strategy in scoring.STRATEGIES:
+            self.strategy_combo.addItem(strategy.NAME)
+
+        # Counting lifters
+        self.top_spin = QtGui.QSpinBox()
+        self.top_spin.setRange(1, 999)
+
+        # Maximum counting lifters per weight class (0 is no cap)
+        self.class_cap_spin = QtGui.QSpinBox()
+        self.class_cap_spin.setRange(0, 999)
+        self.class_cap_spin.setSpecialValueText('No limit')
+
+        # Placing points
+        self.placing_points_edit = QtGui.QLineEdit()
+
+        # Separate men and women
+        self.by_gender_check = QtGui.QCheckBox()
+
+        input_layout = QtGui.QGridLayout()
+        widgets = [
+            ('&Team scoring', self.strategy_combo),
+            ('&Counting lifters', self.top_spin),
+            ('Max per &class', self.class_cap_spin),
+            ('&Placing points', self.placing_points_edit),
+            ('Separate &men/women', self.by_gender_check),
+        ]
+
+        for i, (title, widget) in enumerate(widgets):
+            label = QtGui.QLabel(title)
+            label.setBuddy(widget)
+
+            input_layout.addWidget(label, i, 0)
+            input_layout.addWidget(widget, i, 1)
+
+        # Enable placing points only for the placing strategy
+        self.strategy_combo.currentIndexChanged.connect(
+            self.slot_strategy_changed
+        )
+
+        # Construct button layout
+        buttons = QtGui.QDialogButtonBox(
+            QtGui.QDialogButtonBox.Ok | QtGui.QDialogButtonBox.Cancel
+        )
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+
+        # Construct main layout
+        main_layout = QtGui.QVBoxLayout()
+        main_layout.addLayout(input_layout)
+        main_layout.addWidget(buttons)
+        self.setLayout(main_layout)
+
+        # Title
+        self.setWindowTitle('Options')
+
+    def set_team_scoring(self, top, team_scoring):
+        self.strategy_combo.setCurrentIndex(
+            scoring.STRATEGIES.index(team_scoring.__class__)
+        )
+        self.top_spin.setValue(top)
+
+        class_cap = team_scoring.class_cap
+        self.class_cap_spin.setValue(class_cap if class_cap is not None else 0)
+
+        placing_points = getattr(team_scoring, 'placing_points',
+            scoring.PlacingPoints.DEFAULT_POINTS)
+        self.placing_points_edit.setText(
+            ', '.join(['%g' % p for p in placing_points])
+        )
+
+        self.by_gender_check.setChecked(team_scoring.by_gender)
+
+        self.slot_strategy_changed(self.strategy_combo.currentIndex())
+
+    def team_scoring(self):
+        # Return the counting lifters and team scoring strategy
+        top = self.top_spin.value()
+
+        class_cap = self.class_cap_spin.value()
+        if class_cap == 0:
+            class_cap = None
+
+        by_gender = self.by_gender_check.isChecked()
+
+        strategy = scoring.STRATEGIES[self.strategy_combo.currentIndex()]
+        if strategy is scoring.PlacingPoints:
+            text = str(self.placing_points_edit.text())
+            try:
+                placing_points = [float(p) for p in text.split(',')]
+            except ValueError:
+                logger.error("Failure in conversion of placing points '%s'",
+                    text)
+                return None
+
+            team_scoring = strategy(placing_points, by_gender, class_cap)
+        else:
+            team_scoring = strategy(by_gender, class_cap)
+
+        return top, team_scoring
+
+    # Slots
+    def slot_strategy_changed(self, index):
+        self.placing_points_edit.setEnabled(
+            scoring.STRATEGIES[index] is scoring.PlacingPoints
+        )
+
+    def accept(self):
+        if self.team_scoring() is None:
+            return
+
+        QtGui.QDialog.accept(self)
+
 # MainWindow
 class MainWindow(QtGui.QMainWindow):
-    TEMP_FILENAME = '.powerlifting_temp.dat'
+    # Autosave (its extension is also `replay.AUTOSAVE_SUFFIX`)
+    TEMP_FILENAME = '.powerlifting_temp.dat.gz'
+
+    # Saved meets (compressed by extension)
+    MEET_FILTER = 'Meets (*.dat *.dat.gz *.dat.bz2 *.dat.xz)'
     AUTO_INTERVAL = 600000   # 10 minutes
+    INGEST_INTERVAL = 200    # ms
+    SNAPSHOT_INTERVAL = 100  # ms
 
-    def __init__(self, parent=None, flags=QtCore.Qt.Window):
+    def __init__(self, port=None, snapshot_path=None, parent=None,
+        flags=QtCore.Qt.Window):
         QtGui.QMainWindow.__init__(self, parent, flags)
 
         self.setup_ui()
 
         self.last_dir = '.'
 
+        # Background load of a meet (see `start_load`)
+        self.loader = None
+        self.load_progress = None
+
+        # Directory of the results web site (updated with the autosave once
+        # exported)
+        self.site_dir = None
+
         # Install global exception handler
         sys.excepthook = self.global_exception_handler
 
         # Initialise autosave
         self.setup_autosave()
 
-        # Set this as the Qt log parent
+        # Accept attempts and decisions from clients on `port`
+        self.ingest_server = None
+        if port is not None:
+            self.setup_ingest(port)
+
+        # Publish the standings to `snapshot_path` for other processes
+        self.snapshot_writer = None
+        if snapshot_path is not None:
+            self.setup_snapshot(snapshot_path)
+
+        # Set this as the Qt log parent (with a log panel)
         log.set_qt_parent(self)
 
+        # Plates of the next attempts
+        self.loading_panel = LoadingPanel(self.table_model, parent=self)
+        self.addDockWidget(QtCore.Qt.RightDockWidgetArea, self.loading_panel)
+
     def setup_ui(self):
         # Set title
         self.setWindowTitle('Powerlifting Meet Manager')
@@ -169,11 +343,28 @@ class MainWindow(QtGui.QMainWindow):
         self.pb_save_results = QtGui.QPushButton('&Save')
         self.pb_load_results = QtGui.QPushButton('&Load')
         self.pb_export_results = QtGui.QPushButton('&Export')
+        self.pb_options = QtGui.QPushButton('&Options')
+        self.pb_records = QtGui.QPushButton('Re&cords')
+        self.pb_pace = QtGui.QPushButton('&Pace')
+
+        export_menu = QtGui.QMenu(self)
+        export_menu.addAction('&Results', self.export)
+        export_menu.addAction('&Awards', self.export_awards)
+        export_menu.addAction('Web &site', self.export_site)
+        self.pb_export_results.setMenu(export_menu)
+
+        records_menu = QtGui.QMenu(self)
+        records_menu.addAction('&Load records', self.load_records)
+        records_menu.addAction('&Export records', self.export_records)
+        self.pb_records.setMenu(records_menu)
 
         layout_control = QtGui.QHBoxLayout()
         layout_control.addWidget(self.pb_save_results)
         layout_control.addWidget(self.pb_load_results)
         layout_control.addWidget(self.pb_export_results)
+        layout_control.addWidget(self.pb_options)
+        layout_control.addWidget(self.pb_records)
+        layout_control.addWidget(self.pb_pace)
 
         grp_control = QtGui.QGroupBox('Control')
         grp_control.setLayout(layout_control)
@@ -181,11 +372,28 @@ class MainWindow(QtGui.QMainWindow):
         # Setup the control group signals
         self.pb_load_results.clicked.connect(self.load)
         self.pb_save_results.clicked.connect(self.save)
-        self.pb_export_results.clicked.connect(self.export)
+        self.pb_options.clicked.connect(self.options)
+        self.pb_pace.clicked.connect(self.show_pace)
+
+        # Pace dialog (non-modal, created when first shown)
+        self.pace_dialog = None
+
+        # Setup the search group
+        self.le_search = QtGui.QLineEdit()
+        self.le_search.setPlaceholderText('Name or team')
+
+        layout_search = QtGui.QHBoxLayout()
+        layout_search.addWidget(self.le_search)
+
+        grp_search = QtGui.QGroupBox('Search')
+        grp_search.setLayout(layout_search)
+
+        self.le_search.textChanged.connect(self.table_view.set_search)
 
         # Set the header layout
         layout_header = QtGui.QHBoxLayout()
         layout_header.addWidget(grp_lifter)
+        layout_header.addWidget(grp_search)
         layout_header.addStretch(1)
         layout_header.addWidget(grp_control)
 
@@ -246,9 +454,50 @@ class MainWindow(QtGui.QMainWindow):
         # Save the model to the temp filename
         self.table_model.save(self.TEMP_FILENAME)
 
+        # Update the changed pages of the web site
+        if self.site_dir is not None:
+            self.table_model.export_site(self.site_dir)
+
         # Unlock mutex
         self.auto_mutex.unlock()
 
+    # Ingestion
+    def setup_ingest(self, port):
+        self.ingest_queue = ingest.IngestQueue()
+        self.ingest_server = ingest.IngestServer(self.ingest_queue, port)
+        self.ingest_server.start()
+
+        # Apply the submissions queued by the server in batches
+        self.ingest_timer = QtCore.QTimer()
+        self.ingest_timer.timeout.connect(self.apply_ingested)
+        self.ingest_timer.setInterval(self.INGEST_INTERVAL)
+        self.ingest_timer.start()
+
+    def apply_ingested(self):
+        changed = self.ingest_queue.apply_pending(
+            self.table_model.lifters_map)
+
+        if changed:
+            self.table_model.lifters_changed(changed)
+
+    # Snapshot
+    def setup_snapshot(self, path):
+        self.snapshot_writer = snapshot.SnapshotWriter(path)
+
+        # Changes within SNAPSHOT_INTERVAL are published together
+        self.snapshot_timer = QtCore.QTimer()
+        self.snapshot_timer.setSingleShot(True)
+        self.snapshot_timer.setInterval(self.SNAPSHOT_INTERVAL)
+        self.snapshot_timer.timeout.connect(self.publish_snapshot)
+
+        self.table_model.model_changed.connect(self.snapshot_timer.start)
+        self.table_model.modelReset.connect(self.snapshot_timer.start)
+
+        self.publish_snapshot()
+
+    def publish_snapshot(self):
+        self.snapshot_writer.publish(self.table_model.lifters_map)
+
     # Close
     def closeEvent(self, event):
         result = QtGui.QMessageBox.question(self,
@@ -261,8 +510,18 @@ class MainWindow(QtGui.QMainWindow):
         if result != QtGui.QMessageBox.Yes:
             event.ignore()
         else:
-            # Disable autosave
-            self.set_autosave(False)
+            # Stop loading (autosave is already disabled)
+            if self.loader is not None:
+                self.loader.cancel()
+                self.loader.wait()
+            else:
+                # Disable autosave
+                self.set_autosave(False)
+
+            # Stop ingestion
+            if self.ingest_server is not None:
+                self.ingest_timer.stop()
+                self.ingest_server.stop()
 
             # Unregister exception hook
             sys.excepthook = sys.__excepthook__
@@ -283,7 +542,7 @@ class MainWindow(QtGui.QMainWindow):
 
     def remove_lifter(self):
         # Get active lifter
-        index = self.table_view.currentIndex()
+        index = self.table_view.current_source_index()
 
         lifter_info = self.table_model.index_to_lifter(index)
         if lifter_info is None:
@@ -308,7 +567,7 @@ class MainWindow(QtGui.QMainWindow):
     # Control button slots
     def save(self):
         full_path = QtGui.QFileDialog.getSaveFileName(
-            self, 'Save', self.last_dir, '*.dat'
+            self, 'Save', self.last_dir, self.MEET_FILTER
         )
 
         if full_path.isEmpty():
@@ -318,16 +577,21 @@ class MainWindow(QtGui.QMainWindow):
         dir_, filename = os.path.split(str(full_path))
         self.last_dir = dir_
 
+        # Keep a compressed extension, otherwise save as .dat
         root, ext = os.path.splitext(filename)
+        if ext in pickle_.EXTENSIONS:
+            root = os.path.splitext(root)[0]
+        else:
+            ext = ''
 
         # Put back together
-        full_path = os.path.join(dir_, root + '.dat')
+        full_path = os.path.join(dir_, root + '.dat' + ext)
 
         self.table_model.save(full_path)
 
     def load(self):
         full_path = QtGui.QFileDialog.getOpenFileName(
-            self, 'Load', self.last_dir, '*.dat'
+            self, 'Load', self.last_dir, self.MEET_FILTER
         )
 
         if full_path.isEmpty():
@@ -338,7 +602,75 @@ class MainWindow(QtGui.QMainWindow):
         dir_, filename = os.path.split(full_path)
         self.last_dir = dir_
 
-        self.table_model.load(full_path)
+        self.start_load(full_path)
+
+    # Background loading
+    def start_load(self, path):
+        # Load on a thread, showing the lifters as they arrive (the meet can
+        # be viewed and edited, but not saved or replaced, until loaded)
+        self.set_loading(True)
+
+        self.loader = MeetLoader(path, self)
+        self.loader.progress.connect(self.load_progressed)
+        self.loader.loaded.connect(self.table_model.begin_load)
+        self.loader.chunk.connect(self.load_chunk)
+        self.loader.failed.connect(self.load_failed)
+        self.loader.finished.connect(self.load_finished)
+
+        self.load_progress = QtGui.QProgressDialog(
+            'Reading %s' % os.path.basename(path), 'Cancel', 0, 0, self)
+        self.load_progress.setWindowTitle('Load')
+        self.load_progress.setWindowModality(QtCore.Qt.NonModal)
+        self.load_progress.setAutoClose(False)
+        self.load_progress.setAutoReset(False)
+        self.load_progress.canceled.connect(self.loader.cancel)
+        self.load_progress.show()
+
+        self.loader.start()
+
+    def set_loading(self, loading):
+        # Autosave (a partial meet), ingestion and saving are paused while
+        # loading
+        for button in [self.pb_lifter_add, self.pb_lifter_remove,
+                       self.pb_save_results, self.pb_load_results,
+                       self.pb_export_results, self.pb_options,
+                       self.pb_records]:
+            button.setEnabled(not loading)
+
+        self.set_autosave(not loading)
+
+        if self.ingest_server is not None:
+            if loading:
+                self.ingest_timer.stop()
+            else:
+                self.ingest_timer.start()
+
+    def load_progressed(self, label, done, total):
+        self.load_progress.setLabelText(label)
+        self.load_progress.setMaximum(total)
+        self.load_progress.setValue(done)
+
+    def load_chunk(self, lifters):
+        self.table_model.insert_lifters(lifters)
+        self.loader.chunk_inserted()
+
+    def load_failed(self, message):
+        logger.error('%s', message)
+
+    def load_finished(self):
+        # Restore the previous meet if cancelled after lifters were shown
+        if self.loader.started_load:
+            self.table_model.end_load(cancelled=self.loader.cancelled)
+
+        # (Closing the progress dialog cancels it)
+        self.load_progress.canceled.disconnect(self.loader.cancel)
+        self.load_progress.close()
+        self.load_progress = None
+
+        self.loader.deleteLater()
+        self.loader = None
+
+        self.set_loading(False)
 
     def export(self):
         full_path = QtGui.QFileDialog.getSaveFileName(
@@ -358,12 +690,97 @@ class MainWindow(QtGui.QMainWindow):
 
         self.table_model.export(full_path)
 
+    def export_awards(self):
+        full_path = QtGui.QFileDialog.getSaveFileName(
+            self, 'Export awards', self.last_dir, '*.html'
+        )
+
+        if full_path.isEmpty():
+            return
+
+        # Decompose full path (e.g. for checks)
+        dir_, filename = os.path.split(str(full_path))
+        self.last_dir = dir_
+
+        root, ext = os.path.splitext(filename)
+
+        full_path = os.path.join(dir_, root + '.html')
+
+        self.table_model.export_awards(full_path)
+
+    def export_site(self):
+        dir_ = QtGui.QFileDialog.getExistingDirectory(
+            self, 'Export web site', self.last_dir
+        )
+
+        if dir_.isEmpty():
+            return
+
+        self.site_dir = str(dir_)
+
+        result = self.table_model.export_site(self.site_dir)
+        logger.info('Web site: %d pages written, %d removed, %d unchanged',
+            len(result.written), len(result.removed), len(result.unchanged))
+
+    def load_records(self):
+        full_path = QtGui.QFileDialog.getOpenFileName(
+            self, 'Load records', self.last_dir, '*.txt'
+        )
+
+        if full_path.isEmpty():
+            return
+
+        # Decompose full path
+        full_path = str(full_path)
+        dir_, filename = os.path.split(full_path)
+        self.last_dir = dir_
+
+        self.table_model.load_records(full_path)
+
+    def export_records(self):
+        full_path = QtGui.QFileDialog.getSaveFileName(
+            self, 'Export records', self.last_dir, '*.txt'
+        )
+
+        if full_path.isEmpty():
+            return
+
+        # Decompose full path (e.g. for checks)
+        dir_, filename = os.path.split(str(full_path))
+        self.last_dir = dir_
+
+        root, ext = os.path.splitext(filename)
+
+        full_path = os.path.join(dir_, root + '.txt')
+
+        self.table_model.export_records(full_path)
+
+    def options(self):
+        collection = self.table_model.lifters_map
+
+        # Show the options dialog for the current meet
+        dlg = OptionsDialog(self)
+        dlg.set_team_scoring(collection.top, collection.team_scoring)
+        dlg.exec_()
+
+        if dlg.result():
+            top, team_scoring = dlg.team_scoring()
+            self.table_model.set_team_scoring(top, team_scoring)
+
+    def show_pace(self):
+        if self.pace_dialog is None:
+            self.pace_dialog = PaceDialog(self.table_model, self)
+
+        self.pace_dialog.show()
+        self.pace_dialog.raise_()
+        self.pace_dialog.activateWindow()
+
     @classmethod
     def global_exception_handler(cls, type_, exception, tb):
         string_buffer = StringIO.StringIO()
         traceback.print_tb(tb, None, string_buffer)
 
-        logger.error(
+        logger.critical(
             'Unhandled Exception\n%s, "%s"\n:: %s',
             type_.__name__,
             exception.message,
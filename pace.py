@@ -0,0 +1,164 @@
+##########################################
+# File: pace.py                          #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Meet pace from the times attempts were entered and validated (see
+# `Lifter.times`), computed over the whole meet at once: attempts per
+# minute, latency from entry to decision, and the duration and predicted
+# finish of each flight
+
+# Imports
+from collections import namedtuple
+import time
+import numpy as np
+
+from lifter import Lifter, clock
+from scoring import group_order
+
+# all
+__all__ = [
+    'Pace',
+    'pace',
+    'wall_time'
+]
+
+# Latency percentiles
+PERCENTILES = [50, 90, 99]
+
+# Attempts per minute are measured over the last RECENT attempts
+RECENT = 20
+
+# Pace
+# Arrays over `flights`: `attempts` decided and `remaining`, `started`
+# (first entry) and `last` (last decision) times, `rate` (attempts per
+# minute), `latency` (seconds, flights x PERCENTILES) and predicted `finish`
+# times (NaN where unknown); `meet_rate` and `meet_latency` are over the
+# whole meet
+Pace = namedtuple('Pace', 'flights attempts remaining started last rate '
+                  'latency finish meet_rate meet_latency')
+
+# times_array
+def times_array(lifters):
+    # N x 18 times of `lifters`
+    return np.frombuffer(
+        bytearray(''.join([l.times.tostring() for l in lifters])),
+        dtype=float).reshape(len(lifters), 18)
+
+# group_rate
+def group_rate(codes, times, n_groups, recent=RECENT):
+    # Events per minute of each group over its last `recent` events (NaN
+    # for fewer than two)
+    order, rank = group_order(codes, times)
+    codes, times = codes[order], times[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    ends = np.cumsum(counts)
+    starts = np.maximum(ends - counts, ends - recent)
+
+    rate = np.empty(n_groups, dtype=float)
+    rate.fill(np.nan)
+
+    i = np.flatnonzero(counts >= 2)
+    span = times[ends[i] - 1] - times[starts[i]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate[i] = np.where(span > 0.,
+            60. * (ends[i] - 1 - starts[i]) / span, np.nan)
+
+    return rate
+
+# group_percentiles
+def group_percentiles(codes, values, n_groups, percentiles=PERCENTILES):
+    # n_groups x percentiles (nearest rank) of `values` of each group
+    order, rank = group_order(codes, values)
+    values = values[order]
+
+    counts = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+
+    result = np.empty((n_groups, len(percentiles)), dtype=float)
+    result.fill(np.nan)
+
+    i = np.flatnonzero(counts)
+    for j, q in enumerate(percentiles):
+        offset = np.round(q / 100. * (counts[i] - 1)).astype(int)
+        result[i, j] = values[starts[i] + offset]
+
+    return result
+
+# pace
+def pace(collection, now=None):
+    # `Pace` of `collection` at `now` (from `clock`)
+    if now is None:
+        now = clock()
+
+    c = collection.columns()
+
+    times = times_array(c.lifters)
+    entered = times[:, Lifter.ENTERED_OFFSET:Lifter.ENTERED_OFFSET + 9]
+    validated = times[:, Lifter.VALIDATED_OFFSET:Lifter.VALIDATED_OFFSET + 9]
+
+    flight = np.array([l.flight for l in c.lifters], dtype=int)
+    flights, code = np.unique(flight, return_inverse=True)
+    n_flights = len(flights)
+
+    # Attempts (lifter, index) decided with their times
+    completed = np.zeros(c.records.shape, dtype=bool)
+    for record in Lifter.COMPLETED_CODE:
+        completed |= c.records == record
+
+    decided = completed & ~np.isnan(validated)
+    rows = np.nonzero(decided)[0]
+    decided_at = validated[decided]
+    decided_code = code[rows]
+
+    attempts = np.bincount(decided_code, minlength=n_flights)
+
+    # Remaining attempts of lifters still lifting
+    active = c.status == Lifter.ACTIVE
+    remaining = np.bincount(code,
+        weights=(~completed & active[:, np.newaxis]).sum(axis=1),
+        minlength=n_flights).astype(int)
+
+    # First entry and last decision
+    started = np.empty(n_flights, dtype=float)
+    started.fill(np.inf)
+    np.minimum.at(started, code,
+        np.where(np.isnan(entered), np.inf, entered).min(axis=1))
+    started[np.isinf(started)] = np.nan
+
+    last = np.empty(n_flights, dtype=float)
+    last.fill(-np.inf)
+    np.maximum.at(last, decided_code, decided_at)
+    last[np.isinf(last)] = np.nan
+
+    rate = group_rate(decided_code, decided_at, n_flights)
+    meet_rate = group_rate(np.zeros(len(decided_at), dtype=int), decided_at,
+        1)[0]
+
+    # Latency of attempts with both times
+    timed = decided & ~np.isnan(entered)
+    latency_code = code[np.nonzero(timed)[0]]
+    latency = validated[timed] - entered[timed]
+    flight_latency = group_percentiles(latency_code, latency, n_flights)
+    meet_latency = group_percentiles(np.zeros(len(latency), dtype=int),
+        latency, 1)[0]
+
+    # Remaining attempts at the flight's rate (or the meet's if the flight
+    # has too few attempts), from its last decision (or now if not started)
+    finish_rate = np.where(np.isnan(rate), meet_rate, rate)
+    start = np.where(np.isnan(last), now, last)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        finish = start + 60. * remaining / finish_rate
+    finish[remaining == 0] = last[remaining == 0]
+
+    return Pace(flights, attempts, remaining, started, last, rate,
+                flight_latency, finish, meet_rate, meet_latency)
+
+# wall_time
+def wall_time(t):
+    # System time of `t` (from `clock`)
+    return t + (time.time() - clock())
@@ -6,29 +6,235 @@
 #  http://opensource.org/licenses/MIT)   #
 ##########################################
 
+# Pickles, optionally compressed (gzip, bz2 or xz)
+# Compression is chosen on dump by the file extension (or `compression`) and
+# detected on load from the header, and pickles are compressed and
+# decompressed as they are written and read (never whole in memory)
+# Loading can report the bytes read from the file as it goes (and is stopped
+# by an exception raised from the report)
+
 # Imports
 import cPickle
+import bz2
+import zlib
+
+# xz requires the `lzma` module (Python 3.3+, or `backports.lzma`)
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+# Constants
+CHUNK_SIZE = 1 << 16
+LEVEL = 6
+
+# Compression
+# File extension and header magic of each compression
+EXTENSIONS = {
+    '.gz' : 'gzip',
+    '.bz2' : 'bz2',
+    '.xz' : 'xz',
+}
+
+MAGIC = [
+    ('\x1f\x8b', 'gzip'),
+    ('BZh', 'bz2'),
+    ('\xfd7zXZ\x00', 'xz'),
+]
+MAGIC_SIZE = max(len(m) for m, _ in MAGIC)
+
+# compressor
+def compressor(compression, level=LEVEL):
+    if compression == 'gzip':
+        # zlib stream with a gzip header and trailer
+        return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    elif compression == 'bz2':
+        return bz2.BZ2Compressor(max(level, 1))
+    elif compression == 'xz':
+        check_lzma()
+        return lzma.LZMACompressor(preset=level)
+
+    raise ValueError, 'compression "%s" not in %s' % (compression,
+        sorted(EXTENSIONS.values()))
+
+# decompressor
+def decompressor(compression):
+    if compression == 'gzip':
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    elif compression == 'bz2':
+        return bz2.BZ2Decompressor()
+    elif compression == 'xz':
+        check_lzma()
+        return lzma.LZMADecompressor()
+
+    raise ValueError, 'compression "%s" not in %s' % (compression,
+        sorted(EXTENSIONS.values()))
+
+# check_lzma
+def check_lzma():
+    if lzma is None:
+        raise ValueError, 'xz compression requires the lzma module'
+
+# compression_of_path
+def compression_of_path(path):
+    # Compression from the extension of `path` (None if uncompressed)
+    for ext, compression in EXTENSIONS.iteritems():
+        if path.endswith(ext):
+            return compression
+
+    return None
+
+# compression_of_header
+def compression_of_header(header):
+    for magic, compression in MAGIC:
+        if header.startswith(magic):
+            return compression
+
+    return None
+
+# CompressedWriter
+class CompressedWriter(object):
+    def __init__(self, file_, compression, level=LEVEL):
+        self.file = file_
+        self.compressor = compressor(compression, level)
+
+    def write(self, data):
+        compressed = self.compressor.compress(data)
+        if compressed:
+            self.file.write(compressed)
+
+    def close(self):
+        # Flush the compressor (the file is left open)
+        self.file.write(self.compressor.flush())
+
+# DecompressedReader
+class DecompressedReader(object):
+    # Reads decompressed data from `file_` as required, where `header` is
+    # data already read from `file_` (`compression` None reads `file_` as
+    # is), calling `progress` with the bytes read from `file_` after each
+    # chunk
+    def __init__(self, file_, compression, header='', size=None,
+        progress=None):
+        self.file = file_
+        self.decompressor = decompressor(compression) \
+            if compression is not None else None
+
+        # Compressed bytes left to read from `file_` (None to the end)
+        self.size = size
+
+        self.progress = progress
+        self.bytes_read = len(header)
+
+        # Decompressed data and the position read to
+        self.buffer = self.decompress(header) if header else ''
+        self.position = 0
+        self.eof = False
+
+    def decompress(self, data):
+        if self.decompressor is None:
+            return data
+
+        return self.decompressor.decompress(data)
+
+    def fill(self):
+        # Decompress the next chunk (returns False at the end of the file)
+        if self.eof:
+            return False
+
+        n = CHUNK_SIZE if self.size is None else min(CHUNK_SIZE, self.size)
+        chunk = self.file.read(n) if n > 0 else ''
+        if self.size is not None:
+            self.size -= len(chunk)
+
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.bytes_read += len(chunk)
+        if self.progress is not None:
+            self.progress(self.bytes_read)
+
+        self.buffer = self.buffer[self.position:] + self.decompress(chunk)
+        self.position = 0
+        return True
+
+    def read(self, n=-1):
+        # Reads are mostly small (from `cPickle`), so the buffer is only
+        # copied when filled
+        if n < 0:
+            while self.fill():
+                pass
+        else:
+            while len(self.buffer) - self.position < n and self.fill():
+                pass
+
+        start = self.position
+        end = len(self.buffer) if n < 0 else min(start + n, len(self.buffer))
+        self.position = end
+        return self.buffer[start:end]
+
+    def readline(self):
+        while True:
+            i = self.buffer.find('\n', self.position)
+            if i >= 0:
+                return self.read(i + 1 - self.position)
+
+            if not self.fill():
+                return self.read()
 
 # dump
-def dump(file_, obj):
+def dump(file_, obj, compression=None, level=LEVEL):
+    # Compressed if `compression` is given or `file_` is a path with a
+    # compressed extension
     own_fid = False
     if isinstance(file_,basestring):
+        if compression is None:
+            compression = compression_of_path(file_)
+
         file_ = open(file_,'wb')
         own_fid = True
 
-    cPickle.dump(obj, file_, 2)
+    if compression is None:
+        cPickle.dump(obj, file_, 2)
+    else:
+        writer = CompressedWriter(file_, compression, level)
+        cPickle.dump(obj, writer, 2)
+        writer.close()
 
     if own_fid:
         file_.close()
 
 # load
-def load(file_):
+def load(file_, size=None, progress=None):
+    # Compression is detected from the header; `size` limits the bytes read
+    # from `file_` (e.g. a member of an archive) and `progress` is called
+    # with the bytes read so far
     own_fid = False
     if isinstance(file_,basestring):
         file_ = open(file_,'rb')
         own_fid = True
 
-    obj = cPickle.load(file_)
+    header = file_.read(MAGIC_SIZE if size is None else
+                        min(MAGIC_SIZE, size))
+    compression = compression_of_header(header)
+
+    if compression is None:
+        # Uncompressed pickles are read from the start
+        file_.seek(-len(header), 1)
+        if progress is None:
+            obj = cPickle.load(file_)
+        else:
+            obj = cPickle.load(DecompressedReader(file_, None, '', size,
+                progress))
+    else:
+        if size is not None:
+            size -= len(header)
+
+        obj = cPickle.load(DecompressedReader(file_, compression, header,
+            size, progress))
 
     if own_fid:
         file_.close()
@@ -0,0 +1,136 @@
+##########################################
+# File: plates.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Plate loading of attempts
+# `PlateTable` solves, once for a bar, collars and plate inventory, the
+# loading of every weight that can be loaded (the fewest plates per side,
+# heaviest first), so looking up an attempt is a dictionary lookup
+
+# Imports
+from collections import namedtuple
+import numpy as np
+
+from lifter import Lifter
+from solver import next_attempts
+
+# all
+__all__ = [
+    'Loading',
+    'PlateTable',
+    'lifting_order'
+]
+
+# Defaults (kg): bar, pair of collars and the number of each plate (both
+# sides)
+BAR = 20.
+COLLARS = 5.
+INVENTORY = {
+    25. : 16,
+    20. : 2,
+    15. : 2,
+    10. : 2,
+    5. : 2,
+    2.5 : 2,
+    1.25 : 2,
+    0.5 : 2,
+    0.25 : 2,
+}
+
+# Loading
+# `plates` are the plates on each side (heaviest first) and `text` is the
+# plates as shown to the loaders
+Loading = namedtuple('Loading', 'weight plates text')
+
+# format_plate
+def format_plate(plate):
+    return ('%.2f' % plate).rstrip('0').rstrip('.')
+
+# PlateTable
+class PlateTable(object):
+    def __init__(self, bar=BAR, collars=COLLARS, inventory=INVENTORY):
+        self.bar = bar
+        self.collars = collars
+        self.inventory = dict(inventory)
+
+        self.table = self.solve()
+
+    def solve(self):
+        # Loading of every weight, as a 0/1 knapsack over the plates of one
+        # side in units of the lightest plate (bounded by the inventory)
+        plates = sorted(self.inventory, reverse=True)
+        unit = min(plates)
+
+        # Plates of one side, heaviest first
+        items = []
+        for plate in plates:
+            items += [plate] * (self.inventory[plate] // 2)
+
+        sizes = [int(round(plate / unit)) for plate in items]
+        n = sum(sizes) + 1
+
+        # Fewest plates for each side weight from each item on
+        unreachable = len(items) + 1
+        cost = np.empty((len(items) + 1, n), dtype=int)
+        cost[-1] = unreachable
+        cost[-1, 0] = 0
+        for i in xrange(len(items) - 1, -1, -1):
+            size = sizes[i]
+            cost[i] = cost[i + 1]
+            cost[i, size:] = np.minimum(cost[i + 1, size:],
+                cost[i + 1, :n - size] + 1)
+
+        # Take each plate (heaviest first) if the rest of the side can still
+        # be loaded with the fewest plates
+        base = self.bar + self.collars
+        table = {}
+        for side in np.flatnonzero(cost[0] < unreachable):
+            loaded = []
+            j = side
+            for i, size in enumerate(sizes):
+                if j >= size and cost[i + 1, j - size] == cost[i, j] - 1:
+                    loaded.append(items[i])
+                    j -= size
+
+            weight = float(base + 2 * side * unit)
+            table[weight] = Loading(weight, tuple(loaded),
+                ' '.join(format_plate(p) for p in loaded) or 'Collars only')
+
+        return table
+
+    def __contains__(self, weight):
+        return weight in self.table
+
+    def loading(self, weight):
+        # Loading of `weight` (None if it can't be loaded)
+        return self.table.get(weight)
+
+    def weights(self):
+        return sorted(self.table)
+
+# lifting_order
+def lifting_order(collection, flight=None, n=None):
+    # (lifter, lift record index) of the attempts entered and next to be
+    # made (of `flight`, or all), by round (lift and attempt), attempt
+    # weight and lifter_id
+    c = collection.columns()
+
+    index = next_attempts(c.records, c.status)
+    rows = np.flatnonzero(index >= 0)
+    index = index[rows]
+
+    entered = c.records[rows, index] == Lifter.SET_CODE
+    if flight is not None:
+        flights = np.array([c.lifters[i].flight for i in rows], dtype=int)
+        entered &= flights == flight
+
+    rows, index = rows[entered], index[entered]
+    weight = c.lifts[rows, index]
+
+    order = np.lexsort((c.lifter_id[rows], weight, index))[:n]
+
+    return [(c.lifters[rows[i]], index[i]) for i in order]
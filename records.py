@@ -0,0 +1,279 @@
+##########################################
+# File: records.py                       #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Federation records keyed by (gender, weight class, lift) where lift is one
+# of `Lifter.LIFTS` or 'total'
+# Record files are tab separated with a header line:
+#   gender, weight class, lift, weight, holder, date
+
+# Imports
+from collections import namedtuple
+from lifter import Lifter
+import datetime
+
+# Setup logger
+from log import getLogger
+logger = getLogger('basic')
+
+# all
+__all__ = [
+    'Record',
+    'RecordsIndex',
+    'weight_class_key'
+]
+
+# Record
+Record = namedtuple('Record', 'weight holder date')
+
+# Constants
+LIFTS = Lifter.LIFTS
+RECORD_LIFTS = LIFTS + ['total']
+HEADER = 'Gender\tWeight class\tLift\tWeight\tHolder\tDate\n'
+
+# weight_class_key
+def weight_class_key(weight_class):
+    # Normalise '74', '74.0', '120+' etc. to `Lifter.weight_class` format
+    weight_class = weight_class.strip()
+
+    plus = weight_class.endswith('+')
+    if plus:
+        weight_class = weight_class[:-1]
+
+    return '%.1f%s' % (float(weight_class), '+' if plus else '')
+
+# RecordsIndex
+class RecordsIndex(object):
+    ATTRIBUTES = ['records', 'pending', 'sources', 'attempts']
+
+    def __init__(self):
+        # Current records
+        self.records = {}
+
+        # New records set at this meet: key -> (Record, (lifter_id, index))
+        # and the reverse (lifter_id, index) -> keys
+        self.pending = {}
+        self.sources = {}
+
+        # Record attempts entered at this meet: (lifter_id, index) -> keys
+        self.attempts = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    # Loading
+    def load(self, file_):
+        own_fid = False
+        if isinstance(file_, basestring):
+            file_ = open(file_, 'r')
+            own_fid = True
+
+        # Skip header
+        file_.readline()
+
+        self.bulk_load(line.rstrip('\r\n').split('\t') for line in file_
+                       if line.strip())
+
+        if own_fid:
+            file_.close()
+
+    def bulk_load(self, rows):
+        # Add rows of (gender, weight class, lift, weight[, holder[, date]]),
+        # keeping the heaviest record of each key
+        records = self.records
+        for row in rows:
+            key = (row[0].strip(), weight_class_key(row[1]),
+                   row[2].strip().lower())
+            weight = float(row[3])
+
+            try:
+                current = records[key]
+            except KeyError:
+                pass
+            else:
+                if current.weight >= weight:
+                    continue
+
+            holder = row[4] if len(row) > 4 else ''
+            date = row[5] if len(row) > 5 else ''
+            records[key] = Record(weight, holder, date)
+
+    # Lookup
+    def key(self, lifter, lift):
+        return (lifter.gender, lifter.weight_class, lift)
+
+    def best(self, key):
+        # Heaviest of the current and pending record (0 if neither)
+        weight = 0.
+
+        try:
+            weight = self.records[key].weight
+        except KeyError:
+            pass
+
+        try:
+            weight = max(weight, self.pending[key][0].weight)
+        except KeyError:
+            pass
+
+        return weight
+
+    def candidate_keys(self, lifter, index):
+        # Record keys (lift and total) for which the lift at `index` would be
+        # a record if it were good
+        lift = LIFTS[index // 3]
+        weight = lifter.lifts[index]
+        keys = []
+
+        key = self.key(lifter, lift)
+        if key in self.records or key in self.pending:
+            if weight > self.best(key):
+                keys.append(key)
+
+        # Total is the best of the other lifts and this attempt
+        other_best = [lifter.best_lift(l) for l in LIFTS if l != lift]
+        if all(other_best):
+            key = self.key(lifter, 'total')
+            if key in self.records or key in self.pending:
+                if weight + sum(other_best) > self.best(key):
+                    keys.append(key)
+
+        return keys
+
+    def is_record_attempt(self, lifter, index):
+        # Lift at `index` is set and would be a record, or has set a pending
+        # record (only looked up, so cheap enough to call when painting)
+        source = (lifter.lifter_id, index)
+        return source in self.attempts or source in self.sources
+
+    # Updates
+    def check_attempt(self, lifter, index):
+        # Add or remove the lift at `index` from `attempts` and return its
+        # record keys
+        source = (lifter.lifter_id, index)
+
+        keys = []
+        if lifter.lift_record[index] == Lifter.SET_CODE:
+            keys = self.candidate_keys(lifter, index)
+
+        if keys:
+            self.attempts[source] = keys
+        else:
+            self.attempts.pop(source, None)
+
+        return keys
+
+    def refresh(self, lifters):
+        # Re-check the attempts of all `lifters` (lifter_id -> Lifter)
+        self.attempts = {}
+        for lifter in lifters.itervalues():
+            for index in xrange(len(lifter.lift_record)):
+                self.check_attempt(lifter, index)
+
+    def update(self, lifter, index, lifters=None):
+        # Called for each entered or validated lift, where `lifters`
+        # (lifter_id -> Lifter) are re-checked for attempts affected by a
+        # pending record being set or reset
+        source = (lifter.lifter_id, index)
+
+        # Any pending records from this attempt are reset
+        changed = self.sources.pop(source, [])
+        for key in changed:
+            del self.pending[key]
+
+        record = lifter.lift_record[index]
+        keys = self.check_attempt(lifter, index)
+
+        if record == Lifter.SET_CODE:
+            if keys:
+                logger.info('Record attempt: %s, %s %.1f (%s)',
+                    lifter.name, LIFTS[index // 3], lifter.lifts[index],
+                    ', '.join(['%s %s %s' % k for k in keys]))
+
+        elif record == Lifter.GOOD_CODE:
+            keys = self.candidate_keys(lifter, index)
+
+            date = datetime.date.today().isoformat()
+            for key in keys:
+                if key[2] == 'total':
+                    weight = lifter.total
+                else:
+                    weight = lifter.lifts[index]
+
+                # Replace any pending record of this key from elsewhere
+                try:
+                    _, previous = self.pending[key]
+                except KeyError:
+                    pass
+                else:
+                    self.sources[previous].remove(key)
+                    if not self.sources[previous]:
+                        del self.sources[previous]
+
+                self.pending[key] = (Record(weight, lifter.name, date),
+                                     source)
+                self.sources.setdefault(source, []).append(key)
+                logger.info('New record: %s, %s %s %s %.1f',
+                    lifter.name, key[0], key[1], key[2], weight)
+
+            changed = changed + keys
+
+        # The lifter's other attempts at the total depend on this lift
+        for other in xrange(len(lifter.lift_record)):
+            if other != index:
+                self.check_attempt(lifter, other)
+
+        # Attempts of the same class depend on any changed pending records
+        if changed and lifters is not None:
+            classes = set(key[:2] for key in changed)
+            for other in lifters.itervalues():
+                if other is not lifter and \
+                    (other.gender, other.weight_class) in classes:
+                    for other_index in xrange(len(other.lift_record)):
+                        self.check_attempt(other, other_index)
+
+    # Export
+    def updated_records(self):
+        # Current records with the pending records applied
+        records = dict(self.records)
+        for key, (record, _) in self.pending.iteritems():
+            if key not in records or records[key].weight < record.weight:
+                records[key] = record
+
+        return records
+
+    def export(self, file_):
+        own_fid = False
+        if isinstance(file_, basestring):
+            file_ = open(file_, 'w')
+            own_fid = True
+
+        file_.write(HEADER)
+
+        records = self.updated_records()
+        for key in sorted(records, key=self.sort_key):
+            record = records[key]
+            file_.write('%s\t%s\t%s\t%.1f\t%s\t%s\n' % \
+                (key + (record.weight, record.holder, record.date)))
+
+        if own_fid:
+            file_.close()
+
+    @staticmethod
+    def sort_key(key):
+        gender, weight_class, lift = key
+        return (gender, float(weight_class.rstrip('+')),
+                weight_class.endswith('+'), RECORD_LIFTS.index(lift)
+                if lift in RECORD_LIFTS else len(RECORD_LIFTS))
+
+    # Pickle
+    def __getstate__(self):
+        return [getattr(self, attr) for attr in self.ATTRIBUTES]
+
+    def __setstate__(self, state):
+        for i, attr in enumerate(self.ATTRIBUTES):
+            setattr(self, attr, state[i])
@@ -0,0 +1,538 @@
+##########################################
+# File: replay.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Replay of a meet (recorded or synthetic) for load testing
+# Events are dictionaries (JSON lines in files) of the form:
+#   {"t": 12.5, "type": "add", "lifter_id": 3, "name": "...", "gender": "M",
+#    "weight": 82.4, "rack_height": 10, "team": "...", "flight": 1}
+#   {"t": 70.0, "type": "enter", "lifter_id": 3, "lift": "squat",
+#    "attempt": 0, "weight": 180.0}
+#   {"t": 95.0, "type": "decision", "lifter_id": 3, "lift": "squat",
+#    "attempt": 0, "valid": true}
+#   {"t": 99.0, "type": "set", "lifter_id": 3, "attribute": "withdrawn",
+#    "value": true}
+#   {"t": 99.0, "type": "remove", "lifter_id": 3}
+# where `t` is the time (seconds) since the start of the meet and
+# `lifter_id` is the lifter's id in the recorded meet
+# Events are applied to a target: the collection alone ('collection'), a
+# `TableModel` ('model'), or a `TableModel` with a `TableView` painted
+# offscreen ('view'), and the latency of each event, autosaves and repaints
+# are recorded
+
+# Imports
+import json
+import os
+import tempfile
+import time
+from timeit import default_timer as timer
+import numpy as np
+
+import pickle_
+import simulate
+from lifter import Lifter, LifterCollection
+from feed import LifterAdded, LifterRemoved, AttributeChanged, \
+    AttemptEntered, AttemptValidated
+
+# all
+__all__ = [
+    'Recorder',
+    'Replay',
+    'Stats',
+    'synthetic_events',
+    'collection_events',
+    'load_events',
+    'save_events'
+]
+
+# Attributes of an 'add' event
+ADD_ATTRIBUTES = ['name', 'gender', 'weight', 'rack_height', 'team',
+                  'flight']
+
+# Attributes of 'set' events
+SET_ATTRIBUTES = ['name', 'gender', 'weight', 'rack_height', 'team',
+                  'flight', 'withdrawn']
+
+# Decision of each record
+RECORD_VALID = {
+    Lifter.GOOD_CODE : True,
+    Lifter.FAIL_CODE : False,
+    Lifter.PASS_CODE : None,
+}
+
+# Percentiles of the latencies reported
+PERCENTILES = [50, 90, 99]
+
+# Extension of the autosave, compressed as `MainWindow.TEMP_FILENAME` (which
+# isn't imported so the collection target doesn't need Qt)
+AUTOSAVE_SUFFIX = '.dat.gz'
+
+# Events
+
+# add_event
+def add_event(t, lifter):
+    event = dict(t=t, type='add', lifter_id=lifter.lifter_id)
+    for attr in ADD_ATTRIBUTES:
+        event[attr] = getattr(lifter, attr)
+
+    return event
+
+# attempt_event
+def attempt_event(t, type_, lifter, index):
+    lift = Lifter.LIFTS[index // 3]
+    event = dict(t=t, type=type_, lifter_id=lifter.lifter_id, lift=lift,
+                 attempt=index % 3)
+
+    if type_ == 'enter':
+        event['weight'] = lifter.lifts[index]
+    else:
+        event['valid'] = RECORD_VALID[lifter.lift_record[index]]
+
+    return event
+
+# load_events
+def load_events(file_):
+    own_fid = False
+    if isinstance(file_, basestring):
+        file_ = open(file_, 'rb')
+        own_fid = True
+
+    events = [json.loads(line) for line in file_ if line.strip()]
+
+    if own_fid:
+        file_.close()
+
+    return events
+
+# save_events
+def save_events(file_, events):
+    own_fid = False
+    if isinstance(file_, basestring):
+        file_ = open(file_, 'wb')
+        own_fid = True
+
+    for event in events:
+        file_.write(json.dumps(event) + '\n')
+
+    if own_fid:
+        file_.close()
+
+# synthetic_events
+def synthetic_events(n_lifters=2000, n_flights=10, attempt_interval=60.,
+    seed=None):
+    # Meet of `n_lifters` in `n_flights` flights, each lifter making nine
+    # attempts (entered half an `attempt_interval` before the decision),
+    # run flight by flight, lift by lift and round by round in order of
+    # the weight entered
+    rng = np.random.RandomState(seed)
+
+    gender = rng.choice(Lifter.GENDERS, n_lifters)
+    weight = np.round(np.where(gender == 'M', 85., 65.) +
+        rng.normal(0., 12., n_lifters), 1).clip(40., 180.)
+
+    # Openers from bodyweight and the ratio of each lift
+    ratios = np.array([2.2, 1.4, 2.6])
+    scale = rng.uniform(0.6, 1.3, n_lifters) * np.where(gender == 'M', 1., .7)
+    openers = 2.5 * np.round(weight[:, np.newaxis] * scale[:, np.newaxis] *
+        ratios / 2.5)
+
+    make_rates = np.array(simulate.MAKE_RATES)
+
+    events = []
+    for i in xrange(n_lifters):
+        events.append(dict(t=0., type='add', lifter_id=i,
+                           name='Lifter %d' % i, gender=gender[i],
+                           weight=weight[i],
+                           rack_height=int(rng.randint(4, 20)),
+                           team='Team %d' % (i % (n_lifters // 10 + 1)),
+                           flight=i % n_flights))
+
+    t = 0.
+    lifters = np.arange(n_lifters)
+    for flight in xrange(n_flights):
+        in_flight = lifters[lifters % n_flights == flight]
+
+        for j, lift in enumerate(Lifter.LIFTS):
+            next_weight = openers[in_flight, j].copy()
+
+            for attempt in [0,1,2]:
+                good = rng.uniform(size=len(in_flight)) < make_rates[attempt]
+
+                for k in np.argsort(next_weight, kind='mergesort'):
+                    common = dict(lifter_id=int(in_flight[k]), lift=lift,
+                                  attempt=attempt)
+
+                    t += 0.5 * attempt_interval
+                    events.append(dict(common, t=t, type='enter',
+                                       weight=float(next_weight[k])))
+
+                    t += 0.5 * attempt_interval
+                    events.append(dict(common, t=t, type='decision',
+                                       valid=bool(good[k])))
+
+                # Jump after a good lift (a failed lift is repeated)
+                next_weight = np.where(good, 2.5 * np.round(
+                    next_weight * (1. + simulate.JUMP) / 2.5), next_weight)
+
+    return events
+
+# collection_events
+def collection_events(collection):
+    # Events of a saved meet from its attempt times (see `Lifter.times`),
+    # where attempts without times are placed after those with times, in
+    # lifter and attempt order
+    events = [add_event(0., collection[i]) for i in sorted(collection.map_)]
+
+    attempts = []
+    for lifter_id in sorted(collection.map_):
+        lifter = collection[lifter_id]
+        for index, record in enumerate(lifter.lift_record):
+            if record == Lifter.BLANK_CODE:
+                continue
+
+            entered = lifter.times[Lifter.ENTERED_OFFSET + index]
+            attempts.append((entered, 'enter', lifter, index))
+
+            if record in Lifter.COMPLETED_CODE:
+                validated = lifter.times[Lifter.VALIDATED_OFFSET + index]
+                attempts.append((validated, 'decision', lifter, index))
+
+    # NaN times last (stable, so in lifter and attempt order)
+    attempts.sort(key=lambda a: (1., 0.) if np.isnan(a[0]) else (0., a[0]))
+
+    times = [a[0] for a in attempts if not np.isnan(a[0])]
+    start = times[0] if times else 0.
+    end = times[-1] - start if times else 0.
+
+    for t, type_, lifter, index in attempts:
+        t = end if np.isnan(t) else t - start
+        events.append(attempt_event(t, type_, lifter, index))
+
+    return events
+
+# Recorder
+class Recorder(object):
+    # Records the events of a collection from its change feed
+    def __init__(self, collection):
+        self.collection = collection
+        self.events = []
+        self.start = timer()
+
+        self.subscription = collection.feed.subscribe(self.record)
+
+    def close(self):
+        self.subscription.close()
+
+    def record(self, events):
+        t = timer() - self.start
+
+        for event in events:
+            lifter = event.lifter
+
+            if isinstance(event, LifterAdded):
+                self.events.append(add_event(t, lifter))
+            elif isinstance(event, LifterRemoved):
+                self.events.append(dict(t=t, type='remove',
+                                        lifter_id=lifter.lifter_id))
+            elif isinstance(event, AttemptEntered):
+                self.events.append(attempt_event(t, 'enter', lifter,
+                    event.index))
+            elif isinstance(event, AttemptValidated):
+                self.events.append(attempt_event(t, 'decision', lifter,
+                    event.index))
+            elif isinstance(event, AttributeChanged) and \
+                event.attribute in SET_ATTRIBUTES:
+                self.events.append(dict(t=t, type='set',
+                    lifter_id=lifter.lifter_id, attribute=event.attribute,
+                    value=event.new))
+
+    def save(self, file_):
+        save_events(file_, self.events)
+
+# Stats
+class Stats(object):
+    # Durations (seconds) by name, in order
+    def __init__(self):
+        self.durations = {}
+
+    def add(self, name, duration):
+        self.durations.setdefault(name, []).append(duration)
+
+    def summary(self):
+        # Rows of (name, count, total [s], mean, percentiles, max [ms] and
+        # the mean of the first and last tenth [ms]) by name
+        rows = []
+        for name in sorted(self.durations):
+            d = 1e3 * np.asarray(self.durations[name])
+            tenth = max(len(d) // 10, 1)
+            rows.append([name, len(d), 1e-3 * d.sum(), d.mean()] +
+                        list(np.percentile(d, PERCENTILES)) +
+                        [d.max(), d[:tenth].mean(), d[-tenth:].mean()])
+
+        return rows
+
+    def report(self):
+        headings = ['count', 'total[s]', 'mean'] + \
+            ['p%d' % q for q in PERCENTILES] + ['max', 'first', 'last']
+
+        lines = ['%-16s' % '[ms]' + ''.join('%10s' % h for h in headings)]
+        for row in self.summary():
+            lines.append('%-16s%10d' % tuple(row[:2]) +
+                         ''.join('%10.2f' % x for x in row[2:]))
+
+        return '\n'.join(lines)
+
+# Targets
+
+# CollectionTarget
+class CollectionTarget(object):
+    # The collection alone, reading what the table reads after each change
+    paints = False
+
+    def __init__(self):
+        self.collection = LifterCollection()
+
+    def add(self, lifter):
+        self.collection.add(lifter)
+
+    def remove(self, lifter):
+        self.collection.remove(lifter)
+
+    def enter(self, lifter, lift, attempt, weight):
+        lifter.enter_lift(lift, attempt, weight)
+
+    def decide(self, lifter, lift, attempt, valid):
+        lifter.validate_lift(lift, attempt, valid)
+
+    def set(self, lifter, attribute, value):
+        setattr(lifter, attribute, value)
+
+    def changed(self):
+        self.collection.overall_info()
+        self.collection.needs()
+
+# ModelTarget
+class ModelTarget(CollectionTarget):
+    # A `TableModel` changed as through the table view (requires a
+    # `QApplication`)
+    def __init__(self):
+        from PyQt4 import QtCore
+        from table import TableModel
+
+        self.QVariant = QtCore.QVariant
+        self.edit_role = QtCore.Qt.EditRole
+
+        self.model = TableModel(top=3)
+        self.collection = self.model.lifters_map
+
+        # Column of each (lift, attempt)
+        self.columns = dict((l, i)
+            for i, l in enumerate(TableModel.SECTION_LIFT) if l is not None)
+
+        # Row of each lifter (rebuilt after each reset)
+        self.rows = None
+        self.model.modelReset.connect(self.clear_rows)
+
+    def clear_rows(self):
+        self.rows = None
+
+    def index(self, lifter, lift=None, attempt=None):
+        if self.rows is None:
+            self.rows = dict((l.lifter_id, row)
+                             for row, l in enumerate(self.model.lifters))
+
+        column = 0 if lift is None else self.columns[lift, attempt]
+        return self.model.index(self.rows[lifter.lifter_id], column)
+
+    def add(self, lifter):
+        self.model.add(lifter)
+
+    def remove(self, lifter):
+        self.model.remove(self.index(lifter))
+
+    def enter(self, lifter, lift, attempt, weight):
+        self.model.setData(self.index(lifter, lift, attempt),
+            self.QVariant(weight), self.edit_role)
+
+    def decide(self, lifter, lift, attempt, valid):
+        self.model.validate_lift(self.index(lifter, lift, attempt), valid)
+
+    def set(self, lifter, attribute, value):
+        setattr(lifter, attribute, value)
+        self.model.lifters_changed([lifter])
+
+    def changed(self):
+        pass
+
+# ViewTarget
+class ViewTarget(ModelTarget):
+    # A `ModelTarget` with a `TableView` which is never shown on screen
+    # (but still requires a display, e.g. Xvfb, with Qt 4) and is painted to
+    # an image
+    paints = True
+
+    def __init__(self, width=1280, height=800):
+        ModelTarget.__init__(self)
+
+        from PyQt4 import QtCore, QtGui
+        from table import TableView
+
+        self.QtGui = QtGui
+
+        self.view = TableView(self.model)
+        self.view.setAttribute(QtCore.Qt.WA_DontShowOnScreen)
+        self.view.resize(width, height)
+        self.view.show()
+
+        self.image = QtGui.QImage(self.view.size(),
+            QtGui.QImage.Format_RGB32)
+
+    def paint(self):
+        self.QtGui.QApplication.processEvents()
+
+        painter = self.QtGui.QPainter(self.image)
+        self.view.render(painter)
+        painter.end()
+
+TARGETS = {
+    'collection' : CollectionTarget,
+    'model' : ModelTarget,
+    'view' : ViewTarget,
+}
+
+# Replay
+class Replay(object):
+    # Apply `events` to `target` at `speed` times their recorded pace (or as
+    # fast as possible if None), autosaving every `autosave_every` events
+    # (the meet manager autosaves on every change) and painting every
+    # `paint_every` events
+    def __init__(self, events, target='collection', speed=None,
+        autosave_every=1, paint_every=1, autosave_path=None):
+        self.events = events
+        self.target = TARGETS[target]() if isinstance(target, basestring) \
+            else target
+        self.speed = speed
+
+        self.autosave_every = autosave_every
+        self.paint_every = paint_every
+
+        self.own_autosave = autosave_path is None
+        if self.own_autosave:
+            fd, autosave_path = tempfile.mkstemp(suffix=AUTOSAVE_SUFFIX)
+            os.close(fd)
+        self.autosave_path = autosave_path
+
+        # Replayed lifters by recorded lifter_id
+        self.lifters = {}
+
+        self.stats = Stats()
+
+    def run(self):
+        start = timer()
+
+        try:
+            for i, event in enumerate(self.events):
+                if self.speed:
+                    delay = event.get('t', 0.) / self.speed - \
+                        (timer() - start)
+                    if delay > 0.:
+                        time.sleep(delay)
+
+                self.apply(event)
+
+                if self.autosave_every and (i + 1) % self.autosave_every == 0:
+                    self.timed('autosave', pickle_.dump, self.autosave_path,
+                        self.target.collection)
+
+                if self.target.paints and self.paint_every and \
+                    (i + 1) % self.paint_every == 0:
+                    self.timed('paint', self.target.paint)
+        finally:
+            if self.own_autosave:
+                os.remove(self.autosave_path)
+
+        self.stats.add('replay', timer() - start)
+
+        return self.stats
+
+    def timed(self, name, f, *args):
+        t0 = timer()
+        f(*args)
+        self.stats.add(name, timer() - t0)
+
+    def apply(self, event):
+        type_ = event['type']
+        target = self.target
+
+        t0 = timer()
+
+        if type_ == 'add':
+            lifter = Lifter(*[event[attr] for attr in ADD_ATTRIBUTES])
+            self.lifters[event['lifter_id']] = lifter
+            target.add(lifter)
+        else:
+            lifter = self.lifters[event['lifter_id']]
+
+            if type_ == 'enter':
+                target.enter(lifter, event['lift'], event['attempt'],
+                    event['weight'])
+            elif type_ == 'decision':
+                target.decide(lifter, event['lift'], event['attempt'],
+                    event['valid'])
+            elif type_ == 'set':
+                target.set(lifter, event['attribute'], event['value'])
+            elif type_ == 'remove':
+                target.remove(lifter)
+                del self.lifters[event['lifter_id']]
+            else:
+                raise ValueError, 'type "%s" not known' % type_
+
+        target.changed()
+
+        self.stats.add(type_, timer() - t0)
+
+# main
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay a meet')
+    parser.add_argument('events', nargs='?', default=None,
+        help='events (JSON lines) or a saved meet (default: synthetic)')
+    parser.add_argument('--target', choices=sorted(TARGETS),
+        default='collection')
+    parser.add_argument('--speed', type=float, default=None,
+        help='times the recorded pace (default: as fast as possible)')
+    parser.add_argument('--lifters', type=int, default=2000)
+    parser.add_argument('--flights', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--autosave-every', type=int, default=1)
+    parser.add_argument('--paint-every', type=int, default=1)
+    parser.add_argument('--save-events', default=None,
+        help='write the events replayed (JSON lines) to this file')
+    args, qt_argv = parser.parse_known_args()
+
+    if args.events is None:
+        events = synthetic_events(args.lifters, args.flights, seed=args.seed)
+    elif args.events.endswith('.jsonl'):
+        events = load_events(args.events)
+    else:
+        events = collection_events(pickle_.load(args.events))
+
+    if args.save_events is not None:
+        save_events(args.save_events, events)
+
+    if args.target != 'collection':
+        import sys
+        from PyQt4 import QtGui
+        qapp = QtGui.QApplication(sys.argv[:1] + qt_argv)
+
+    replay = Replay(events, args.target, args.speed, args.autosave_every,
+                    args.paint_every)
+    print replay.run().report()
+
+if __name__ == '__main__':
+    main()
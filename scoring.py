@@ -0,0 +1,243 @@
+##########################################
+# File: scoring.py                       #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Vectorised group-by machinery and team scoring strategies
+
+# Imports
+import numpy as np
+from abc import ABCMeta, abstractmethod
+
+# all
+__all__ = [
+    'group_order',
+    'top_k',
+    'TeamScoring',
+    'TopPoints',
+    'PlacingPoints',
+    'STRATEGIES'
+]
+
+# group_order
+def group_order(group, *keys):
+    # Order rows by `group` and then by each of `keys` (ascending, in
+    # priority order) and return the order and the rank of each ordered row
+    # within its group
+    group = np.asarray(group)
+    n = len(group)
+
+    if n == 0:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty
+
+    # `np.lexsort` sorts by the last key first
+    order = np.lexsort(tuple(reversed(keys)) + (group,))
+
+    sorted_group = group[order]
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = sorted_group[1:] != sorted_group[:-1]
+
+    starts = np.flatnonzero(is_start)
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes)
+
+    return order, rank
+
+# top_k
+def top_k(group, top, *keys):
+    # Rows (in group then key order) which are in the first `top` of their
+    # group
+    order, rank = group_order(group, *keys)
+    return order[rank < top]
+
+# Team scoring strategies
+
+# TeamScoring
+class TeamScoring(object):
+    # Abstract: subclasses must override `lifter_scores` (and set `NAME`)
+    __metaclass__ = ABCMeta
+
+    NAME = None
+
+    def __init__(self, by_gender=False, class_cap=None):
+        # Score men and women as separate teams
+        self.by_gender = by_gender
+
+        # Maximum number of counting lifters per team in each weight class
+        self.class_cap = class_cap
+
+    def __repr__(self):
+        return '%s(by_gender=%r, class_cap=%r)' % \
+            (self.__class__.__name__, self.by_gender, self.class_cap)
+
+    # Per-lifter scores
+    @abstractmethod
+    def lifter_scores(self, columns):
+        # Score of each lifter in `columns` (higher is better)
+        pass
+
+    def eligible(self, columns, scores):
+        # Lifters without a total (including those who have bombed out or
+        # withdrawn) don't count
+        return columns.total > 0
+
+    # Groups
+    def groups(self, columns, n_teams):
+        # Group code of each lifter and the number of groups
+        if not self.by_gender:
+            return columns.team, n_teams
+
+        is_female = (columns.gender == 'F').astype(int)
+        return 2*columns.team + is_female, 2*n_teams
+
+    def label(self, team, gender):
+        if not self.by_gender:
+            return team
+
+        return '%s (%s)' % (team, gender)
+
+    def group_labels(self, team_names):
+        if not self.by_gender:
+            return list(team_names)
+
+        return [self.label(team, gender)
+                for team in team_names for gender in ['M', 'F']]
+
+    # Per-lifter bounds on the scores given the lowest and highest columns
+    # reachable (valid when each lifter's score only increases with its own
+    # total)
+    def lifter_bounds(self, low, high):
+        return self.lifter_scores(low), self.lifter_scores(high)
+
+    # Scoring
+    def score(self, columns, top, n_teams):
+        # Return the total of each group, the counting rows (ordered by
+        # group and then score) and the score of each lifter
+        scores = self.lifter_scores(columns)
+        totals, rows = self.counting(columns, scores, top, n_teams)
+
+        return totals, rows, scores
+
+    def bounds(self, low, high, top, n_teams):
+        # Lowest and highest total of each group reachable from the lowest
+        # and highest columns
+        low_scores, high_scores = self.lifter_bounds(low, high)
+        low_totals, _ = self.counting(low, low_scores, top, n_teams)
+        high_totals, _ = self.counting(high, high_scores, top, n_teams)
+
+        return low_totals, high_totals
+
+    def counting(self, columns, scores, top, n_teams):
+        # Total of each group and the counting rows for lifter `scores`
+        group, n_groups = self.groups(columns, n_teams)
+
+        # Candidate rows
+        rows = np.flatnonzero(self.eligible(columns, scores))
+
+        if self.class_cap is not None:
+            # Keep the best `class_cap` in each (group, weight class)
+            n_classes = np.amax(columns.weight_class) + 1 \
+                if len(rows) > 0 else 1
+            key = group[rows] * n_classes + columns.weight_class[rows]
+            kept = top_k(key, self.class_cap, -scores[rows],
+                columns.weight[rows], columns.lifter_id[rows])
+            rows = rows[kept]
+
+        # Keep the best `top` in each group
+        kept = top_k(group[rows], top, -scores[rows],
+            columns.weight[rows], columns.lifter_id[rows])
+        rows = rows[kept]
+
+        # NOTE `np.bincount` of no rows is integer even with weights
+        totals = np.bincount(group[rows], weights=scores[rows],
+            minlength=n_groups).astype(float)
+
+        return totals, rows
+
+# TopPoints
+class TopPoints(TeamScoring):
+    NAME = 'Best Wilks points'
+
+    def lifter_scores(self, columns):
+        return columns.points
+
+# PlacingPoints
+class PlacingPoints(TeamScoring):
+    NAME = 'Placing points'
+
+    DEFAULT_POINTS = (12, 9, 8, 7, 6, 5, 4, 3, 2, 1)
+
+    def __init__(self, placing_points=DEFAULT_POINTS, by_gender=False,
+        class_cap=None):
+        TeamScoring.__init__(self, by_gender, class_cap)
+
+        self.placing_points = tuple(placing_points)
+
+    def __repr__(self):
+        return '%s(%r, by_gender=%r, class_cap=%r)' % \
+            (self.__class__.__name__, self.placing_points, self.by_gender,
+             self.class_cap)
+
+    def lifter_scores(self, columns):
+        # Place within each weight class (which includes gender) by total,
+        # then lighter bodyweight, then lifter_id
+        # Lifters without a total are not placed
+        has_total = columns.total > 0
+        rows = np.flatnonzero(has_total)
+
+        order, rank = group_order(columns.weight_class[rows],
+            -columns.total[rows], columns.weight[rows],
+            columns.lifter_id[rows])
+
+        table = np.r_[np.asarray(self.placing_points, dtype=float), 0.]
+        rank = np.minimum(rank, len(table) - 1)
+
+        scores = np.zeros(len(columns.total), dtype=float)
+        scores[rows[order]] = table[rank]
+
+        return scores
+
+    def eligible(self, columns, scores):
+        return scores > 0
+
+    def lifter_bounds(self, low, high):
+        # Best place of each lifter is with its highest total against the
+        # lowest of the others (winning ties), and the worst place is with
+        # its lowest total against the highest of the others (losing ties)
+        n = len(low.total)
+        best_rank = np.zeros(n, dtype=int)
+        worst_rank = np.zeros(n, dtype=int)
+
+        for code in np.unique(low.weight_class):
+            rows = np.flatnonzero(low.weight_class == code)
+            others_low = np.sort(low.total[rows])
+            others_high = np.sort(high.total[rows])
+
+            # Others with a low total above the highest total (the lifter's
+            # own low total is never above its high total)
+            best_rank[rows] = len(rows) - np.searchsorted(others_low,
+                high.total[rows], side='right')
+
+            # Others with a high total at or above the lowest total
+            # (excluding the lifter itself)
+            worst_rank[rows] = len(rows) - np.searchsorted(others_high,
+                low.total[rows], side='left') - 1
+
+        table = np.r_[np.asarray(self.placing_points, dtype=float), 0.]
+
+        low_scores = table[np.minimum(worst_rank, len(table) - 1)]
+        low_scores[low.total <= 0] = 0.
+        high_scores = table[np.minimum(best_rank, len(table) - 1)]
+        high_scores[high.total <= 0] = 0.
+
+        return low_scores, high_scores
+
+# STRATEGIES
+STRATEGIES = [
+    TopPoints,
+    PlacingPoints
+]
@@ -0,0 +1,159 @@
+##########################################
+# File: search.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Search of lifters by name and team, kept up to date from the change feed
+# of a `LifterCollection`
+# Each word of a query must match (case-insensitive) the name or team of a
+# lifter: words of one or two letters match the start of a word of the
+# name or team (through a sorted list of the words), and longer words match
+# anywhere (through an index of the trigrams of the name and team)
+
+# Imports
+from bisect import bisect_left, insort
+import threading
+
+from feed import LifterAdded, LifterRemoved, AttributeChanged
+
+# all
+__all__ = [
+    'SearchIndex'
+]
+
+# Attributes searched
+ATTRIBUTES = ['name', 'team']
+
+# Separates the attributes in the searched text (so no trigram spans two)
+SEPARATOR = u'\x00'
+
+# normalise
+def normalise(value):
+    if value is None:
+        return u''
+
+    if not isinstance(value, unicode):
+        value = str(value).decode('utf-8', 'replace')
+
+    return value.lower()
+
+# trigrams
+def trigrams(text):
+    return set(text[i:i + 3] for i in xrange(len(text) - 2))
+
+# SearchIndex
+class SearchIndex(object):
+    def __init__(self, collection):
+        self.collection = collection
+        self.lock = threading.Lock()
+
+        # Searched text of each lifter_id, the sorted (word, lifter_id) of
+        # every word, and the lifter_ids of each trigram
+        self.texts = {}
+        self.words = []
+        self.trigrams = {}
+
+        # Lifters added while indexing are indexed (again) from the feed
+        self.subscription = collection.feed.subscribe(self.changed)
+
+        for lifter in collection.map_.values():
+            self.add(lifter)
+
+    def close(self):
+        self.subscription.close()
+
+    def __len__(self):
+        return len(self.texts)
+
+    # Updates
+    def changed(self, events):
+        for event in events:
+            if isinstance(event, LifterAdded):
+                self.add(event.lifter)
+            elif isinstance(event, LifterRemoved):
+                self.remove(event.lifter.lifter_id)
+            elif isinstance(event, AttributeChanged) and \
+                event.attribute in ATTRIBUTES:
+                self.add(event.lifter)
+
+    def add(self, lifter):
+        # Add (or update) `lifter`
+        lifter_id = lifter.lifter_id
+        self.remove(lifter_id)
+
+        text = SEPARATOR.join(normalise(getattr(lifter, attr))
+                              for attr in ATTRIBUTES)
+
+        with self.lock:
+            self.texts[lifter_id] = text
+
+            for word in set(text.replace(SEPARATOR, u' ').split()):
+                insort(self.words, (word, lifter_id))
+
+            for trigram in trigrams(text):
+                self.trigrams.setdefault(trigram, set()).add(lifter_id)
+
+    def remove(self, lifter_id):
+        with self.lock:
+            text = self.texts.pop(lifter_id, None)
+            if text is None:
+                return
+
+            for word in set(text.replace(SEPARATOR, u' ').split()):
+                i = bisect_left(self.words, (word, lifter_id))
+                del self.words[i]
+
+            for trigram in trigrams(text):
+                lifter_ids = self.trigrams[trigram]
+                lifter_ids.discard(lifter_id)
+                if not lifter_ids:
+                    del self.trigrams[trigram]
+
+    # Search
+    def search(self, query):
+        # lifter_ids matching every word of `query` (None if it has no
+        # words)
+        words = normalise(query).split()
+        if not words:
+            return None
+
+        with self.lock:
+            # Longest words first (they match the fewest)
+            matches = None
+            for word in sorted(words, key=len, reverse=True):
+                if len(word) < 3:
+                    found = self.prefix(word)
+                else:
+                    found = self.substring(word)
+
+                matches = found if matches is None else matches & found
+                if not matches:
+                    break
+
+        return matches
+
+    def prefix(self, word):
+        found = set()
+        i = bisect_left(self.words, (word,))
+        while i < len(self.words) and self.words[i][0].startswith(word):
+            found.add(self.words[i][1])
+            i += 1
+
+        return found
+
+    def substring(self, word):
+        # Candidates from the trigrams, checked against the text
+        candidates = None
+        for trigram in sorted(trigrams(word),
+                              key=lambda t: len(self.trigrams.get(t, ()))):
+            lifter_ids = self.trigrams.get(trigram)
+            if not lifter_ids:
+                return set()
+
+            candidates = set(lifter_ids) if candidates is None else \
+                candidates & lifter_ids
+
+        return set(i for i in candidates if word in self.texts[i])
@@ -0,0 +1,73 @@
+##########################################
+# File: sessions.py                      #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Platform sessions writing concurrently (from their own threads) to one
+# shared `LifterCollection`
+# Each write holds only the lock of the lifter changed, so platforms don't
+# wait on each other, and readers take `LifterCollection.snapshot` which
+# only blocks new writes if writers keep it from copying
+
+# Imports
+from lifter import Lifter
+
+# all
+__all__ = [
+    'PlatformSession'
+]
+
+# PlatformSession
+class PlatformSession(object):
+    def __init__(self, collection, name, flights=None):
+        self.collection = collection
+        self.name = name
+
+        # Flights run on this platform (None for any)
+        self.flights = None if flights is None else frozenset(flights)
+
+        # Number of writes made
+        self.writes = 0
+
+    def __repr__(self):
+        return 'PlatformSession(%r, flights=%r)' % \
+            (self.name, None if self.flights is None else sorted(self.flights))
+
+    def lifter(self, lifter_id):
+        lifter = self.collection[lifter_id]
+
+        if self.flights is not None and lifter.flight not in self.flights:
+            raise ValueError, 'lifter_id=%d: Flight %d not on platform %s' % \
+                (lifter_id, lifter.flight, self.name)
+
+        return lifter
+
+    # Writes
+    def enter_lift(self, lifter_id, lift, attempt, weight):
+        with self.collection.writing(self.lifter(lifter_id)) as lifter:
+            lifter.enter_lift(lift, attempt, weight)
+            self.writes += 1
+
+    def validate_lift(self, lifter_id, lift, attempt, valid):
+        with self.collection.writing(self.lifter(lifter_id)) as lifter:
+            lifter.validate_lift(lift, attempt, valid)
+            self.writes += 1
+
+    def set_attribute(self, lifter_id, attribute, value):
+        if attribute not in Lifter.NOTIFY_ATTRIBUTES or \
+            attribute in ('lifter_id', 'lifts', 'lift_record'):
+            raise ValueError, 'attribute "%s" cannot be set' % attribute
+
+        with self.collection.writing(self.lifter(lifter_id)) as lifter:
+            setattr(lifter, attribute, value)
+            self.writes += 1
+
+    def withdraw(self, lifter_id, withdrawn=True):
+        self.set_attribute(lifter_id, 'withdrawn', withdrawn)
+
+    # Reads
+    def snapshot(self):
+        return self.collection.snapshot()
@@ -0,0 +1,255 @@
+##########################################
+# File: simulate.py                      #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Monte-Carlo simulation of the remaining attempts of a meet, giving the
+# probability of each team and lifter winning
+
+# Imports
+from collections import namedtuple
+import numpy as np
+
+import wilks
+from lifter import Lifter
+
+# all
+__all__ = [
+    'Probabilities',
+    'simulate',
+    'simulate_columns'
+]
+
+# Defaults
+
+# Make rates of the first, second and third attempts
+MAKE_RATES = (0.9, 0.75, 0.5)
+
+# Weight of the prior make rate against a lifter's own completed attempts
+PRIOR_ATTEMPTS = 6.
+
+# Increase after a good lift (fraction) and the loading increment (kg)
+JUMP = 0.04
+INCREMENT = 2.5
+
+# Typical ratios of the squat, bench and deadlift (for estimating openers
+# which haven't been entered)
+LIFT_RATIOS = (1., 0.65, 1.2)
+
+# Maximum number of simulated attempts (simulations x lifters x 9) in memory
+MAX_BATCH = 2000000
+
+# Probabilities
+Probabilities = namedtuple('Probabilities',
+    'teams team_probabilities lifters lifter_probabilities')
+
+# make_probabilities
+def make_probabilities(records, make_rates=MAKE_RATES,
+    prior_attempts=PRIOR_ATTEMPTS):
+    # N x 9 probability of making each attempt from the make rates by
+    # attempt, scaled by each lifter's (smoothed) make rate so far
+    make_rates = np.asarray(make_rates, dtype=float)
+    prior = np.mean(make_rates)
+
+    good = np.sum(records == Lifter.GOOD_CODE, axis=1)
+    tried = good + np.sum(records == Lifter.FAIL_CODE, axis=1)
+    lifter_rate = (good + prior_attempts * prior) / (tried + prior_attempts)
+
+    p = np.tile(make_rates, len(Lifter.LIFTS))[np.newaxis, :] * \
+        (lifter_rate / prior)[:, np.newaxis]
+
+    return np.clip(p, 0., 1.)
+
+# estimate_openers
+def estimate_openers(lifts, records, weight_class, increment=INCREMENT,
+    lift_ratios=LIFT_RATIOS):
+    # N x 3 opener of each lift: as entered, or if blank, estimated from
+    # the lifter's other entered openers (by `lift_ratios`), or else the
+    # median entered opener of the lift in their weight class (and 0. if
+    # there is none, so the lifter bombs out)
+    N = lifts.shape[0]
+    offsets = [Lifter.LIFT_OFFSET[lift] for lift in Lifter.LIFTS]
+    openers = lifts[:, offsets].copy()
+    known = records[:, offsets] != Lifter.BLANK_CODE
+    ratios = np.asarray(lift_ratios, dtype=float)
+
+    # In squat equivalents, averaged over the lifter's entered openers
+    n_known = np.sum(known, axis=1)
+    squat = np.sum(np.where(known, openers / ratios, 0.), axis=1) / \
+        np.maximum(n_known, 1)
+
+    for j in xrange(len(offsets)):
+        blank = ~known[:, j]
+        from_others = blank & (n_known > 0)
+        openers[from_others, j] = np.round(
+            squat[from_others] * ratios[j] / increment) * increment
+
+        for code in np.unique(weight_class[blank & (n_known == 0)]):
+            in_class = weight_class == code
+            entered = openers[in_class & known[:, j], j]
+            rows = blank & (n_known == 0) & in_class
+            openers[rows, j] = np.round(np.median(entered) / increment) * \
+                increment if len(entered) > 0 else 0.
+
+    return openers
+
+# win_shares
+def win_shares(values):
+    # Wins of each column of `values` (n x M) over its rows, with ties
+    # split equally
+    is_max = values == np.amax(values, axis=1)[:, np.newaxis]
+    n_max = np.sum(is_max, axis=1).astype(float)
+    return np.sum(is_max / n_max[:, np.newaxis], axis=0)
+
+# simulate_totals
+def simulate_totals(lifts, records, p, n, random_state, jump=JUMP,
+    increment=INCREMENT, openers=None):
+    # Simulate `n` completions of the meet and return n x N totals, where
+    # blank openers are attempted at `openers` (N x 3, see
+    # `estimate_openers`), or not at all if None
+    N = lifts.shape[0]
+    totals = np.zeros((n, N), dtype=float)
+
+    for j, offset in enumerate(xrange(0, 9, 3)):
+        best = np.zeros((n, N), dtype=float)
+        previous_weight = np.zeros((n, N), dtype=float)
+        previous_good = np.zeros((n, N), dtype=bool)
+
+        for attempt in [0,1,2]:
+            index = offset + attempt
+            record = records[:, index]
+            weight = lifts[:, index]
+
+            # Known outcomes
+            good = np.tile(record == Lifter.GOOD_CODE, (n, 1))
+
+            # Set attempts are simulated at their weight
+            is_set = record == Lifter.SET_CODE
+            draw = random_state.random_sample((n, N)) < p[:, index]
+            good |= is_set & draw
+
+            weight = np.tile(weight, (n, 1))
+
+            # Blank openers are attempted at their estimate, and later
+            # blank attempts follow the previous attempt: a jump after a
+            # good lift, or a repeat after a miss (if attempted at all)
+            is_blank = record == Lifter.BLANK_CODE
+            if attempt == 0 and openers is not None and np.any(is_blank):
+                blank_weight = np.tile(openers[:, j], (n, 1))
+                weight = np.where(is_blank, blank_weight, weight)
+                good |= is_blank & (blank_weight > 0) & draw
+            elif attempt > 0 and np.any(is_blank):
+                jumped = np.ceil(previous_weight * (1. + jump) / increment) * \
+                    increment
+                blank_weight = np.where(previous_good, jumped,
+                    previous_weight)
+                weight = np.where(is_blank, blank_weight, weight)
+                good |= is_blank & (blank_weight > 0) & draw
+
+            best = np.where(good, weight, best)
+
+            # Passed and failed attempts carry forward the previous weight
+            attempted = good | np.tile(record == Lifter.FAIL_CODE, (n, 1)) | \
+                ((is_set | is_blank) & ~good)
+            previous_weight = np.where(attempted, weight, previous_weight)
+            previous_good = np.where(attempted, good, previous_good)
+
+        # No total without a good lift at each lift (bomb out)
+        totals = np.where(best > 0, totals + best, -np.inf)
+
+    return np.maximum(totals, 0.)
+
+# group_top_sums
+def group_top_sums(points, group, n_groups, top):
+    # Sum of the best `top` points of each group for each row of `points`
+    # (n x N), by sorting within the (fixed) blocks of each group
+    perm = np.argsort(group, kind='mergesort')
+    sorted_group = group[perm]
+    sizes = np.bincount(sorted_group, minlength=n_groups)
+    starts = np.r_[0, np.cumsum(sizes)[:-1]]
+
+    # Offset each group so that a row sort keeps the blocks in place
+    scale = 2. * (np.amax(points) + 1.) if points.size > 0 else 1.
+    key = sorted_group[np.newaxis, :] * scale - points[:, perm]
+    key.sort(axis=1)
+    values = sorted_group[np.newaxis, :] * scale - key
+
+    # Rank within block
+    rank = np.arange(len(group)) - np.repeat(starts, sizes)
+    values[:, rank >= top] = 0.
+
+    sums = np.zeros((points.shape[0], n_groups), dtype=float)
+    present = sizes > 0
+    if np.any(present):
+        sums[:, present] = np.add.reduceat(values, starts[present], axis=1)
+
+    return sums
+
+# simulate
+def simulate(collection, n=10000, make_rates=MAKE_RATES, jump=JUMP,
+    increment=INCREMENT, seed=None, max_batch=MAX_BATCH):
+    # Probability of each team (or group of the team scoring) winning on
+    # the best `top` Wilks points, and of each lifter having the most
+    # points
+    # NOTE Placing strategies and class caps are not simulated; the groups
+    # of the team scoring are scored on their best `top` Wilks points
+    # Openers which haven't been entered are estimated (see
+    # `estimate_openers`), and tied completions are shared by the tied
+    # teams (or lifters)
+    return simulate_columns(collection.columns(), collection.team_scoring,
+        collection.team_names, collection.top, n, make_rates, jump,
+        increment, seed, max_batch)
+
+# simulate_columns
+def simulate_columns(c, team_scoring, team_names, top, n=10000,
+    make_rates=MAKE_RATES, jump=JUMP, increment=INCREMENT, seed=None,
+    max_batch=MAX_BATCH, cancelled=None):
+    # `simulate` of the columns `c` of a collection (e.g. from
+    # `LifterCollection.snapshot`, to simulate on another thread)
+    # Returns None if `cancelled()` is true between batches
+    N = len(c.lifters)
+
+    group, n_groups = team_scoring.groups(c, len(team_names))
+    labels = team_scoring.group_labels(team_names)
+
+    team_wins = np.zeros(n_groups, dtype=float)
+    lifter_wins = np.zeros(N, dtype=float)
+
+    if N == 0:
+        return Probabilities(labels, team_wins, c.lifters, lifter_wins)
+
+    random_state = np.random.RandomState(seed)
+    p = make_probabilities(c.records, make_rates)
+    coefficients = wilks.coefficients(c.gender, c.weight)
+    withdrawn = c.withdrawn
+    openers = estimate_openers(c.lifts, c.records, c.weight_class, increment)
+
+    # Only groups with lifters
+    present = np.bincount(group, minlength=n_groups) > 0
+
+    batch = max(1, min(n, max_batch // (9 * N)))
+    for start in xrange(0, n, batch):
+        if cancelled is not None and cancelled():
+            return None
+
+        n_batch = min(batch, n - start)
+
+        totals = simulate_totals(c.lifts, c.records, p, n_batch,
+            random_state, jump, increment, openers)
+        totals[:, withdrawn] = 0.
+        points = totals * coefficients
+
+        sums = group_top_sums(points, group, n_groups, top)
+        sums[:, ~present] = -np.inf
+
+        team_wins += win_shares(sums)
+        lifter_wins += win_shares(points)
+
+    teams = [label for label, is_present in zip(labels, present)
+             if is_present]
+
+    return Probabilities(teams, team_wins[present] / n, c.lifters,
+        lifter_wins / n)
@@ -0,0 +1,316 @@
+##########################################
+# File: snapshot.py                      #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Columnar snapshot of the standings in a memory mapped file, for other
+# processes on the same machine (scoreboard, announcer, stream overlay)
+# The file is a header followed by the columns (see `layout`) and a string
+# table of the lifter names and team names, and is guarded by a seqlock:
+# the sequence is odd while the writer is writing, so readers retry if it
+# is odd or changes while they copy
+
+# Imports
+from collections import namedtuple
+import mmap
+import os
+import time
+import numpy as np
+
+from lifter import best_lifts
+from scoring import group_order
+
+# all
+__all__ = [
+    'Snapshot',
+    'SnapshotWriter',
+    'SnapshotReader',
+    'layout'
+]
+
+# Header: magic followed by little-endian uint64 fields
+MAGIC = 'PLSNAP01'
+HEADER_FIELDS = ['sequence', 'generation', 'size', 'n_lifters', 'n_teams',
+                 'n_strings', 'string_bytes']
+HEADER_SIZE = len(MAGIC) + 8 * len(HEADER_FIELDS)
+
+# Columns of each lifter: (name, dtype, values per lifter)
+COLUMNS = [
+    ('lifter_id', '<i8', 1),
+    ('weight', '<f8', 1),
+    ('weight_class', '<i8', 1),
+    ('team', '<i8', 1),
+    ('status', '<i8', 1),
+    ('best', '<f8', 3),
+    ('total', '<f8', 1),
+    ('points', '<f8', 1),
+    ('rank', '<i8', 1),
+    ('class_rank', '<i8', 1),
+]
+
+# Snapshot
+# `columns` maps each of `COLUMNS` to an array, `names` are the lifter
+# names and `team_names` are indexed by `columns['team']`
+Snapshot = namedtuple('Snapshot', 'generation columns names team_names')
+
+# layout
+def layout(n_lifters, n_strings, string_bytes):
+    # Offset, dtype and shape of each array, and the total size
+    offsets = {}
+    offset = HEADER_SIZE
+    for name, dtype, width in COLUMNS:
+        shape = (n_lifters, width) if width > 1 else (n_lifters,)
+        offsets[name] = (offset, dtype, shape)
+        offset += 8 * n_lifters * width
+
+    # String table: end offset of each string and the UTF-8 bytes
+    offsets['string_ends'] = (offset, '<i8', (n_strings,))
+    offset += 8 * n_strings
+    offsets['strings'] = (offset, 'S1', (string_bytes,))
+    offset += string_bytes
+
+    return offsets, offset
+
+# snapshot_arrays
+def snapshot_arrays(collection):
+    # Columns, names and team names of `collection`
+    c = collection.columns()
+    n = len(c.lifters)
+
+    best = best_lifts(c.lifts, c.records)
+
+    rank = np.empty(n, dtype=int)
+    rank[collection.ranked()] = np.arange(n)
+
+    class_rank = np.empty(n, dtype=int)
+    order, rank_in_class = group_order(c.weight_class, -c.total, c.weight,
+        c.lifter_id)
+    class_rank[order] = rank_in_class
+
+    columns = {
+        'lifter_id' : c.lifter_id,
+        'weight' : c.weight,
+        'weight_class' : c.weight_class,
+        'team' : c.team,
+        'status' : c.status,
+        'best' : best,
+        'total' : c.total,
+        'points' : c.points,
+        'rank' : rank,
+        'class_rank' : class_rank,
+    }
+
+    names = [l.name for l in c.lifters]
+    team_names = [t if t is not None else '' for t in collection.team_names]
+
+    return columns, names, team_names
+
+# encode_strings
+def encode_strings(strings):
+    encoded = [s.encode('utf-8') if isinstance(s, unicode) else str(s)
+               for s in strings]
+    ends = np.cumsum([len(s) for s in encoded]).astype('<i8')
+    return ends, ''.join(encoded)
+
+# SnapshotFile
+class SnapshotFile(object):
+    def __init__(self, path, mode):
+        self.path = path
+        self.file = open(path, mode)
+        self.map = None
+        self.header = None
+
+    def map_file(self):
+        # (Re)map the whole file
+        if self.map is not None:
+            self.header = None
+            self.map.close()
+
+        self.map = mmap.mmap(self.file.fileno(), 0)
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype='<u8',
+            buffer=self.map, offset=len(MAGIC))
+
+    def field(self, name):
+        return int(self.header[HEADER_FIELDS.index(name)])
+
+    def array(self, offsets, name):
+        offset, dtype, shape = offsets[name]
+        return np.ndarray(shape, dtype=dtype, buffer=self.map, offset=offset)
+
+    def close(self):
+        self.header = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+# SnapshotWriter
+class SnapshotWriter(SnapshotFile):
+    def __init__(self, path, min_size=1 << 16):
+        # Readers may already have the file mapped, so it is grown and
+        # never replaced
+        if not os.path.exists(path):
+            with open(path, 'wb') as fp:
+                fp.write(MAGIC)
+
+        SnapshotFile.__init__(self, path, 'r+b')
+
+        self.file.seek(0)
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError, '"%s" is not a snapshot file' % path
+
+        if os.path.getsize(path) < max(min_size, HEADER_SIZE):
+            self.file.truncate(max(min_size, HEADER_SIZE))
+
+        self.map_file()
+
+        # Collection and generation published last
+        self.collection = None
+        self.generation = None
+
+    def publish(self, collection):
+        # Write the standings of `collection` (if changed)
+        if collection is self.collection and \
+            collection.generation == self.generation:
+            return
+
+        columns, names, team_names = snapshot_arrays(collection)
+        ends, strings = encode_strings(names + team_names)
+
+        n = len(names)
+        offsets, size = layout(n, len(ends), len(strings))
+
+        self.begin()
+
+        # Grow (doubling) if required
+        if size > len(self.map):
+            self.file.truncate(max(size, 2 * len(self.map)))
+            self.map_file()
+
+        for name, _, _ in COLUMNS:
+            self.array(offsets, name)[...] = columns[name]
+        self.array(offsets, 'string_ends')[...] = ends
+        if strings:
+            self.map[offsets['strings'][0]:size] = strings
+
+        for name, value in [('generation', collection.generation),
+                            ('size', size),
+                            ('n_lifters', n),
+                            ('n_teams', len(team_names)),
+                            ('n_strings', len(ends)),
+                            ('string_bytes', len(strings))]:
+            self.header[HEADER_FIELDS.index(name)] = value
+
+        self.end()
+
+        self.collection = collection
+        self.generation = collection.generation
+
+    def begin(self):
+        # Sequence is odd while writing
+        self.header[0] += 1
+
+    def end(self):
+        self.header[0] += 1
+
+# SnapshotReader
+class SnapshotReader(SnapshotFile):
+    def __init__(self, path):
+        SnapshotFile.__init__(self, path, 'rb')
+
+        if self.file.read(len(MAGIC)) != MAGIC:
+            raise ValueError, '"%s" is not a snapshot file' % path
+
+        self.map = None
+        self.map_file()
+
+    def map_file(self):
+        # Read only
+        if self.map is not None:
+            self.header = None
+            self.map.close()
+
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = np.ndarray((len(HEADER_FIELDS),), dtype='<u8',
+            buffer=self.map, offset=len(MAGIC))
+
+    def sequence(self):
+        return int(self.header[0])
+
+    def read(self, timeout=1.):
+        # Consistent copy of the current snapshot (raises RuntimeError if
+        # the writer is always writing for `timeout` seconds)
+        start = time.time()
+
+        while True:
+            sequence = self.sequence()
+
+            if sequence % 2 == 0:
+                # A copy overlapping a write may be invalid as well as
+                # inconsistent
+                try:
+                    snapshot = self.copy()
+                except (ValueError, TypeError, UnicodeDecodeError):
+                    snapshot = None
+
+                if snapshot is not None and self.sequence() == sequence:
+                    return snapshot
+
+            if time.time() - start > timeout:
+                raise RuntimeError, 'Snapshot not consistent in %.1fs' % \
+                    timeout
+
+            time.sleep(0)
+
+    def copy(self):
+        # Copy of the arrays (None if the file has grown beyond the map)
+        size = self.field('size')
+        if size > len(self.map):
+            self.map_file()
+            return None
+
+        n = self.field('n_lifters')
+        n_teams = self.field('n_teams')
+        offsets, size_ = layout(n, self.field('n_strings'),
+            self.field('string_bytes'))
+        if size_ != size:
+            return None
+
+        columns = dict((name, self.array(offsets, name).copy())
+                       for name, _, _ in COLUMNS)
+
+        ends = self.array(offsets, 'string_ends')
+        start = offsets['strings'][0]
+        blob = self.map[start:start + self.field('string_bytes')]
+
+        starts = np.r_[0, ends[:-1]]
+        strings = [blob[s:e].decode('utf-8') for s, e in zip(starts, ends)]
+
+        return Snapshot(self.field('generation'), columns, strings[:n],
+            strings[n:n + n_teams])
+
+# main
+def main():
+    # Print the standings of a snapshot file
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Print a standings snapshot')
+    parser.add_argument('path')
+    args = parser.parse_args()
+
+    reader = SnapshotReader(args.path)
+    snapshot = reader.read()
+    reader.close()
+
+    c = snapshot.columns
+    for i in np.argsort(c['rank']):
+        line = u'%d\t%s\t%s\t%.1f\t%.2f' % (c['rank'][i] + 1,
+            snapshot.names[i], snapshot.team_names[c['team'][i]],
+            c['total'][i], c['points'][i])
+        print line.encode('utf-8')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+##########################################
+# File: solver.py                        #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Minimum next attempt for every lifter to move up a place in their weight
+# class, into their team's counting lifters, or past the best lifter
+# The team attempt is only solved when teams are scored on Wilks points
+# (`scoring.TopPoints`), whose scores are a lifter's own
+
+# Imports
+from collections import namedtuple
+import numpy as np
+
+import wilks
+from lifter import Lifter, best_lifts
+from scoring import group_order, top_k, TopPoints
+
+# all
+__all__ = [
+    'Needs',
+    'INCREMENT',
+    'solve'
+]
+
+# Attempts are loaded in multiples of INCREMENT (kg)
+INCREMENT = 2.5
+
+# Needs
+# `index` is the lift record index of the next attempt (-1 if none) and
+# `place`, `team` and `best` are the attempt weights required (NaN if not
+# possible or already achieved)
+Needs = namedtuple('Needs', 'lifter_id index place team best')
+
+# next_attempts
+def next_attempts(records, status):
+    # Lift record index of each lifter's next attempt (-1 if none)
+    pending = (records == Lifter.BLANK_CODE) | (records == Lifter.SET_CODE)
+    index = np.argmax(pending, axis=1)
+
+    done = ~np.any(pending, axis=1) | \
+        (status == Lifter.BOMBED_OUT) | (status == Lifter.WITHDRAWN)
+    index[done] = -1
+
+    return index
+
+# attempt_for_total
+def attempt_for_total(required, others, floor, strict, increment):
+    # Attempt weight (in multiples of `increment` and at least `floor`)
+    # giving a total of at least (or more than, if `strict`) `required`
+    x = (required - others) / increment
+    x = np.where(strict, np.floor(x) + 1., np.ceil(x))
+
+    return np.maximum(x * increment, floor)
+
+# team_thresholds
+def team_thresholds(collection, c):
+    # Wilks points above which each lifter would count for their team
+    # under `TopPoints` scoring (with its groups and class cap), and
+    # whether each lifter already counts
+    # A lifter who isn't counting must pass the lowest counting lifter of
+    # their group (if the group has `top` counting), and if their weight
+    # class is already full for the group (`class_cap`), the lowest kept
+    # lifter of the class too, whose place they would take
+    N = len(c.lifters)
+    scoring = collection.team_scoring
+    n_teams = len(collection.team_names)
+    scores = c.points
+
+    group, n_groups = scoring.groups(c, n_teams)
+    totals, counting_rows = scoring.counting(c, scores, collection.top,
+        n_teams)
+
+    counting = np.zeros(N, dtype=bool)
+    counting[counting_rows] = True
+
+    # Counting rows are in (group, descending points) order so the last
+    # wins
+    n_counting = np.bincount(group[counting_rows], minlength=n_groups)
+    lowest = np.zeros(n_groups, dtype=float)
+    lowest[group[counting_rows]] = scores[counting_rows]
+    lowest[n_counting < collection.top] = 0.
+
+    required = lowest[group]
+
+    if scoring.class_cap is not None and N > 0:
+        # Kept rows of each (group, weight class), as `counting`
+        n_classes = np.amax(c.weight_class) + 1
+        key = group * n_classes + c.weight_class
+        n_keys = n_groups * n_classes
+
+        rows = np.flatnonzero(scoring.eligible(c, scores))
+        kept = rows[top_k(key[rows], scoring.class_cap, -scores[rows],
+            c.weight[rows], c.lifter_id[rows])]
+
+        is_kept = np.zeros(N, dtype=bool)
+        is_kept[kept] = True
+
+        n_kept = np.bincount(key[kept], minlength=n_keys)
+        lowest_kept = np.zeros(n_keys, dtype=float)
+        lowest_kept[key[kept]] = scores[kept]
+
+        full = ~is_kept & (n_kept[key] >= scoring.class_cap)
+        required = np.where(full, np.maximum(required, lowest_kept[key]),
+            required)
+
+    return required, counting
+
+# solve
+def solve(collection, increment=INCREMENT):
+    c = collection.columns()
+    N = len(c.lifters)
+
+    index = next_attempts(c.records, c.status)
+    has_next = index >= 0
+    rows = np.arange(N)
+    safe_index = np.where(has_next, index, 0)
+
+    # Total of the other lifts, and the floor from the previous attempt
+    best = best_lifts(c.lifts, c.records)
+    lift = safe_index // 3
+    others = np.sum(best, axis=1) - best[rows, lift]
+
+    attempt = safe_index % 3
+    previous = np.maximum(safe_index - 1, 0)
+    floor = np.where(attempt > 0, c.lifts[rows, previous], 0.)
+
+    coefficients = wilks.coefficients(c.gender, c.weight)
+
+    # Place: pass the lifter above in the weight class (a tie on total goes
+    # to the lighter lifter)
+    place = np.empty(N)
+    place.fill(np.nan)
+
+    order, rank = group_order(c.weight_class, -c.total, c.weight,
+        c.lifter_id)
+    if N > 0:
+        above = np.empty(N, dtype=int)
+        above[order[1:]] = order[:-1]
+        above[order[rank == 0]] = -1
+
+        is_below = above >= 0
+        safe_above = np.where(is_below, above, 0)
+        required = c.total[safe_above]
+        strict = c.weight >= c.weight[safe_above]
+        place = np.where(is_below,
+            attempt_for_total(required, others, floor, strict, increment),
+            np.nan)
+
+    # Team: the points to count for the team (see `team_thresholds`)
+    team = np.empty(N)
+    team.fill(np.nan)
+
+    if isinstance(collection.team_scoring, TopPoints):
+        required, counting = team_thresholds(collection, c)
+        team = np.where(~counting,
+            attempt_for_total(required / coefficients, others, floor, True,
+                              increment),
+            np.nan)
+
+    # Best lifter: pass the points of the leader
+    best_points = np.empty(N)
+    best_points.fill(np.nan)
+
+    if N > 0:
+        leader = collection.ranked()[0]
+        required = c.points[leader] / coefficients
+        best_points = np.where(rows != leader,
+            attempt_for_total(required, others, floor, True, increment),
+            np.nan)
+
+    # Only for lifters with a next attempt
+    index = np.where(has_next, index, -1)
+    place = np.where(has_next, place, np.nan)
+    team = np.where(has_next, team, np.nan)
+    best_points = np.where(has_next, best_points, np.nan)
+
+    return Needs(c.lifter_id, index, place, team, best_points)
@@ -9,10 +9,20 @@
 # Imports
 from PyQt4 import QtCore, QtGui
 from collections import namedtuple
-from lifter import Lifter, LifterCollection
+from lifter import Lifter, LifterCollection, DIVISIONS
+from records import RecordsIndex
 
+import numpy as np
+import os
+import time
 import wilks
+import divisions
+import pace
 import pickle_
+import plates
+import search
+import simulate
+from webexport import HTML_STYLE, SiteExporter, text_of
 from string import Template
 
 # Setup logger
@@ -23,44 +33,8 @@ logger = getLogger('qt')
 Section = namedtuple('Section', 'attribute heading format conversion is_lift')
 
 # Globals
-HTML_TEMPLATE = Template(
-'''<style type="text/css">
-table.results
-{
-font-family:sans-serif;
-border-collapse:collapse;
-}
-
-table.results td, th
-{
-font-size:1.0em;
-border:1px solid black;
-padding:3px 7px 2px 7px;
-}
-
-table.results th
-{
-font-size:1.0em;
-font-weight:bold;
-text-align:left;
-padding-top:5px;
-padding-bottom:4px;
-background-color:#A9BBFF;
-color:black;
-}
-
-table.results tr.alt td
-{
-background-color:#E0E0E0;
-}
-
-h1.results
-{
-font-family:sans-serif;
-}
-
-</style>
-<html>
+HTML_TEMPLATE = Template(HTML_STYLE +
+'''<html>
 <body>
 ${title}
 
@@ -90,6 +64,28 @@ ${tbody}
 </div>
 ''')
 
+AWARDS_TEMPLATE = Template(HTML_STYLE +
+'''<html>
+<body>
+${awards}
+</body>
+</html>
+''')
+
+# section_lift
+def section_lift(section_info):
+    # Translate attribute string into lift and attempt
+    if not section_info.is_lift:
+        return None
+
+    lift, attempt_str = section_info.attribute.split('_')
+    return lift, int(attempt_str)
+
+# format_need
+def format_need(format_, value):
+    # No attempt needed or possible is shown blank
+    return format_ % value if value == value else ''
+
 # TableModel
 class TableModel(QtCore.QAbstractTableModel):
     TRANSLATE_SECTION = [
@@ -109,7 +105,11 @@ class TableModel(QtCore.QAbstractTableModel):
         Section('deadlift_1', 'Deadlift 2', '%.1f', 'toDouble', True),
         Section('deadlift_2', 'Deadlift 3', '%.1f', 'toDouble', True),
         Section('total', 'Total', '%.1f', None, False),
-        Section('points', 'Points', '%.2f', None, False)
+        Section('points', 'Points', '%.2f', None, False),
+        Section('status_name', 'Status', '%s', None, False),
+        Section('need_place', 'Need (class)', '%.1f', None, False),
+        Section('need_team', 'Need (team)', '%.1f', None, False),
+        Section('need_best', 'Need (best)', '%.1f', None, False)
     ]
 
     model_changed = QtCore.pyqtSignal()
@@ -117,6 +117,22 @@ class TableModel(QtCore.QAbstractTableModel):
     def __init__(self, top=3, parent=None):
         QtCore.QAbstractTableModel.__init__(self, parent)
 
+        # Fonts for each lift record and record attempt brush
+        self.setup_fonts()
+        self.record_brush = QtGui.QBrush(QtCore.Qt.red)
+
+        # Formatted row strings by lifter_id, as (revision, strings), and
+        # the strings of the needed attempts (which depend on the whole
+        # collection) as (generation, {lifter_id : strings})
+        self.display_cache = {}
+        self.needs_cache = (None, {})
+
+        # Exporter of the results web site (see `export_site`)
+        self.site_exporter = None
+
+        # Meet shown before a load in the background (see `begin_load`)
+        self.previous_map = None
+
         self.flight_filter = None
         self.last_clicked = None
         self.next_sort = QtCore.Qt.AscendingOrder
@@ -126,6 +142,59 @@ class TableModel(QtCore.QAbstractTableModel):
 
         self.reset()
 
+    def setup_fonts(self):
+        self.fonts = {}
+        for code in [Lifter.BLANK_CODE, Lifter.SET_CODE, Lifter.GOOD_CODE,
+                     Lifter.FAIL_CODE, Lifter.PASS_CODE]:
+            font = QtGui.QFont()
+            if code == Lifter.GOOD_CODE:
+                font.setBold(True)
+            elif code == Lifter.FAIL_CODE:
+                font.setStrikeOut(True)
+            elif code == Lifter.PASS_CODE:
+                font.setStrikeOut(True)
+                font.setItalic(True)
+            elif code == Lifter.SET_CODE:
+                font.setItalic(True)
+
+            self.fonts[code] = font
+
+    def display_strings(self, lifter):
+        # Formatted strings of every section, reformatted only when the
+        # lifter's revision changes
+        try:
+            revision, strings = self.display_cache[lifter.lifter_id]
+        except KeyError:
+            revision = None
+
+        if revision != lifter.revision:
+            strings = [section_info.format % \
+                       getattr(lifter, section_info.attribute)
+                       for section_info in self.LIFTER_SECTIONS]
+            self.display_cache[lifter.lifter_id] = (lifter.revision, strings)
+
+        return strings
+
+    def need_strings(self, lifter):
+        # Formatted strings of the needed attempts, reformatted for all
+        # lifters at once when the collection changes
+        generation, strings = self.needs_cache
+
+        if generation != self.lifters_map.generation:
+            needs = self.lifters_map.needs()
+            formats = [section_info.format
+                       for section_info in self.NEED_SECTIONS]
+
+            strings = {}
+            for i, lifter_id in enumerate(needs.lifter_id):
+                values = (needs.place[i], needs.team[i], needs.best[i])
+                strings[lifter_id] = [format_need(f, v)
+                                      for f, v in zip(formats, values)]
+
+            self.needs_cache = (self.lifters_map.generation, strings)
+
+        return strings[lifter.lifter_id]
+
     # Required Qt methods
     def headerData(self, section, orient, role):
         if role == QtCore.Qt.DisplayRole and orient == QtCore.Qt.Horizontal:
@@ -153,41 +222,31 @@ class TableModel(QtCore.QAbstractTableModel):
         if not index.isValid():
             return QtCore.QVariant()
 
-        # Get active lifter and section info
-        lifter, section_info = self.index_to_lifter(index)
+        # Get active lifter
+        lifter = self.lifters[index.row()]
 
         if role == QtCore.Qt.DisplayRole:
-            # Get section info
-            value = getattr(lifter, section_info.attribute)
-            return section_info.format % value
+            column = index.column()
+            if column < len(self.LIFTER_SECTIONS):
+                return self.display_strings(lifter)[column]
+            else:
+                return self.need_strings(lifter)[
+                    column - len(self.LIFTER_SECTIONS)]
 
         # Handle lift representation here
         elif role == QtCore.Qt.ForegroundRole:
-            pass
+            # Highlight record attempts
+            lift_index = self.SECTION_INDEX[index.column()]
+            records = self.lifters_map.records
+            if lift_index is not None and records is not None:
+                if records.is_record_attempt(lifter, lift_index):
+                    return self.record_brush
         elif role == QtCore.Qt.BackgroundRole:
             pass
         elif role == QtCore.Qt.FontRole:
-            if section_info.is_lift:
-                # Translate attribute string into lift and attempt
-                lift, attempt_str = section_info.attribute.split('_')
-                attempt = int(attempt_str)
-
-                # Get record
-                record = lifter.get_lift(lift, attempt)[0]
-
-                # Set font accordingly
-                font = QtGui.QFont()
-                if record == Lifter.GOOD_LIFT:
-                    font.setBold(True)
-                elif record == Lifter.FAIL_LIFT:
-                    font.setStrikeOut(True)
-                elif record == Lifter.PASS_LIFT:
-                    font.setStrikeOut(True)
-                    font.setItalic(True)
-                elif record == Lifter.SET_LIFT:
-                    font.setItalic(True)
-
-                return font
+            lift_index = self.SECTION_INDEX[index.column()]
+            if lift_index is not None:
+                return self.fonts[lifter.lift_record[lift_index]]
 
         return QtCore.QVariant()
 
@@ -216,9 +275,7 @@ class TableModel(QtCore.QAbstractTableModel):
                 return False
 
             # Emit change over the specified index
-            top_left = self.index(index.row(), 0)
-            bottom_right = self.index(index.row(), self.columnCount(None)-1)
-            self.dataChanged.emit(top_left, bottom_right)
+            self.row_changed(index.row())
 
             # Emit change of the model
             self.model_changed.emit()
@@ -238,16 +295,71 @@ class TableModel(QtCore.QAbstractTableModel):
         if not section_info.is_lift:
             return
 
-        # Translate attribute string into lift and attempt
-        lift, attempt_str = section_info.attribute.split('_')
-        attempt = int(attempt_str)
+        # Translate section into lift and attempt
+        lift, attempt = self.SECTION_LIFT[index.column()]
 
         # Validate the lift
         lifter.validate_lift(lift, attempt, valid)
 
+        # Emit signals (total, points and status may change with the lift)
+        self.model_changed.emit()
+        self.row_changed(index.row())
+
+    def toggle_withdrawn(self, index):
+        if not index.isValid():
+            return
+
+        lifter, section_info = self.index_to_lifter(index)
+        lifter.withdrawn = not lifter.withdrawn
+
         # Emit signals
         self.model_changed.emit()
-        self.dataChanged.emit(index, index)
+        self.row_changed(index.row())
+
+    def set_division(self, index, attribute, value):
+        if not index.isValid():
+            return
+
+        lifter, section_info = self.index_to_lifter(index)
+        setattr(lifter, attribute, value)
+
+        # Emit signals
+        self.model_changed.emit()
+        self.row_changed(index.row())
+
+    def lifters_changed(self, lifters):
+        # Rows of `lifters` changed outside of the view (e.g. a batch of
+        # ingested decisions), emitted as a single change
+        lifter_ids = set(lifter.lifter_id for lifter in lifters)
+        rows = [i for i, lifter in enumerate(self.lifters)
+                if lifter.lifter_id in lifter_ids]
+
+        if rows:
+            top_left = self.index(min(rows), 0)
+            bottom_right = self.index(max(rows), self.columnCount(None)-1)
+            self.dataChanged.emit(top_left, bottom_right)
+
+        self.needs_changed()
+
+        # Emit change of the model
+        self.model_changed.emit()
+
+    def row_changed(self, row):
+        top_left = self.index(row, 0)
+        bottom_right = self.index(row, self.columnCount(None)-1)
+        self.dataChanged.emit(top_left, bottom_right)
+
+        self.needs_changed()
+
+    def needs_changed(self):
+        # Needed attempts of every lifter may change with any lifter
+        if len(self.lifters) == 0:
+            return
+
+        top_left = self.index(0, len(self.LIFTER_SECTIONS))
+        bottom_right = self.index(len(self.lifters)-1,
+            self.columnCount(None)-1)
+        self.dataChanged.emit(top_left, bottom_right)
 
     def flags(self, index):
         if not index.isValid():
@@ -361,6 +473,7 @@ class TableModel(QtCore.QAbstractTableModel):
 
         lifter, section_info = self.index_to_lifter(index)
         self.lifters_map.remove(lifter)
+        self.display_cache.pop(lifter.lifter_id, None)
 
         self.sorted_by()
         self.reset()
@@ -368,16 +481,107 @@ class TableModel(QtCore.QAbstractTableModel):
         # Emit change of model
         self.model_changed.emit()
 
+    # Team scoring
+    def set_team_scoring(self, top, team_scoring):
+        self.lifters_map.set_team_scoring(top, team_scoring)
+        self.needs_changed()
+
+        # Emit change of model
+        self.model_changed.emit()
+
+    # Records
+    def load_records(self, file_):
+        records = RecordsIndex()
+        records.load(file_)
+        self.lifters_map.set_records(records)
+
+        # Record attempts may change anywhere
+        self.reset()
+
+        # Emit change of model
+        self.model_changed.emit()
+
+    def export_records(self, file_):
+        records = self.lifters_map.records
+        if records is None:
+            logger.error('No records loaded.')
+            return
+
+        records.export(file_)
+
     # Save / load / export
     def save(self, file_):
         pickle_.dump(file_, self.lifters_map)
 
     def load(self, file_):
-        self.lifters_map = pickle_.load(file_)
+        self.set_collection(pickle_.load(file_))
+
+    def set_collection(self, collection):
+        self.lifters_map = collection
+        self.display_cache = {}
+        self.needs_cache = (None, {})
 
         self.sorted_by()
         self.reset()
 
+    # Loading in the background (see `MeetLoader`)
+    def begin_load(self, collection):
+        # Show `collection` (the loaded meet without its lifters) as they
+        # are inserted, keeping the current meet in case of cancellation
+        self.previous_map = self.lifters_map
+        self.set_collection(collection)
+
+    def insert_lifters(self, lifters):
+        for lifter in lifters:
+            self.lifters_map.insert(lifter)
+
+        self.sorted_by()
+        self.reset()
+
+    def end_load(self, cancelled=False):
+        if cancelled:
+            self.set_collection(self.previous_map)
+
+        self.previous_map = None
+
+        # Emit change of model
+        self.model_changed.emit()
+
+    def export_awards(self, file_, places=3):
+        # Places in every division and weight class (see `divisions.awards`)
+        awards = ''
+        for label, placed in divisions.awards(self.lifters_map, places):
+            awards += '<div>\n<p style="font-family:sans-serif; ' \
+                'font-weight:bold;font-size:1.2em;">%s</p>\n' % label
+            awards += '<table class="results", style="table-layout:auto;">' \
+                '\n<tbody>\n'
+            awards += '<tr><th>Place</th><th>Name</th><th>Team</th>' \
+                '<th>Total</th><th>Points</th></tr>\n'
+
+            for row, (place, lifter, total, points) in enumerate(placed):
+                if row % 2 == 1:
+                    awards += '<tr class="alt">'
+                else:
+                    awards += '<tr>'
+
+                awards += '<td>%d</td><td>%s</td><td>%s</td><td>%.1f</td>' \
+                    '<td>%.2f</td></tr>\n' % (place, lifter.name,
+                    lifter.team, total, points)
+
+            awards += '</tbody>\n</table>\n</div>\n'
+
+        with open(file_, 'w') as fp:
+            fp.write(AWARDS_TEMPLATE.substitute(awards=awards))
+
+    def export_site(self, directory):
+        # Static web site of the results in `directory`, rewriting only the
+        # pages changed since the last export (see `webexport`)
+        if self.site_exporter is None or \
+            self.site_exporter.directory != directory:
+            self.site_exporter = SiteExporter(directory)
+
+        return self.site_exporter.export(self.lifters_map)
+
     def export(self, file_):
         # Results summary
 
@@ -403,8 +607,8 @@ class TableModel(QtCore.QAbstractTableModel):
         for team, info in team_info.iteritems():
             # Prepare data to output
             data = [(team, info[0])]
-            for lifter in info[1]:
-                data.append( ('&nbsp;' * 4 + lifter.name, lifter.points) )
+            for lifter, points in zip(info[1], info[2]):
+                data.append( ('&nbsp;' * 4 + lifter.name, points) )
 
             # Output the data
             for perf, points in data:
@@ -443,20 +647,18 @@ class TableModel(QtCore.QAbstractTableModel):
                 row_str = '<tr>'
 
             # Add data
-            for section_info in self.TRANSLATE_SECTION:
+            strings = self.display_strings(lifter) + \
+                self.need_strings(lifter)
+            for section, section_info in enumerate(self.TRANSLATE_SECTION):
                 # Get data as string
-                value = getattr(lifter, section_info.attribute)
-                data = section_info.format % value
+                data = strings[section]
 
                 # If a lift, set up style string
                 style_str = '"'
                 if section_info.is_lift:
-                    # Translate attribute string into lift and attempt
-                    lift, attempt_str = section_info.attribute.split('_')
-                    attempt = int(attempt_str)
-
                     # Get record
-                    record = lifter.get_lift(lift, attempt)[0]
+                    record = chr(
+                        lifter.lift_record[self.SECTION_INDEX[section]])
 
                     # Set font accordingly
                     if record == Lifter.GOOD_LIFT:
@@ -493,10 +695,167 @@ class TableModel(QtCore.QAbstractTableModel):
         with open(file_, 'w') as fp:
             fp.write(html_table)
 
+# insert_division_sections
+def insert_division_sections(sections):
+    # Divisions (after the lifter's details)
+    i = [s.attribute for s in sections].index('rack_height') + 1
+    sections[i:i] = [Section(d.attribute, d.label, '%s', None, False)
+                     for d in DIVISIONS]
+
+insert_division_sections(TableModel.TRANSLATE_SECTION)
+
+# Sections formatted from the lifter alone, and the needed attempts (last)
+TableModel.LIFTER_SECTIONS = TableModel.TRANSLATE_SECTION[:-3]
+TableModel.NEED_SECTIONS = TableModel.TRANSLATE_SECTION[-3:]
+
+# Precompiled (lift, attempt) and lift record index of each section (None if
+# not a lift)
+TableModel.SECTION_LIFT = list(section_lift(section_info)
+    for section_info in TableModel.TRANSLATE_SECTION)
+
+TableModel.SECTION_INDEX = list(
+    Lifter.LIFT_OFFSET[l[0]] + l[1] if l is not None else None
+    for l in TableModel.SECTION_LIFT)
+
+# Cancelled
+class Cancelled(Exception):
+    pass
+
+# MeetLoader
+class MeetLoader(QtCore.QThread):
+    # Loads the meet saved at `path` on a thread and streams its lifters to
+    # the GUI thread, the first flight first and then in chunks of at least
+    # CHUNK_SIZE (and of the lifters sent so far, so the model is re-sorted
+    # only a logarithmic number of times)
+    # The saved meet is one pickle, so it is read whole before any lifter
+    # is sent: `progress` reports the bytes read and then the lifters sent,
+    # `loaded` sends the meet without its lifters and `chunk` each list of
+    # lifters (one at a time, the next only once `chunk_inserted` is
+    # called)
+    CHUNK_SIZE = 100
+
+    progress = QtCore.pyqtSignal(str, int, int)
+    loaded = QtCore.pyqtSignal(object)
+    chunk = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, path, parent=None):
+        QtCore.QThread.__init__(self, parent)
+
+        self.path = path
+        self.cancelled = False
+        self.started_load = False
+        self.size = 0
+        self.last_percent = None
+
+        self.semaphore = QtCore.QSemaphore(1)
+
+    def cancel(self):
+        self.cancelled = True
+        self.semaphore.release()
+
+    def chunk_inserted(self):
+        self.semaphore.release()
+
+    def read_progress(self, bytes_read):
+        # Stop reading (from within `pickle_.load`) once cancelled
+        if self.cancelled:
+            raise Cancelled
+
+        percent = 100 * bytes_read // max(self.size, 1)
+        if percent != self.last_percent:
+            self.last_percent = percent
+            self.progress.emit('Reading', bytes_read, self.size)
+
+    def run(self):
+        try:
+            self.size = os.path.getsize(self.path)
+            collection = pickle_.load(self.path,
+                progress=self.read_progress)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.failed.emit('Failed to load "%s": %s' % (self.path, e))
+            return
+
+        lifters = sorted(collection.map_.itervalues(),
+                         key=lambda l: (l.flight, l.lifter_id))
+        n = len(lifters)
+
+        self.started_load = True
+        self.loaded.emit(collection.empty())
+
+        # The first flight, then chunks which double the lifters sent
+        i = 0
+        while i < n:
+            if i == 0:
+                end = 1
+                while end < n and lifters[end].flight == lifters[0].flight:
+                    end += 1
+            else:
+                end = i + max(self.CHUNK_SIZE, i)
+
+            self.semaphore.acquire()
+            if self.cancelled:
+                return
+
+            self.chunk.emit(lifters[i:end])
+            i = min(end, n)
+            self.progress.emit('Loading lifters', i, n)
+
+# SearchProxyModel
+class SearchProxyModel(QtGui.QSortFilterProxyModel):
+    # Rows of a `TableModel` whose lifters match a search (see
+    # `search.SearchIndex`), in the order of the model
+    def __init__(self, table_model, parent=None):
+        QtGui.QSortFilterProxyModel.__init__(self, parent)
+
+        self.setSourceModel(table_model)
+        self.table_model = table_model
+
+        self.query = ''
+        self.search_index = None
+        self.matches = None
+
+        self.table_model.modelReset.connect(self.refresh)
+        self.table_model.model_changed.connect(self.refresh)
+
+    def index_for(self, collection):
+        # Index of the collection of the model (rebuilt if loaded)
+        if self.search_index is None or \
+            self.search_index.collection is not collection:
+            if self.search_index is not None:
+                self.search_index.close()
+            self.search_index = search.SearchIndex(collection)
+
+        return self.search_index
+
+    def set_query(self, query):
+        self.query = unicode(query)
+        self.refresh()
+
+    def refresh(self):
+        # The index is up to date, but the matches of the query may change
+        matches = None
+        if self.query.strip():
+            matches = self.index_for(self.table_model.lifters_map).search(
+                self.query)
+
+        if matches != self.matches:
+            self.matches = matches
+            self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        if self.matches is None:
+            return True
+
+        return self.table_model.lifters[row].lifter_id in self.matches
+
 # TableView
 class TableView(QtGui.QTableView):
     PERFORMANCE_TEXT = '&Performance'
     SUMMARY_TEXT = '&Summary'
+    WITHDRAW_TEXT = '&Withdraw / reinstate'
     GOOD_LIFT = '&Good lift'
     FAIL_LIFT = '&Fail lift'
     PASS_LIFT = '&Pass lift'
@@ -504,15 +863,40 @@ class TableView(QtGui.QTableView):
     def __init__(self, model, parent=None):
         QtGui.QTableView.__init__(self, parent)
 
-        self.setModel(model)
+        # Shown through a search filter, so indices of the view are mapped
+        # to the table model
+        self.table_model = model
+        self.proxy_model = SearchProxyModel(model, self)
+        self.setModel(self.proxy_model)
+
+        self.summary_dialog = None
+
+        # Performance dialogs by lifter_id (of the current collection)
+        self.performance_dialogs = {}
+        self.table_model.modelReset.connect(self.prune_performance_dialogs)
 
         self.setup_menus()
         self.setup_ui()
 
+    def prune_performance_dialogs(self):
+        # Lifter ids restart with each loaded meet, so dialogs of lifters of
+        # another collection are closed
+        collection = self.table_model.lifters_map
+        for lifter_id, dialog in self.performance_dialogs.items():
+            if dialog.collection is not collection:
+                dialog.close()
+                dialog.deleteLater()
+                del self.performance_dialogs[lifter_id]
+
     def setup_menus(self):
+        self.division_actions = {}
+
         menu = QtGui.QMenu()
         menu.addAction(self.PERFORMANCE_TEXT)
         menu.addAction(self.SUMMARY_TEXT)
+        menu.addSeparator()
+        menu.addAction(self.WITHDRAW_TEXT)
+        self.add_division_menus(menu)
         self.general_menu = menu
 
         menu = QtGui.QMenu()
@@ -522,8 +906,21 @@ class TableView(QtGui.QTableView):
         menu.addSeparator()
         menu.addAction(self.PERFORMANCE_TEXT)
         menu.addAction(self.SUMMARY_TEXT)
+        menu.addSeparator()
+        menu.addAction(self.WITHDRAW_TEXT)
+        self.add_division_menus(menu)
         self.lift_menu = menu
 
+    def add_division_menus(self, menu):
+        # Submenu of the values of each division, with the (attribute, value)
+        # of each action
+        menu.addSeparator()
+        for division in DIVISIONS:
+            submenu = menu.addMenu(division.label)
+            for value in division.values:
+                action = submenu.addAction(value)
+                self.division_actions[action] = (division.attribute, value)
+
     def setup_ui(self):
         self.verticalHeader().setVisible(False)
 
@@ -534,7 +931,7 @@ class TableView(QtGui.QTableView):
 
         # Otherwise resize to contents
         headings = [i.heading for i in TableModel.TRANSLATE_SECTION]
-        for heading in ['M/F', 'Flight', 'Weight', 'Team', 'Name']:
+        for heading in ['M/F', 'Flight', 'Weight', 'Team', 'Name', 'Status']:
             i = headings.index(heading)
             self.horizontalHeader().setResizeMode(i,
                 QtGui.QHeaderView.ResizeToContents
@@ -550,24 +947,31 @@ class TableView(QtGui.QTableView):
         # self.setSortingEnabled(True)
         self.horizontalHeader().setClickable(True)
         self.horizontalHeader().sectionClicked.connect(
-            self.model().section_clicked
+            self.table_model.section_clicked
         )
 
         self.setSelectionBehavior(QtGui.QAbstractItemView.SelectItems)
         self.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
 
+    def set_search(self, query):
+        self.proxy_model.set_query(query)
+
+    def current_source_index(self):
+        # Current index of the table model
+        return self.proxy_model.mapToSource(self.currentIndex())
+
     def contextMenuEvent(self, event):
         # Check from mouse
         if event.reason() != QtGui.QContextMenuEvent.Mouse:
             return
 
         # Check index
-        index = self.indexAt(event.pos())
+        index = self.proxy_model.mapToSource(self.indexAt(event.pos()))
         if not index.isValid():
             return
 
         # From the index get the lifter and section info
-        lifter, section_info = self.model().index_to_lifter(index)
+        lifter, section_info = self.table_model.index_to_lifter(index)
 
         # Execute the menu
         if section_info.is_lift:
@@ -582,17 +986,38 @@ class TableView(QtGui.QTableView):
             return
 
         if action.text() == self.PERFORMANCE_TEXT:
-            # Perforamnce dialog
-            dialog = PerformanceDialog(self)
-            dialog.set_lifter(lifter)
-            dialog.exec_()
+            # Performance dialog (non-modal and updated with the model)
+            try:
+                dialog = self.performance_dialogs[lifter.lifter_id]
+            except KeyError:
+                dialog = PerformanceDialog(self.table_model, self)
+                dialog.set_lifter(lifter)
+                self.performance_dialogs[lifter.lifter_id] = dialog
+
+            dialog.show()
+            dialog.raise_()
+            dialog.activateWindow()
             return
 
         elif action.text() == self.SUMMARY_TEXT:
-            # Summary dialog
-            dialog = SummaryDialog(self)
-            dialog.set_lifter(lifter)
-            dialog.exec_()
+            # Summary dialog (non-modal and updated with the model)
+            if self.summary_dialog is None:
+                self.summary_dialog = SummaryDialog(self.table_model, self)
+
+            # (Shown first so the teams are up to date)
+            self.summary_dialog.show()
+            self.summary_dialog.set_lifter(lifter)
+            self.summary_dialog.raise_()
+            self.summary_dialog.activateWindow()
+            return
+
+        elif action.text() == self.WITHDRAW_TEXT:
+            self.table_model.toggle_withdrawn(index)
+            return
+
+        elif action in self.division_actions:
+            attribute, value = self.division_actions[action]
+            self.table_model.set_division(index, attribute, value)
             return
 
         if section_info.is_lift:
@@ -605,15 +1030,35 @@ class TableView(QtGui.QTableView):
                 valid = False
 
             # Validate the lift
-            self.model().validate_lift(index, valid)
+            self.table_model.validate_lift(index, valid)
 
 # PerformanceDialog
 class PerformanceDialog(QtGui.QDialog):
-    def __init__(self, parent=None, flags=QtCore.Qt.Dialog):
+    # Minimum time between updates (ms)
+    UPDATE_INTERVAL = 250
+
+    def __init__(self, table_model, parent=None, flags=QtCore.Qt.Dialog):
         QtGui.QDialog.__init__(self, parent, flags)
 
+        self.table_model = table_model
+        self.lifter = None
+        self.collection = None
+
+        # Lifter revision and standing last shown
+        self.shown = None
+
         self.setup_ui()
 
+        # Changes within UPDATE_INTERVAL of an update are coalesced into the
+        # next
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(self.UPDATE_INTERVAL)
+        self.update_timer.timeout.connect(self.update_performance)
+
+        self.table_model.model_changed.connect(self.schedule_update)
+        self.table_model.modelReset.connect(self.schedule_update)
+
     def setup_ui(self):
         self.lifter_info = QtGui.QLabel('')
 
@@ -670,6 +1115,42 @@ class PerformanceDialog(QtGui.QDialog):
 
     def set_lifter(self, lifter):
         self.lifter = lifter
+        self.collection = lifter.collection()
+        self.shown = None
+
+        self.update_performance()
+
+    def schedule_update(self):
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def update_performance(self):
+        # Hidden dialogs are updated when shown
+        if not self.isVisible():
+            return
+
+        # Lifter may have been removed or another collection loaded
+        lifter = None
+        if self.table_model.lifters_map is self.collection:
+            try:
+                lifter = self.collection[self.lifter.lifter_id]
+            except KeyError:
+                pass
+
+        if lifter is None:
+            self.setWindowTitle('Performance: %s (removed)' % \
+                self.lifter.name)
+            return
+
+        # Only update if the lifter, their team's standing or the best team
+        # have changed
+        team, team_total, best_total = lifter.collection().standing(lifter)
+        shown = (lifter, lifter.revision, team_total, best_total)
+        if shown == self.shown:
+            return
+
+        self.lifter = lifter
+        self.shown = shown
 
         self.setWindowTitle('Performance: %s' % lifter.name)
 
@@ -689,10 +1170,6 @@ class PerformanceDialog(QtGui.QDialog):
             label = getattr(self, '%s_label' % attr)
             label.setText('%.2f' % getattr(lifter, attr))
 
-        # Get team info
-        _, best_total, team_info = lifter.overall_info()
-        team_total, _ = team_info[lifter.team]
-
         # Get difference to best_total
         difference = best_total[1] - team_total
 
@@ -728,21 +1205,392 @@ class PerformanceDialog(QtGui.QDialog):
 
         self.projected_points_edit.setText('%.2f' % points)
 
+    def showEvent(self, event):
+        self.update_performance()
+        QtGui.QDialog.showEvent(self, event)
+
+# Simulation
+class Simulation(QtCore.QThread):
+    # Runs `simulate.simulate_columns` on a snapshot of the collection off
+    # the GUI thread (for a large meet it takes seconds) and emits
+    # `simulated` with the probabilities unless cancelled
+    simulated = QtCore.pyqtSignal(object)
+
+    def __init__(self, collection, n, parent=None):
+        QtCore.QThread.__init__(self, parent)
+
+        # Copied on the GUI thread, as the collection changes while running
+        self.collection = collection
+        self.generation, self.columns = collection.snapshot()
+        self.team_scoring = collection.team_scoring
+        self.team_names = list(collection.team_names)
+        self.top = collection.top
+        self.n = n
+
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        try:
+            probabilities = simulate.simulate_columns(self.columns,
+                self.team_scoring, self.team_names, self.top, self.n,
+                cancelled=lambda: self.cancelled)
+        except Exception:
+            logger.exception('Simulation failed')
+            return
+
+        if probabilities is not None:
+            self.simulated.emit(probabilities)
+
+# SummaryModel
+class SummaryModel(QtCore.QAbstractItemModel):
+    HEADINGS = ['Team / lifter', 'Points', 'Win %', 'Reachable']
+
+    # Role of the values the view is sorted on
+    SORT_ROLE = QtCore.Qt.UserRole
+
+    # Number of counting lifters added to a team each fetch
+    FETCH_SIZE = 20
+
+    # Number of simulated meet completions for the win probabilities, run
+    # on a `Simulation` thread once the collection has not changed for
+    # SIMULATION_DELAY (ms)
+    SIMULATIONS = 10000
+    SIMULATION_DELAY = 500
+
+    summary_changed = QtCore.pyqtSignal()
+
+    def __init__(self, table_model, parent=None):
+        QtCore.QAbstractItemModel.__init__(self, parent)
+
+        self.table_model = table_model
+
+        # Team rows of [label, total, reachable, [(lifter, points), ...]]
+        # and the number of counting lifters fetched for each
+        self.teams = []
+        self.fetched = []
+
+        self.best_team = (None, 0.)
+        self.best_lifter = None
+
+        # Win probabilities by team label and lifter
+        self.team_probabilities = {}
+        self.lifter_probabilities = {}
+
+        # Collection and generation of the current rows, and of the
+        # probabilities
+        self.collection = None
+        self.generation = None
+        self.simulated = None
+
+        # Updated only while active (e.g. while the dialog is shown)
+        self.active = True
+
+        self.simulation_timer = QtCore.QTimer(self)
+        self.simulation_timer.setSingleShot(True)
+        self.simulation_timer.setInterval(self.SIMULATION_DELAY)
+        self.simulation_timer.timeout.connect(self.update_probabilities)
+
+        # Running `Simulation` (one at a time), stopped before exiting
+        self.simulation = None
+        QtCore.QCoreApplication.instance().aboutToQuit.connect(
+            self.stop_simulation)
+
+        self.update_summary()
+
+        # Loading a collection resets the table model
+        self.table_model.model_changed.connect(self.update_summary)
+        self.table_model.modelReset.connect(self.update_summary)
+
+    # Rows from the collection
+    def team_rows(self, collection):
+        c = collection.columns()
+        totals, rows, scores, labels = collection.team_scores()
+        group, n_groups = collection.team_scoring.groups(c,
+            len(collection.team_names))
+
+        # Teams with lifters (in group order, as `standings`)
+        present = np.flatnonzero(np.bincount(group, minlength=n_groups) > 0)
+        standings = collection.standings()
+
+        # Counting rows are ordered by group and then score
+        counting_group = group[rows]
+        starts = np.searchsorted(counting_group, present, side='left')
+        ends = np.searchsorted(counting_group, present, side='right')
+
+        teams = []
+        for i, g in enumerate(present):
+            reachable = '%.2f - %.2f' % (standings.low[i], standings.high[i])
+            if standings.clinched[i]:
+                reachable += ' (clinched)'
+            elif standings.eliminated[i]:
+                reachable += ' (eliminated)'
+
+            members = [(c.lifters[row], scores[row])
+                       for row in rows[starts[i]:ends[i]]]
+
+            teams.append([labels[g], totals[g], reachable, members])
+
+        return teams
+
+    def set_active(self, active):
+        self.active = active
+
+        if not active:
+            self.simulation_timer.stop()
+            return
+
+        self.update_summary()
+        if self.simulated != (self.collection, self.generation):
+            self.simulation_timer.start()
+
+    def update_summary(self):
+        if not self.active:
+            return
+
+        collection = self.table_model.lifters_map
+        if collection is self.collection and \
+            collection.generation == self.generation:
+            return
+
+        teams = self.team_rows(collection)
+
+        same_teams = collection is self.collection and \
+            [t[0] for t in teams] == [t[0] for t in self.teams]
+
+        self.collection = collection
+        self.generation = collection.generation
+
+        if not same_teams:
+            # Teams added or removed (or a new collection)
+            self.beginResetModel()
+            self.teams = teams
+            self.fetched = [0] * len(teams)
+            self.endResetModel()
+        else:
+            for row, team in enumerate(teams):
+                self.update_team(row, team)
+
+        # Best team and lifter
+        self.best_team = (None, 0.)
+        for team in self.teams:
+            if team[1] > self.best_team[1]:
+                self.best_team = (team[0], team[1])
+
+        c = collection.columns()
+        ranked = collection.ranked()
+        self.best_lifter = c.lifters[ranked[0]] if len(ranked) > 0 else None
+
+        self.summary_changed.emit()
+
+        # Restart the simulation
+        self.simulation_timer.start()
+
+    def update_team(self, row, team):
+        # Update team `row` with only the change signals required
+        previous = self.teams[row]
+        self.teams[row] = team
+
+        if previous[1:3] != team[1:3]:
+            self.dataChanged.emit(self.index(row, 1),
+                self.index(row, len(self.HEADINGS) - 1))
+
+        parent = self.index(row, 0)
+        fetched = self.fetched[row]
+        members = team[3]
+
+        # Fetched counting lifters which are no longer counting
+        if fetched > len(members):
+            self.beginRemoveRows(parent, len(members), fetched - 1)
+            self.fetched[row] = fetched = len(members)
+            self.endRemoveRows()
+
+        changed = [i for i in xrange(fetched)
+                   if previous[3][i] != members[i]]
+        if changed:
+            self.dataChanged.emit(self.index(changed[0], 0, parent),
+                self.index(changed[-1], len(self.HEADINGS) - 1, parent))
+
+    def update_probabilities(self):
+        collection = self.collection
+        if collection is None or not self.active:
+            return
+
+        # Rerun (if still out of date) once the running simulation finishes
+        if self.simulation is not None:
+            return
+
+        self.simulated = (collection, self.generation)
+        self.simulation = Simulation(collection, self.SIMULATIONS, self)
+        self.simulation.simulated.connect(self.set_probabilities)
+        self.simulation.finished.connect(self.simulation_finished)
+        self.simulation.start()
+
+    def simulation_finished(self):
+        self.simulation.deleteLater()
+        self.simulation = None
+
+        if self.active and \
+            self.simulated != (self.collection, self.generation):
+            self.simulation_timer.start()
+
+    def stop_simulation(self):
+        self.simulation_timer.stop()
+        if self.simulation is not None:
+            self.simulation.cancel()
+            self.simulation.wait()
+
+    def set_probabilities(self, probabilities):
+        # Probabilities of a meet since replaced are dropped
+        if self.simulation is None or \
+            self.simulation.collection is not self.collection:
+            return
+
+        self.team_probabilities = dict(zip(probabilities.teams,
+            probabilities.team_probabilities))
+        self.lifter_probabilities = dict(zip(probabilities.lifters,
+            probabilities.lifter_probabilities))
+
+        # Win % of every team and fetched lifter
+        column = self.HEADINGS.index('Win %')
+        if len(self.teams) == 0:
+            return
+
+        self.dataChanged.emit(self.index(0, column),
+            self.index(len(self.teams) - 1, column))
+        for row, fetched in enumerate(self.fetched):
+            if fetched > 0:
+                parent = self.index(row, 0)
+                self.dataChanged.emit(self.index(0, column, parent),
+                    self.index(fetched - 1, column, parent))
+
+    # Required Qt methods
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        # Internal id is 0 for a team and 1 + the team row for a lifter
+        if not parent.isValid():
+            if 0 <= row < len(self.teams):
+                return self.createIndex(row, column, 0)
+        elif parent.internalId() == 0:
+            if 0 <= row < self.fetched[parent.row()]:
+                return self.createIndex(row, column, parent.row() + 1)
+
+        return QtCore.QModelIndex()
+
+    def parent(self, index):
+        if not index.isValid() or index.internalId() == 0:
+            return QtCore.QModelIndex()
+
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return len(self.teams)
+
+        if parent.internalId() == 0 and parent.column() == 0:
+            return self.fetched[parent.row()]
+
+        return 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.HEADINGS)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        if not parent.isValid():
+            return len(self.teams) > 0
+
+        if parent.internalId() == 0 and parent.column() == 0:
+            return len(self.teams[parent.row()][3]) > 0
+
+        return False
+
+    def canFetchMore(self, parent):
+        if not parent.isValid() or parent.internalId() != 0:
+            return False
+
+        row = parent.row()
+        return self.fetched[row] < len(self.teams[row][3])
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        row = parent.row()
+        fetched = self.fetched[row]
+        n = min(self.FETCH_SIZE, len(self.teams[row][3]) - fetched)
+
+        self.beginInsertRows(parent, fetched, fetched + n - 1)
+        self.fetched[row] = fetched + n
+        self.endInsertRows()
+
+    def headerData(self, section, orient, role):
+        if role == QtCore.Qt.DisplayRole and orient == QtCore.Qt.Horizontal:
+            return self.HEADINGS[section]
+
+        return QtCore.QVariant()
+
+    def data(self, index, role):
+        if not index.isValid():
+            return QtCore.QVariant()
+
+        if role not in (QtCore.Qt.DisplayRole, self.SORT_ROLE):
+            return QtCore.QVariant()
+
+        column = index.column()
+        team_row = index.internalId()
+
+        if team_row == 0:
+            label, total, reachable, members = self.teams[index.row()]
+            values = [label, total,
+                      self.team_probabilities.get(label, 0.), reachable]
+        else:
+            lifter, points = self.teams[team_row - 1][3][index.row()]
+            values = [lifter.name, points,
+                      self.lifter_probabilities.get(lifter, 0.), '']
+
+        value = values[column]
+
+        # Lifters may have no team (None)
+        if column == 0:
+            value = text_of(value)
+
+        if role == self.SORT_ROLE:
+            if column == 0:
+                return value.lower()
+            return value
+
+        if column == 1:
+            return '%.2f' % value
+        elif column == 2:
+            return '%.1f' % (100. * value)
+
+        return value
+
 # SummaryDialog
 class SummaryDialog(QtGui.QDialog):
-    def __init__(self, parent=None, flags=QtCore.Qt.Dialog):
+    def __init__(self, table_model, parent=None, flags=QtCore.Qt.Dialog):
         QtGui.QDialog.__init__(self, parent, flags)
 
+        self.model = SummaryModel(table_model, self)
+
         self.setup_ui()
 
+        self.model.summary_changed.connect(self.update_labels)
+        self.update_labels()
+
     def setup_ui(self):
-        self.tree = QtGui.QTreeWidget(self)
-        self.tree.setColumnCount(2)
-        header_item = QtGui.QTreeWidgetItem(
-            None,
-            ['Team / lifter', 'Points']
-        )
-        self.tree.setHeaderItem(header_item)
+        # Sorted in the view (without rebuilding the model)
+        self.proxy_model = QtGui.QSortFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.model)
+        self.proxy_model.setSortRole(SummaryModel.SORT_ROLE)
+        self.proxy_model.setDynamicSortFilter(True)
+
+        self.tree = QtGui.QTreeView(self)
+        self.tree.setModel(self.proxy_model)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setSortingEnabled(True)
+        self.tree.sortByColumn(0, QtCore.Qt.AscendingOrder)
         header = self.tree.header()
         header.setResizeMode(QtGui.QHeaderView.ResizeToContents)
 
@@ -769,43 +1617,191 @@ class SummaryDialog(QtGui.QDialog):
 
         self.setLayout(main_layout)
 
+        self.setWindowTitle('Summary')
+
     def set_lifter(self, lifter):
-        self.lifter = lifter
+        # Select the team of `lifter`
+        team = lifter.collection().team_label(lifter)
+
+        for row, team_row in enumerate(self.model.teams):
+            if team_row[0] == team:
+                index = self.proxy_model.mapFromSource(
+                    self.model.index(row, 0))
+                self.tree.setCurrentIndex(index)
+                self.tree.expand(index)
+                self.tree.scrollTo(index)
+                break
+
+    def update_labels(self):
+        # Set best team
+        self.best_team_label.setText('%s [%.2f]' % self.model.best_team)
+
+        # Set the best lifter
+        best_lifter = self.model.best_lifter
+        if best_lifter is None:
+            self.best_lifter_label.setText('')
+        else:
+            self.best_lifter_label.setText('%s [%.2f]' % \
+                (best_lifter.name, best_lifter.points))
+
+    # The standings and probabilities are only updated while shown
+    def showEvent(self, event):
+        self.model.set_active(True)
+        QtGui.QDialog.showEvent(self, event)
+
+    def hideEvent(self, event):
+        self.model.set_active(False)
+        QtGui.QDialog.hideEvent(self, event)
+
+# PaceDialog
+class PaceDialog(QtGui.QDialog):
+    # Minimum time between updates (ms), and the time between updates
+    # without changes (for the time since the last attempt)
+    UPDATE_INTERVAL = 1000
+    REFRESH_INTERVAL = 10000
+
+    HEADINGS = ['Flight', 'Done', 'Remaining', 'Attempts/min'] + \
+        ['Latency p%d (s)' % q for q in pace.PERCENTILES] + \
+        ['Duration', 'Finish']
+
+    def __init__(self, table_model, parent=None, flags=QtCore.Qt.Dialog):
+        QtGui.QDialog.__init__(self, parent, flags)
 
-        self.setWindowTitle('Summary: %s' % lifter.name)
+        self.table_model = table_model
 
-        # Get team info as sorted by team name
-        best_lifter, best_total, team_info = lifter.overall_info()
-        team_info = sorted(team_info.iteritems(), key=lambda x: x[0].lower())
+        self.setup_ui()
 
-        # Add to the tree widget and get best team total
-        best_total = (None, 0.)
-        for i, (team, info) in enumerate(team_info):
-            if info[0] > best_total[1]:
-                best_total = (team, info[0])
+        self.update_timer = QtCore.QTimer(self)
+        self.update_timer.setSingleShot(True)
+        self.update_timer.setInterval(self.UPDATE_INTERVAL)
+        self.update_timer.timeout.connect(self.update_pace)
 
-            # Construct team item
-            team_item = QtGui.QTreeWidgetItem(
-                None,
-                [team, '%.2f' % info[0]]
-            )
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.schedule_update)
+        self.refresh_timer.start()
 
-            # Construct member items
-            for lifter in info[1]:
-                item = QtGui.QTreeWidgetItem(
-                    None,
-                    [lifter.name, '%.2f' % lifter.points]
-                )
-                team_item.addChild(item)
+        self.table_model.model_changed.connect(self.schedule_update)
+        self.table_model.modelReset.connect(self.schedule_update)
 
+    def setup_ui(self):
+        self.table = QtGui.QTableWidget(0, len(self.HEADINGS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADINGS)
+        self.table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setResizeMode(
+            QtGui.QHeaderView.ResizeToContents)
 
-            # Save top level item
-            self.tree.insertTopLevelItem(i, team_item)
+        self.meet_label = QtGui.QLabel('')
 
-        # Set best team
-        self.best_team_label.setText('%s [%.2f]' % best_total)
+        main_layout = QtGui.QVBoxLayout()
+        main_layout.addWidget(self.table)
+        main_layout.addWidget(self.meet_label)
 
-        # Set the best lifter
-        self.best_lifter_label.setText('%s [%.2f]' % \
-            (best_lifter.name, best_lifter.points))
+        self.setLayout(main_layout)
+
+        self.setWindowTitle('Pace')
+
+    def schedule_update(self):
+        if not self.update_timer.isActive():
+            self.update_timer.start()
+
+    def update_pace(self):
+        # Hidden dialogs are updated when shown
+        if not self.isVisible():
+            return
+
+        p = pace.pace(self.table_model.lifters_map)
+
+        self.table.setRowCount(len(p.flights))
+        for row in xrange(len(p.flights)):
+            duration = p.last[row] - p.started[row]
+            values = [str(p.flights[row]), str(p.attempts[row]),
+                      str(p.remaining[row]),
+                      format_value(p.rate[row], '%.2f')]
+            values += [format_value(x, '%.0f') for x in p.latency[row]]
+            values += [format_duration(duration),
+                       format_clock(p.finish[row])]
+
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QtGui.QTableWidgetItem(value))
+
+        self.meet_label.setText('Meet: %s attempts/min, latency %s s' % (
+            format_value(p.meet_rate, '%.2f'),
+            '/'.join(format_value(x, '%.0f') for x in p.meet_latency)))
 
+    def showEvent(self, event):
+        self.update_pace()
+        QtGui.QDialog.showEvent(self, event)
+
+# format_value
+def format_value(value, format_):
+    return '' if np.isnan(value) else format_ % value
+
+# format_duration
+def format_duration(seconds):
+    if np.isnan(seconds):
+        return ''
+
+    minutes = int(round(seconds / 60.))
+    return '%d:%02d' % divmod(minutes, 60)
+
+# format_clock
+def format_clock(t):
+    # Time of day of `t` (from `lifter.clock`)
+    if np.isnan(t) or np.isinf(t):
+        return ''
+
+    return time.strftime('%H:%M', time.localtime(pace.wall_time(t)))
+
+# LoadingPanel
+class LoadingPanel(QtGui.QDockWidget):
+    # Plates of the next attempts of the flight shown in the table, looked
+    # up in a `plates.PlateTable` as attempts are entered
+    N_ATTEMPTS = 5
+
+    HEADINGS = ['Name', 'Attempt', 'Weight', 'Plates (per side)']
+
+    def __init__(self, table_model, plate_table=None, parent=None):
+        QtGui.QDockWidget.__init__(self, 'Loading', parent)
+
+        self.table_model = table_model
+        self.plate_table = plates.PlateTable() if plate_table is None \
+            else plate_table
+
+        self.setup_ui()
+
+        self.table_model.model_changed.connect(self.update_loading)
+        self.table_model.modelReset.connect(self.update_loading)
+
+        self.update_loading()
+
+    def setup_ui(self):
+        self.table = QtGui.QTableWidget(0, len(self.HEADINGS), self)
+        self.table.setHorizontalHeaderLabels(self.HEADINGS)
+        self.table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        self.table.verticalHeader().hide()
+        self.table.horizontalHeader().setResizeMode(
+            QtGui.QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.setWidget(self.table)
+
+        self.setObjectName('loading_panel')
+
+    def update_loading(self):
+        attempts = plates.lifting_order(self.table_model.lifters_map,
+            self.table_model.flight_filter, self.N_ATTEMPTS)
+
+        self.table.setRowCount(len(attempts))
+        for row, (lifter, index) in enumerate(attempts):
+            weight = lifter.lifts[index]
+            loading = self.plate_table.loading(weight)
+
+            values = [lifter.name,
+                      '%s %d' % (Lifter.LIFTS[index // 3].capitalize(),
+                                 index % 3 + 1),
+                      '%.1f' % weight,
+                      'Cannot be loaded' if loading is None else loading.text]
+
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QtGui.QTableWidgetItem(value))
@@ -0,0 +1,99 @@
+##########################################
+# File: test_archive.py                  #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of archives of saved meets
+
+# Imports
+import os
+import shutil
+import tempfile
+import unittest
+
+import pickle_
+from archive import Archive
+from test_pickle_ import make_meet, state
+
+# TestArchive
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        # Saved meets to pack
+        self.meets = {}
+        for i, filename in enumerate(['meet1.dat', 'meet2.dat.gz',
+                                      'meet3.dat.bz2']):
+            collection = make_meet(10 + i)
+            pickle_.dump(self.path(filename), collection)
+            self.meets[filename] = collection
+
+        self.archive_path = self.path('season.plar')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def pack(self, filenames, compression='gzip'):
+        with Archive(self.archive_path, 'a', compression) as archive:
+            for filename in filenames:
+                archive.add_file(self.path(filename))
+
+    def test_pack_list_extract(self):
+        filenames = sorted(self.meets)
+        self.pack(filenames)
+
+        with Archive(self.archive_path) as archive:
+            self.assertEqual(archive.names(), filenames)
+            self.assertEqual(len(archive), 3)
+            self.assertTrue('meet1.dat' in archive)
+            for member in archive.members:
+                self.assertEqual(member.compression, 'gzip')
+
+            # Each member loads alone, and extracts compressed by extension
+            for filename in reversed(filenames):
+                self.assertEqual(state(archive.load(filename)),
+                                 state(self.meets[filename]))
+
+            path = self.path('extracted.dat.bz2')
+            archive.extract('meet1.dat', path)
+
+        with open(path, 'rb') as fp:
+            header = fp.read(pickle_.MAGIC_SIZE)
+        self.assertEqual(pickle_.compression_of_header(header), 'bz2')
+        self.assertEqual(state(pickle_.load(path)),
+                         state(self.meets['meet1.dat']))
+
+    def test_append_and_replace(self):
+        self.pack(['meet1.dat', 'meet2.dat.gz'])
+
+        # Adding to an archive keeps the members, and a name is replaced
+        replacement = make_meet(5)
+        with Archive(self.archive_path, 'a', 'bz2') as archive:
+            archive.add_file(self.path('meet3.dat.bz2'))
+            archive.add('meet1.dat', replacement)
+
+        with Archive(self.archive_path) as archive:
+            self.assertEqual(archive.names(),
+                             ['meet2.dat.gz', 'meet3.dat.bz2', 'meet1.dat'])
+            self.assertEqual(state(archive.load('meet1.dat')),
+                             state(replacement))
+            self.assertEqual(state(archive.load('meet2.dat.gz')),
+                             state(self.meets['meet2.dat.gz']))
+
+    def test_not_an_archive(self):
+        self.assertRaises(ValueError, Archive, self.path('meet1.dat'))
+
+        with Archive(self.archive_path, 'w'):
+            pass
+        with Archive(self.archive_path) as archive:
+            self.assertEqual(len(archive), 0)
+            self.assertRaises(ValueError, archive.add, 'meet', None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+##########################################
+# File: test_history.py                  #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of the streaming historical results scorer
+
+# Imports
+import csv
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import history
+import wilks
+from lifter import weight_class_codes
+
+# Header of the test dataset (with columns which aren't used)
+HEADER = ['Name', 'Sex', 'Event', 'Equipment', 'Age', 'BodyweightKg',
+          'Best3SquatKg', 'Best3BenchKg', 'Best3DeadliftKg', 'TotalKg',
+          'Place']
+
+# write_dataset
+def write_dataset(path, n, n_short, seed=0):
+    # Write `n` rows (some without a sex, bodyweight or total) and `n_short`
+    # short rows, and return the valid rows as (name, sex, weight, total)
+    random_ = random.Random(seed)
+    rows, valid = [], []
+
+    for i in xrange(n):
+        name = 'Lifter%d' % i
+        sex = random_.choice(['M', 'F', 'M', 'F', 'Mx'])
+        weight = round(random_.uniform(45., 140.), 2)
+        lifts = [round(random_.uniform(50., 300.), 1) for _ in xrange(3)]
+        if random_.random() < 0.1:
+            lifts[1] = -lifts[1]
+        total = sum(lifts) if all(l > 0 for l in lifts) else ''
+
+        rows.append([name, sex, 'SBD', 'Raw', '30', weight] + lifts +
+                    [total, '1'])
+        if sex in ('M', 'F') and total != '':
+            valid.append((name, sex, weight, total))
+
+    # Short rows (e.g. truncated lines) anywhere in the file
+    for i in xrange(n_short):
+        rows.insert(random_.randrange(len(rows)), ['Short%d' % i, 'M'])
+
+    with open(path, 'wb') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+    return valid
+
+# TestHistory
+class TestHistory(unittest.TestCase):
+    N = 2000
+    N_SHORT = 7
+    TOP = 5
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'results.csv')
+        self.valid = write_dataset(self.path, self.N, self.N_SHORT)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def expected_best(self):
+        # Best `TOP` (name, points) of each weight class code
+        name, sex, weight, total = zip(*self.valid)
+        sex = np.array(sex)
+        weight = np.array(weight)
+        points = wilks.points_array(sex, weight, np.array(total))
+        codes = weight_class_codes(sex, weight)
+
+        best = {}
+        for code in np.unique(codes):
+            rows = np.flatnonzero(codes == code)
+            rows = rows[np.argsort(-points[rows])][:self.TOP]
+            best[code] = [(name[i], round(points[i], 6)) for i in rows]
+
+        return best
+
+    def best(self, summary):
+        return dict((code, [(row['name'], round(row['points'], 6))
+                            for row in rows])
+                    for code, rows in summary.best.iteritems())
+
+    def test_serial(self):
+        summary = history.score_file(self.path, chunk_size=300, top=self.TOP)
+
+        self.assertEqual(summary.rows, len(self.valid))
+        self.assertEqual(summary.skipped, self.N_SHORT)
+        self.assertEqual(self.best(summary), self.expected_best())
+
+        n = sum(np.sum(counts) for counts in summary.counts.itervalues())
+        self.assertEqual(n, len(self.valid))
+
+    def test_parallel_equals_serial(self):
+        serial = history.score_file(self.path, chunk_size=300, top=self.TOP)
+        parallel = history.score_file(self.path, chunk_size=300,
+                                      processes=3, top=self.TOP)
+
+        self.assertEqual(parallel.rows, serial.rows)
+        self.assertEqual(parallel.skipped, serial.skipped)
+        self.assertEqual(self.best(parallel), self.best(serial))
+
+        self.assertEqual(sorted(parallel.counts), sorted(serial.counts))
+        for code, counts in serial.counts.iteritems():
+            self.assertTrue(np.array_equal(parallel.counts[code], counts))
+
+    def test_short_rows(self):
+        # Short rows are skipped and counted, and don't truncate the others
+        indices = history.read_header(self.path)
+        rows = [['Lifter1', 'M', 'SBD', 'Raw', '30', '82.5', '200', '150',
+                 '250', '600', '1'],
+                [],
+                ['Lifter2', 'F'],
+                ['Lifter3', 'F', 'SBD', 'Raw', '30', '60', '120', '70',
+                 '150', '340', '1']]
+
+        chunk, skipped = history.score_chunk(rows, indices)
+        self.assertEqual(skipped, 2)
+        self.assertEqual(list(chunk['name']), ['Lifter1', 'Lifter3'])
+        self.assertEqual(list(chunk['total']), [600., 340.])
+
+        chunk, skipped = history.score_chunk([['Lifter2', 'F']], indices)
+        self.assertEqual((len(chunk), skipped), (0, 1))
+
+    def test_write(self):
+        summary = history.score_file(self.path, top=self.TOP)
+
+        output = os.path.join(self.directory, 'rankings.tsv')
+        summary.write(output)
+        with open(output) as fp:
+            lines = fp.read().splitlines()
+
+        self.assertEqual(len(lines) - 1,
+                         sum(len(rows) for rows in summary.best.values()))
+
+if __name__ == '__main__':
+    unittest.main()
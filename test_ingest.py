@@ -0,0 +1,151 @@
+##########################################
+# File: test_ingest.py                   #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of ingestion through stand-in clients (`ingest.LocalClient`)
+
+# Imports
+import unittest
+
+from ingest import IngestQueue, LocalClient, resolve_decisions
+from lifter import Lifter, LifterCollection
+
+# TestIngest
+class TestIngest(unittest.TestCase):
+    def setUp(self):
+        self.collection = LifterCollection()
+        self.lifter = Lifter('Lifter1', 'M', 83., 10, team='Oxford')
+        self.collection.add(self.lifter)
+        self.lifter_id = self.lifter.lifter_id
+
+        self.queue = IngestQueue()
+        self.table = LocalClient('table', self.queue)
+        self.referees = [LocalClient('ref-%d' % i, self.queue)
+                         for i in xrange(3)]
+
+    def apply(self):
+        return self.queue.apply_pending(self.collection)
+
+    def enter(self, weight=150.):
+        self.table.enter(self.lifter_id, 'squat', 0, weight)
+        self.apply()
+
+    def test_enter(self):
+        self.assertEqual(self.table.enter(self.lifter_id, 'squat', 0,
+                                          150.)['status'], 'queued')
+        self.assertEqual(self.apply(), [self.lifter])
+
+        self.assertEqual(self.lifter.squat_0, 150.)
+        self.assertEqual(self.lifter.lift_record[0], Lifter.SET_CODE)
+        self.assertEqual(self.queue.result('table', 1)['status'], 'applied')
+
+    def test_held_until_all_referees(self):
+        self.enter()
+
+        # Two votes in one batch are held
+        for referee in self.referees[:2]:
+            referee.decide(self.lifter_id, 'squat', 0, True)
+        self.assertEqual(self.apply(), [])
+        self.assertEqual(self.lifter.lift_record[0], Lifter.SET_CODE)
+        self.assertEqual(self.queue.result('ref-0', 1), None)
+
+        # The third in a later batch resolves all three
+        self.referees[2].decide(self.lifter_id, 'squat', 0, False)
+        self.assertEqual(self.apply(), [self.lifter])
+        self.assertEqual(self.lifter.lift_record[0], Lifter.GOOD_CODE)
+
+        self.assertEqual(self.queue.result('ref-0', 1)['status'], 'applied')
+        self.assertEqual(self.queue.result('ref-1', 1)['status'], 'applied')
+        self.assertEqual(self.queue.result('ref-2', 1)['status'],
+                         'overruled')
+
+    def test_majority(self):
+        self.enter()
+
+        for referee, valid in zip(self.referees, [False, True, False]):
+            referee.decide(self.lifter_id, 'squat', 0, valid)
+        self.apply()
+
+        self.assertEqual(self.lifter.lift_record[0], Lifter.FAIL_CODE)
+        self.assertEqual(self.queue.result('ref-1', 1)['status'],
+                         'overruled')
+
+    def test_timeout(self):
+        # Votes so far are resolved once the timeout has passed
+        self.queue.decision_timeout = 0.
+        self.enter()
+
+        self.referees[0].decide(self.lifter_id, 'squat', 0, True)
+        self.apply()
+
+        self.assertEqual(self.lifter.lift_record[0], Lifter.GOOD_CODE)
+
+    def test_latest_vote_counts(self):
+        self.enter()
+
+        self.referees[0].decide(self.lifter_id, 'squat', 0, False)
+        self.referees[0].decide(self.lifter_id, 'squat', 0, True)
+        for referee in self.referees[1:]:
+            referee.decide(self.lifter_id, 'squat', 0, True)
+        self.apply()
+
+        self.assertEqual(self.lifter.lift_record[0], Lifter.GOOD_CODE)
+        result = self.queue.result('ref-0', 1)
+        self.assertEqual(result['status'], 'replaced')
+        self.assertEqual(result['replaced_by'], 2)
+
+    def test_duplicate_seq(self):
+        self.table.enter(self.lifter_id, 'squat', 0, 150., seq=1)
+        self.apply()
+
+        # A resubmitted (client, seq) is answered with the first result and
+        # not applied again
+        result = self.table.enter(self.lifter_id, 'squat', 0, 160., seq=1)
+        self.assertEqual(result['status'], 'applied')
+        self.assertEqual(result['weight'], 150.)
+        self.assertEqual(self.apply(), [])
+        self.assertEqual(self.lifter.squat_0, 150.)
+
+        # As is a resubmitted decision
+        for referee in self.referees:
+            referee.decide(self.lifter_id, 'squat', 0, True, seq=1)
+        self.apply()
+        revision = self.lifter.revision
+
+        result = self.referees[0].decide(self.lifter_id, 'squat', 0, False,
+                                         seq=1)
+        self.assertEqual(result['status'], 'applied')
+        self.assertEqual(result['record'], Lifter.GOOD_LIFT)
+        self.assertEqual(self.apply(), [])
+        self.assertEqual(self.lifter.revision, revision)
+
+    def test_rejected(self):
+        # Decisions on an attempt not entered
+        for referee in self.referees:
+            referee.decide(self.lifter_id, 'squat', 0, True)
+        self.apply()
+        self.assertEqual(self.queue.result('ref-0', 1)['status'],
+                         'rejected')
+
+        # Unknown lifter
+        self.table.enter(self.lifter_id + 1, 'squat', 0, 150.)
+        self.apply()
+        self.assertEqual(self.queue.result('table', 1)['status'],
+                         'rejected')
+
+        # `valid` must be a bool or None
+        self.assertRaises(ValueError, self.referees[0].decide,
+                          self.lifter_id, 'squat', 0, 1)
+
+    def test_resolve_decisions(self):
+        self.assertEqual(resolve_decisions([None, None, None]), None)
+        self.assertEqual(resolve_decisions([True, None, True]), True)
+        self.assertEqual(resolve_decisions([True, False]), False)
+        self.assertEqual(resolve_decisions([False, True, True]), True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+##########################################
+# File: test_pickle_.py                  #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of saving and loading meets, uncompressed and compressed
+
+# Imports
+import os
+import shutil
+import tempfile
+import unittest
+
+import pickle_
+from lifter import Lifter, LifterCollection
+from records import RecordsIndex
+from scoring import PlacingPoints
+
+# make_meet
+def make_meet(n=30):
+    collection = LifterCollection(top=4, team_scoring=PlacingPoints(
+        by_gender=True))
+
+    records = RecordsIndex()
+    records.bulk_load([('M', '83', 'squat', '200', 'Holder', '2014-01-01')])
+    collection.set_records(records)
+
+    for i in xrange(n):
+        lifter = Lifter('Lifter%d' % i, 'MF'[i % 2], 60. + i, 10,
+                        team='Team%d' % (i % 3), flight=i % 2,
+                        age_category='Junior')
+        collection.add(lifter)
+
+        lifter.enter_lift('squat', 0, 100. + i)
+        lifter.validate_lift('squat', 0, i % 3 != 0)
+        lifter.enter_lift('bench', 0, 80.)
+
+    return collection
+
+# state
+def state(collection):
+    # Comparable state of a meet
+    lifters = [(l.lifter_id, l.name, l.gender, l.weight, l.team, l.flight,
+                list(l.lifts), str(l.lift_record), l.age_category)
+               for l in collection.sorted_by('lifter_id')]
+
+    return (lifters, collection.id_count, collection.top,
+            repr(collection.team_scoring),
+            sorted(collection.records.records.items()))
+
+# TestPickle
+class TestPickle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.collection = make_meet()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def test_round_trips(self):
+        for filename, compression in [('meet.dat', None),
+                                      ('meet.dat.gz', 'gzip'),
+                                      ('meet.dat.bz2', 'bz2')]:
+            path = self.path(filename)
+            pickle_.dump(path, self.collection)
+
+            with open(path, 'rb') as fp:
+                header = fp.read(pickle_.MAGIC_SIZE)
+            self.assertEqual(pickle_.compression_of_header(header),
+                             compression)
+
+            loaded = pickle_.load(path)
+            self.assertEqual(state(loaded), state(self.collection))
+
+            # Loaded lifters belong to the loaded collection
+            for lifter in loaded.map_.itervalues():
+                self.assertTrue(lifter.collection() is loaded)
+
+    def test_compression_argument(self):
+        # Compression of an open file is given explicitly
+        path = self.path('meet')
+        with open(path, 'wb') as fp:
+            pickle_.dump(fp, self.collection, 'bz2')
+
+        self.assertEqual(state(pickle_.load(path)), state(self.collection))
+
+    def test_progress(self):
+        for filename in ['meet.dat', 'meet.dat.gz']:
+            path = self.path(filename)
+            pickle_.dump(path, self.collection)
+
+            reported = []
+            loaded = pickle_.load(path, progress=reported.append)
+            self.assertEqual(state(loaded), state(self.collection))
+
+            self.assertTrue(len(reported) > 0)
+            self.assertEqual(reported, sorted(reported))
+            self.assertEqual(reported[-1], os.path.getsize(path))
+
+    def test_progress_stops_load(self):
+        path = self.path('meet.dat.gz')
+        pickle_.dump(path, self.collection)
+
+        def progress(bytes_read):
+            raise KeyboardInterrupt
+
+        self.assertRaises(KeyboardInterrupt, pickle_.load, path,
+                          progress=progress)
+
+    def test_unknown_compression(self):
+        self.assertRaises(ValueError, pickle_.dump, self.path('meet'),
+                          self.collection, 'zip')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+##########################################
+# File: test_scoring.py                  #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of the vectorised team scoring against loops over the lifters
+
+# Imports
+import random
+import unittest
+
+from benchmark import make_collection, reference_overall_info
+from lifter import Lifter, LifterCollection
+from scoring import TopPoints, PlacingPoints
+
+# make_meet
+def make_meet(n, seed=0, top=3):
+    # Meet part way through, with lifters who have bombed out or withdrawn
+    random_ = random.Random(seed)
+    collection = LifterCollection(top=top)
+
+    for i in xrange(n):
+        lifter = Lifter('Lifter%d' % i, random_.choice(Lifter.GENDERS),
+                        random_.choice([59., 66., 74., 83., 93., 105.]), 10,
+                        team='Team%d' % random_.randrange(5))
+        collection.add(lifter)
+
+        for lift in Lifter.LIFTS:
+            weight = random_.choice([100., 120., 140.])
+            for attempt in xrange(random_.randrange(4)):
+                lifter.enter_lift(lift, attempt, weight)
+                lifter.validate_lift(lift, attempt, random_.random() < 0.7)
+                weight += 5.
+
+        if random_.random() < 0.05:
+            lifter.withdrawn = True
+
+    return collection
+
+# reference_scores
+def reference_scores(collection):
+    # Score of each lifter (by lifter_id) from its points or place
+    lifters = collection.map_.values()
+    team_scoring = collection.team_scoring
+
+    if not isinstance(team_scoring, PlacingPoints):
+        return dict((l.lifter_id, l.points) for l in lifters)
+
+    scores = dict((l.lifter_id, 0.) for l in lifters)
+
+    classes = {}
+    for l in lifters:
+        if l.total > 0:
+            classes.setdefault((l.gender, l.weight_class), []).append(l)
+
+    for placed in classes.itervalues():
+        placed.sort(key=lambda l: (-l.total, l.weight, l.lifter_id))
+        for place, l in enumerate(placed):
+            if place < len(team_scoring.placing_points):
+                scores[l.lifter_id] = team_scoring.placing_points[place]
+
+    return scores
+
+# reference_team_totals
+def reference_team_totals(collection):
+    # Team label -> (total, lifter_ids of the counting lifters)
+    team_scoring = collection.team_scoring
+    scores = reference_scores(collection)
+
+    groups = {}
+    for l in collection.map_.itervalues():
+        if l.total <= 0 or scores[l.lifter_id] <= 0:
+            continue
+        label = team_scoring.label(l.team, l.gender)
+        groups.setdefault(label, []).append(l)
+
+    ret = {}
+    for label, lifters in groups.iteritems():
+        lifters.sort(key=lambda l: (-scores[l.lifter_id], l.weight,
+                                    l.lifter_id))
+
+        counting = []
+        per_class = {}
+        for l in lifters:
+            if team_scoring.class_cap is not None:
+                n = per_class.get(l.weight_class, 0)
+                if n >= team_scoring.class_cap:
+                    continue
+                per_class[l.weight_class] = n + 1
+
+            if len(counting) < collection.top:
+                counting.append(l)
+
+        ret[label] = (sum(scores[l.lifter_id] for l in counting),
+                      sorted(l.lifter_id for l in counting))
+
+    return ret
+
+# TestTeamScoring
+class TestTeamScoring(unittest.TestCase):
+    STRATEGIES = [
+        TopPoints(),
+        TopPoints(by_gender=True),
+        TopPoints(class_cap=1),
+        PlacingPoints(),
+        PlacingPoints(by_gender=True, class_cap=2),
+    ]
+
+    def assertMatchesReference(self, collection):
+        expected = reference_team_totals(collection)
+        best_lifter, best_total, info = collection.overall_info()
+
+        self.assertEqual(sorted(info), sorted(expected))
+        for label, (total, lifters, scores) in info.iteritems():
+            self.assertAlmostEqual(total, expected[label][0])
+            self.assertEqual(sorted(l.lifter_id for l in lifters),
+                             expected[label][1])
+
+    def test_reference_overall_info(self):
+        # The original loop (every lifter has a total)
+        collection = make_collection(200, top=6)
+        reference = reference_overall_info(collection)
+        best_lifter, best_total, info = collection.overall_info()
+
+        self.assertEqual(sorted(info), sorted(reference))
+        for team, (total, lifters, scores) in info.iteritems():
+            self.assertAlmostEqual(total, reference[team][0])
+            self.assertEqual(set(lifters), set(reference[team][1]))
+
+    def test_strategies(self):
+        for seed in xrange(3):
+            collection = make_meet(150, seed)
+            for team_scoring in self.STRATEGIES:
+                collection.set_team_scoring(4, team_scoring)
+                self.assertMatchesReference(collection)
+
+    def test_after_changes(self):
+        # Cached columns are updated in place as lifters change
+        collection = make_meet(100, 3)
+        random_ = random.Random(3)
+        lifters = collection.map_.values()
+
+        for team_scoring in self.STRATEGIES:
+            collection.set_team_scoring(3, team_scoring)
+            self.assertMatchesReference(collection)
+
+            for i in xrange(20):
+                lifter = random_.choice(lifters)
+                lifter.weight = random_.choice([66., 74., 83.])
+                lifter.withdrawn = random_.random() < 0.1
+                self.assertMatchesReference(collection)
+
+    def test_best(self):
+        collection = make_meet(100, 4)
+        best_lifter, best_total, info = collection.overall_info()
+
+        points = [l.points for l in collection.map_.itervalues()]
+        self.assertEqual(best_lifter.points, max(points))
+        self.assertEqual(best_total[1], max(i[0] for i in info.values()))
+
+if __name__ == '__main__':
+    unittest.main()
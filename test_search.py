@@ -0,0 +1,118 @@
+##########################################
+# File: test_search.py                   #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of the lifter search index
+
+# Imports
+import random
+import unittest
+
+from lifter import Lifter, LifterCollection
+from search import SearchIndex, normalise
+
+# Names and teams of the test lifters
+NAMES = [u'Anna Smith', u'Ben Smithson', u'Carla Jones', u'Dan Anders',
+         u'Eve Anderson', u'Zo\xeb Brown', u'Al Brownlee', u'Sam Al-Amin']
+TEAMS = [u'Oxford', u'Cambridge', u'Oxford Brookes', None]
+
+# reference_search
+def reference_search(collection, query):
+    # Every word matches the start of a word (one or two letters) or
+    # anywhere in the name or team
+    words = normalise(query).split()
+    if not words:
+        return None
+
+    found = set()
+    for lifter in collection.map_.itervalues():
+        texts = [normalise(lifter.name), normalise(lifter.team)]
+        lifter_words = u' '.join(texts).split()
+
+        def matches(word):
+            if len(word) < 3:
+                return any(w.startswith(word) for w in lifter_words)
+            return any(word in text for text in texts)
+
+        if all(matches(word) for word in words):
+            found.add(lifter.lifter_id)
+
+    return found
+
+# TestSearchIndex
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.collection = LifterCollection()
+        for i, name in enumerate(NAMES):
+            self.collection.add(Lifter(name, 'MF'[i % 2], 70., 10,
+                                       team=TEAMS[i % len(TEAMS)]))
+
+        self.index = SearchIndex(self.collection)
+
+    def tearDown(self):
+        self.index.close()
+
+    def names(self, query):
+        return sorted(self.collection[i].name
+                      for i in self.index.search(query))
+
+    def test_prefix(self):
+        # One or two letters match the start of a word
+        self.assertEqual(self.names('al'), [u'Al Brownlee', u'Sam Al-Amin'])
+        self.assertEqual(self.names('s'), [u'Anna Smith', u'Ben Smithson',
+                                           u'Sam Al-Amin'])
+        self.assertEqual(self.names('ox'), [u'Al Brownlee', u'Anna Smith',
+                                            u'Carla Jones',
+                                            u'Eve Anderson'])
+        self.assertEqual(self.names('mi'), [])
+
+    def test_substring(self):
+        # Three or more letters match anywhere (case-insensitive)
+        self.assertEqual(self.names('SMITH'), [u'Anna Smith',
+                                               u'Ben Smithson'])
+        self.assertEqual(self.names('own'), [u'Al Brownlee',
+                                             u'Zo\xeb Brown'])
+        self.assertEqual(self.names(u'zo\xeb'), [u'Zo\xeb Brown'])
+        self.assertEqual(self.names('xyz'), [])
+
+    def test_every_word(self):
+        self.assertEqual(self.names('smith oxford'), [u'Anna Smith'])
+        self.assertEqual(self.names('and e'), [u'Eve Anderson'])
+        self.assertEqual(self.index.search('  '), None)
+
+    def test_updates(self):
+        # Kept up to date from the change feed
+        lifter = self.collection[0]
+        lifter.name = u'Anna Jones'
+        self.assertEqual(self.names('jones'), [u'Anna Jones',
+                                               u'Carla Jones'])
+        self.assertEqual(self.names('smith'), [u'Ben Smithson'])
+
+        lifter.team = u'Durham'
+        self.assertEqual(self.names('durham'), [u'Anna Jones'])
+
+        self.collection.add(Lifter(u'Fay Smith', 'F', 60., 10))
+        self.assertEqual(self.names('smith'), [u'Ben Smithson',
+                                               u'Fay Smith'])
+
+        self.collection.remove(self.collection[1])
+        self.assertEqual(self.names('smith'), [u'Fay Smith'])
+        self.assertEqual(len(self.index), len(NAMES))
+
+    def test_reference(self):
+        random_ = random.Random(0)
+        letters = u'abdehilmnorst'
+        for i in xrange(500):
+            query = u' '.join(
+                u''.join(random_.choice(letters)
+                         for _ in xrange(random_.randint(1, 4)))
+                for _ in xrange(random_.randint(1, 2)))
+            self.assertEqual(self.index.search(query),
+                             reference_search(self.collection, query), query)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+##########################################
+# File: test_sessions.py                 #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of concurrent platform sessions and `LifterCollection.snapshot`
+
+# Imports
+import random
+import threading
+import time
+import unittest
+import numpy as np
+
+from lifter import Lifter, LifterCollection
+from sessions import PlatformSession
+
+# make_collection
+def make_collection(n, flights):
+    collection = LifterCollection(top=3)
+    for i in xrange(n):
+        collection.add(Lifter('Lifter%d' % i, 'MF'[i % 2], 60. + i % 50,
+                              10, team='Team%d' % (i % 5), flight=i % flights))
+
+    return collection
+
+# TestSnapshot
+class TestSnapshot(unittest.TestCase):
+    # Seconds to write for, and the longest a snapshot may take
+    DURATION = 1.
+    MAX_SNAPSHOT = 0.5
+
+    def test_consistent_without_writers(self):
+        collection = make_collection(20, 2)
+        generation, copy = collection.snapshot()
+
+        self.assertEqual(generation, collection.generation)
+        columns = collection.columns()
+        for a, b in zip(copy, columns):
+            if isinstance(a, list):
+                self.assertEqual(a, b)
+            else:
+                self.assertTrue(np.array_equal(a, b))
+                self.assertFalse(a is b)
+
+    def test_three_writers(self):
+        # Three platforms writing continuously must not starve a reader
+        collection = make_collection(600, 3)
+        stop = threading.Event()
+
+        def write(platform, flight):
+            lifter_ids = [l.lifter_id for l in collection.map_.itervalues()
+                          if l.flight == flight]
+            random_ = random.Random(flight)
+            while not stop.is_set():
+                platform.set_attribute(random_.choice(lifter_ids), 'weight',
+                                       random_.uniform(60., 120.))
+
+        threads = [threading.Thread(target=write,
+                       args=(PlatformSession(collection, str(flight),
+                                             [flight]), flight))
+                   for flight in xrange(3)]
+        for thread in threads:
+            thread.start()
+
+        try:
+            n_snapshots, longest = 0, 0.
+            end = time.time() + self.DURATION
+            while time.time() < end:
+                start = time.time()
+                generation, copy = collection.snapshot()
+                longest = max(longest, time.time() - start)
+                n_snapshots += 1
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+
+        self.assertTrue(n_snapshots >= 10)
+        self.assertTrue(longest < self.MAX_SNAPSHOT)
+
+        # Once the writers have stopped, the copy matches each lifter
+        generation, copy = collection.snapshot()
+        self.assertEqual(generation, collection.generation)
+        self.assertTrue(np.array_equal(copy.weight,
+            [l.weight for l in copy.lifters]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+##########################################
+# File: test_snapshot.py                 #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Tests of publishing and reading memory mapped standings snapshots
+
+# Imports
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+
+from lifter import Lifter, LifterCollection
+from snapshot import (COLUMNS, HEADER_SIZE, SnapshotReader, SnapshotWriter,
+                      snapshot_arrays)
+
+# make_collection
+def make_collection(n, total=100.):
+    collection = LifterCollection(top=3)
+    for i in xrange(n):
+        team = None if i % 4 == 3 else u'Team \xe9%d' % (i % 3)
+        lifter = Lifter(u'Lifter \xfc%d' % i, 'MF'[i % 2], 60. + i, 10,
+                        team=team)
+        collection.add(lifter)
+
+        for lift in Lifter.LIFTS:
+            lifter.enter_lift(lift, 0, total + i)
+            lifter.validate_lift(lift, 0, True)
+
+    return collection
+
+# TestSnapshot
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'standings.snap')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertSnapshotOf(self, snapshot, collection):
+        columns, names, team_names = snapshot_arrays(collection)
+
+        self.assertEqual(snapshot.generation, collection.generation)
+        self.assertEqual(snapshot.names, names)
+        self.assertEqual(snapshot.team_names, team_names)
+        for name, _, _ in COLUMNS:
+            self.assertTrue(np.array_equal(snapshot.columns[name],
+                                           columns[name]), name)
+
+    def test_round_trip(self):
+        collection = make_collection(20)
+        writer = SnapshotWriter(self.path)
+        writer.publish(collection)
+
+        reader = SnapshotReader(self.path)
+        try:
+            snapshot = reader.read()
+        finally:
+            reader.close()
+            writer.close()
+
+        self.assertSnapshotOf(snapshot, collection)
+
+        # Lifters without a team have the empty team name
+        team = snapshot.columns['team'][3]
+        self.assertEqual(snapshot.team_names[team], u'')
+
+    def test_updates_and_growth(self):
+        # The file grows beyond the reader's map as lifters are added
+        collection = make_collection(2)
+        writer = SnapshotWriter(self.path, min_size=HEADER_SIZE)
+        writer.publish(collection)
+
+        reader = SnapshotReader(self.path)
+        try:
+            self.assertSnapshotOf(reader.read(), collection)
+
+            # Unchanged collections aren't rewritten
+            sequence = reader.sequence()
+            writer.publish(collection)
+            self.assertEqual(reader.sequence(), sequence)
+
+            for i in xrange(50):
+                collection.add(Lifter('Added%d' % i, 'M', 80., 10,
+                                      team='Added'))
+            collection.map_[0].weight = 90.
+            writer.publish(collection)
+
+            self.assertSnapshotOf(reader.read(), collection)
+        finally:
+            reader.close()
+            writer.close()
+
+        # A writer reopens an existing file
+        writer = SnapshotWriter(self.path)
+        writer.close()
+
+    def test_not_a_snapshot(self):
+        with open(self.path, 'wb') as fp:
+            fp.write('not a snapshot file')
+
+        self.assertRaises(ValueError, SnapshotWriter, self.path)
+        self.assertRaises(ValueError, SnapshotReader, self.path)
+
+    def test_concurrent_reads(self):
+        # Every read while publishing is of one whole collection
+        collections = [make_collection(5, 100.), make_collection(40, 150.)]
+        expected = [snapshot_arrays(c) for c in collections]
+
+        writer = SnapshotWriter(self.path, min_size=HEADER_SIZE)
+        writer.publish(collections[0])
+        stop = threading.Event()
+
+        def publish():
+            i = 0
+            while not stop.is_set():
+                i += 1
+                writer.publish(collections[i % 2])
+
+        thread = threading.Thread(target=publish)
+        thread.start()
+
+        reader = SnapshotReader(self.path)
+        try:
+            for i in xrange(200):
+                snapshot = reader.read(timeout=5.)
+                columns, names, team_names = \
+                    expected[len(snapshot.names) == len(expected[1][1])]
+                self.assertEqual(snapshot.names, names)
+                for name, _, _ in COLUMNS:
+                    self.assertTrue(np.array_equal(snapshot.columns[name],
+                                                   columns[name]), name)
+        finally:
+            stop.set()
+            thread.join()
+            reader.close()
+            writer.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,444 @@
+##########################################
+# File: webexport.py                     #
+# Copyright Richard Stebbing 2014.       #
+# Distributed under the MIT License.     #
+# (See accompany file LICENSE or copy at #
+#  http://opensource.org/licenses/MIT)   #
+##########################################
+
+# Results as a static web site, exported incrementally
+# The site is a summary (`index.html`) and a page per flight, weight class
+# and team. Each page has a key hashed from the content it is rendered from
+# (the row of each of its lifters, in order, and any values of the page such
+# as places or team scores), and the keys of the pages last written are kept
+# in a manifest in the directory, so only pages whose key changed are
+# rendered and written (each atomically, through a temporary file renamed
+# over the page)
+# The row of a lifter is only reformatted when the lifter's revision
+# changes, so the cost of an export is the (small) per-row hashing of the
+# keys plus rendering and writing the pages that changed
+
+# Imports
+from collections import namedtuple
+from cgi import escape
+import hashlib
+import json
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from lifter import Lifter, DIVISIONS, CLASS_STRIDE, weight_class_label
+from scoring import group_order
+
+# all
+__all__ = [
+    'HTML_STYLE',
+    'Result',
+    'SiteExporter',
+    'text_of',
+    'write_atomic'
+]
+
+# Globals
+HTML_STYLE = '''<style type="text/css">
+table.results
+{
+font-family:sans-serif;
+border-collapse:collapse;
+}
+
+table.results td, th
+{
+font-size:1.0em;
+border:1px solid black;
+padding:3px 7px 2px 7px;
+}
+
+table.results th
+{
+font-size:1.0em;
+font-weight:bold;
+text-align:left;
+padding-top:5px;
+padding-bottom:4px;
+background-color:#A9BBFF;
+color:black;
+}
+
+table.results tr.alt td
+{
+background-color:#E0E0E0;
+}
+
+h1.results
+{
+font-family:sans-serif;
+}
+
+</style>
+'''
+
+PAGE_TEMPLATE = HTML_STYLE + '''<html>
+<head><title>%(title)s</title></head>
+<body>
+<h1 class="results">%(title)s</h1>
+%(body)s
+</body>
+</html>
+'''
+
+HEADING = '<p style="font-family:sans-serif; font-weight:bold;' \
+    'font-size:1.2em;">%s</p>\n'
+
+INDEX = 'index.html'
+MANIFEST = '.manifest.json'
+MANIFEST_VERSION = 1
+
+# Style of each lift record
+RECORD_STYLE = {
+    Lifter.GOOD_CODE : 'font-weight:bold;',
+    Lifter.FAIL_CODE : 'text-decoration:line-through;',
+    Lifter.PASS_CODE : 'text-decoration:line-through;font-style:italic;',
+    Lifter.SET_CODE : 'font-style:italic;',
+}
+
+# Headings of the row of a lifter (see `lifter_row`)
+ROW_HEADINGS = ['Name', 'Team', 'M/F', 'Flight', 'Weight', 'Class'] + \
+    [d.label for d in DIVISIONS] + \
+    ['%s %d' % (lift.capitalize(), attempt + 1)
+     for lift in Lifter.LIFTS for attempt in xrange(3)] + \
+    ['Total', 'Points', 'Status']
+
+# Result
+# Pages written (rendered), removed and unchanged by an export
+Result = namedtuple('Result', 'written removed unchanged')
+
+# Page
+# `rows` are the rows of `columns()` in order, `extras` the values of each
+# row shown by the page (beyond the lifter's row) and `summary` any HTML
+# shown above the table
+Page = namedtuple('Page', 'filename title rows headings extras summary')
+
+# slug
+def slug(text):
+    text = text.replace('+', ' plus').lower()
+    return re.sub(r'[^a-z0-9]+', '-', text).strip('-')
+
+# text_of
+def text_of(value):
+    # Teams (and their labels) may be None
+    return value if value is not None else ''
+
+# sha1
+def sha1(text):
+    return hashlib.sha1(text.encode('utf-8') if isinstance(text, unicode)
+                        else text)
+
+# Process umask (only readable by setting it)
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+# write_atomic
+def write_atomic(path, data):
+    # Write `data` to a temporary file in the same directory and rename it
+    # over `path`, so readers see the old or the new file (never part)
+    dir_, filename = os.path.split(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + filename, suffix='.tmp',
+                                     dir=dir_)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+
+        # As if created with `open` (`mkstemp` is private to the owner)
+        os.chmod(temp_path, 0666 & ~UMASK)
+
+        # Windows can't rename over an existing file
+        if os.name == 'nt' and os.path.exists(path):
+            os.remove(path)
+
+        os.rename(temp_path, path)
+    except:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+# table_html
+def table_html(headings, rows):
+    # Results table of the headings and cells (HTML) of each row
+    html = '<table class="results", style="table-layout:auto;">\n<tbody>\n'
+    html += '<tr>%s</tr>\n' % ''.join('<th>%s</th>' % h for h in headings)
+
+    for i, cells in enumerate(rows):
+        html += '<tr class="alt">' if i % 2 == 1 else '<tr>'
+        html += cells + '</tr>\n'
+
+    return html + '</tbody>\n</table>\n'
+
+# lifter_row
+def lifter_row(lifter):
+    # Cells (HTML) of the lifter's own details and lifts
+    cells = [escape(lifter.name), escape(text_of(lifter.team)),
+             lifter.gender, '%d' % lifter.flight, '%.1f' % lifter.weight,
+             lifter.weight_class]
+    cells += [escape(str(getattr(lifter, d.attribute))) for d in DIVISIONS]
+
+    row = ''.join('<td>%s</td>' % cell for cell in cells)
+
+    for weight, record in zip(lifter.lifts, lifter.lift_record):
+        text = '%.1f' % weight if record != Lifter.BLANK_CODE else ''
+        style = RECORD_STYLE.get(record)
+        if style is not None:
+            row += '<td style="%s">%s</td>' % (style, text)
+        else:
+            row += '<td>%s</td>' % text
+
+    row += '<td>%.1f</td><td>%.2f</td><td>%s</td>' % (lifter.total,
+        lifter.points, lifter.status_name)
+
+    return row
+
+# SiteExporter
+class SiteExporter(object):
+    def __init__(self, directory):
+        self.directory = directory
+
+        # (lifter, revision, row, digest) by lifter_id
+        self.rows = {}
+
+        # Keys of the pages written, by filename
+        self.manifest = self.read_manifest()
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    # Manifest
+    def read_manifest(self):
+        # Keys of the pages last written (none if the manifest is missing,
+        # unreadable or of another version, so every page is written)
+        try:
+            with open(self.path(MANIFEST), 'rb') as fp:
+                manifest = json.load(fp)
+        except (IOError, ValueError):
+            return {}
+
+        if not isinstance(manifest, dict) or \
+            manifest.get('version') != MANIFEST_VERSION:
+            return {}
+
+        return dict(manifest.get('pages', {}))
+
+    def write_manifest(self):
+        write_atomic(self.path(MANIFEST), json.dumps(
+            {'version' : MANIFEST_VERSION, 'pages' : self.manifest},
+            sort_keys=True, indent=1))
+
+    # Rows
+    def row(self, lifter):
+        # (row, digest) of `lifter`, reformatted only when the lifter (or
+        # its revision) changes
+        entry = self.rows.get(lifter.lifter_id)
+        if entry is None or entry[0] is not lifter or \
+            entry[1] != lifter.revision:
+            row = lifter_row(lifter)
+            entry = (lifter, lifter.revision, row, sha1(row).digest())
+            self.rows[lifter.lifter_id] = entry
+
+        return entry[2], entry[3]
+
+    # Pages
+    def pages(self, collection):
+        # Every page but the summary
+        c = collection.columns()
+        n = len(c.lifters)
+
+        pages = []
+
+        # Flights, by points
+        flight = np.array([l.flight for l in c.lifters], dtype=int)
+        for rows in groups(flight, -c.points, c.weight, c.lifter_id):
+            f = flight[rows[0]]
+            pages.append(Page('flight-%d.html' % f, 'Flight %d' % f, rows,
+                              [], None, None))
+
+        # Weight classes, placed by total
+        for rows in groups(c.weight_class, -c.total, c.weight,
+                           c.lifter_id):
+            code = c.weight_class[rows[0]]
+            label = '%s %s' % (Lifter.GENDERS[code // CLASS_STRIDE],
+                               weight_class_label(code))
+            place = np.arange(1, len(rows) + 1)
+            extras = ['%d' % p if c.total[r] > 0. else ''
+                      for p, r in zip(place, rows)]
+            pages.append(Page('class-%s.html' % slug(label), label, rows,
+                              ['Place'], extras, None))
+
+        # Teams, by points, with the score of each counting lifter and the
+        # total of each scoring group of the team
+        totals, counting, scores, labels = collection.team_scores()
+        group, n_groups = collection.team_scoring.groups(c,
+            len(collection.team_names))
+        is_counting = np.zeros(n, dtype=bool)
+        is_counting[counting] = True
+
+        used = set()
+        for rows in groups(c.team, -c.points, c.weight, c.lifter_id):
+            team = text_of(collection.team_names[c.team[rows[0]]])
+            filename = unique('team-%s' % (slug(team) or 'team'), used)
+
+            extras = ['%.2f' % scores[r] if is_counting[r] else ''
+                      for r in rows]
+            summary = '<p style="font-family:sans-serif;">%s</p>\n' % \
+                '<br />\n'.join('<span style="font-weight:bold;">%s: '
+                    '</span>%.2f' % (escape(text_of(labels[g])), totals[g])
+                    for g in sorted(set(group[rows])))
+
+            pages.append(Page(filename, escape(team) or 'No team', rows,
+                              ['Score'], extras, summary))
+
+        return pages
+
+    def page_key(self, c, page):
+        # Hash of everything the page is rendered from
+        h = hashlib.sha1()
+        h.update(repr((page.title, page.headings, page.extras,
+                       page.summary)))
+        for r in page.rows:
+            h.update(self.row(c.lifters[r])[1])
+
+        return h.hexdigest()
+
+    def render(self, c, page):
+        rows = [self.row(c.lifters[r])[0] for r in page.rows]
+        if page.extras is not None:
+            rows = ['<td>%s</td>%s' % (extra, row)
+                    for extra, row in zip(page.extras, rows)]
+
+        body = '<p style="font-family:sans-serif;">' \
+            '<a href="%s">Summary</a></p>\n' % INDEX
+        if page.summary is not None:
+            body += page.summary
+
+        body += table_html(page.headings + ROW_HEADINGS, rows)
+
+        return PAGE_TEMPLATE % dict(title=page.title, body=body)
+
+    def render_index(self, collection, pages):
+        # Overall results, team totals and links to every page
+        best_lifter, best_total, team_info = collection.overall_info()
+
+        body = HEADING % 'Overall'
+        body += '<p style="font-family:sans-serif;">\n'
+        if best_total[1] > 0.:
+            body += '<span style="font-weight:bold;">Best team: </span>' \
+                '%s [%.2f]<br />\n' % (escape(text_of(best_total[0])),
+                                       best_total[1])
+        if best_lifter is not None:
+            body += '<span style="font-weight:bold;">Best lifter: </span>' \
+                '%s [%.2f]\n' % (escape(best_lifter.name),
+                                 best_lifter.points)
+        body += '</p>\n'
+
+        body += HEADING % 'Teams'
+        body += table_html(['Team', 'Points'],
+            ['<td>%s</td><td>%.2f</td>' % (escape(text_of(team)), info[0])
+             for team, info in sorted(team_info.iteritems(),
+                                      key=lambda i: (-i[1][0], i[0]))])
+
+        for heading, prefix in [('Flights', 'flight-'),
+                                ('Weight classes', 'class-'),
+                                ('Teams', 'team-')]:
+            body += HEADING % heading
+            body += '<p style="font-family:sans-serif;">%s</p>\n' % \
+                ' |\n'.join('<a href="%s">%s</a> (%d)' % (page.filename,
+                    page.title, len(page.rows))
+                    for page in pages if page.filename.startswith(prefix))
+
+        return PAGE_TEMPLATE % dict(title='Results', body=body)
+
+    # Export
+    def export(self, collection):
+        # Write the pages that changed since the last export and remove
+        # those no longer in the meet
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+
+        c = collection.columns()
+        pages = self.pages(collection)
+
+        # Rows of lifters no longer in the meet
+        for lifter_id in set(self.rows) - set(collection.map_):
+            del self.rows[lifter_id]
+
+        written, unchanged = [], []
+        manifest = {}
+
+        def update(filename, key, render):
+            manifest[filename] = key
+            if self.manifest.get(filename) == key and \
+                os.path.exists(self.path(filename)):
+                unchanged.append(filename)
+                return
+
+            html = render()
+            write_atomic(self.path(filename), html.encode('utf-8')
+                         if isinstance(html, unicode) else html)
+            written.append(filename)
+
+        for page in pages:
+            update(page.filename, self.page_key(c, page),
+                   lambda: self.render(c, page))
+
+        # The summary is small, so is keyed by its content
+        index = self.render_index(collection, pages)
+        update(INDEX, sha1(index).hexdigest(), lambda: index)
+
+        removed = sorted(set(self.manifest) - set(manifest))
+        for filename in removed:
+            try:
+                os.remove(self.path(filename))
+            except OSError:
+                pass
+
+        if written or removed or manifest != self.manifest:
+            self.manifest = manifest
+            self.write_manifest()
+
+        return Result(written, removed, unchanged)
+
+# groups
+def groups(group, *keys):
+    # Rows of each group (in order of the group code), ordered by `keys`
+    order, rank = group_order(group, *keys)
+    starts = np.flatnonzero(rank == 0)
+    return np.split(order, starts[1:]) if len(order) > 0 else []
+
+# unique
+def unique(name, used):
+    # `name`.html, numbered if already used
+    filename, i = name + '.html', 1
+    while filename in used:
+        i += 1
+        filename = '%s-%d.html' % (name, i)
+
+    used.add(filename)
+    return filename
+
+# main
+def main():
+    import argparse
+    import pickle_
+
+    parser = argparse.ArgumentParser(
+        description='Export a saved meet as a static web site')
+    parser.add_argument('meet')
+    parser.add_argument('directory')
+    args = parser.parse_args()
+
+    result = SiteExporter(args.directory).export(pickle_.load(args.meet))
+    print '%d written, %d removed, %d unchanged' % (len(result.written),
+        len(result.removed), len(result.unchanged))
+
+if __name__ == '__main__':
+    main()
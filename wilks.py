@@ -22,7 +22,9 @@ logger = getLogger('basic')
 # all
 __all__ = [
     'coefficient',
+    'coefficients',
     'points',
+    'points_array',
     'required_total',
     'required_weight'
 ]
@@ -129,10 +131,43 @@ def coefficient(g, w):
     # Return the coefficient
     return C[index]
 
+# coefficients
+def coefficients(g, w):
+    # Vectorised `coefficient` over arrays of genders and weights
+    d = wilks_dictionary()
+
+    g = np.asarray(g)
+    w = np.asarray(w, dtype=float)
+    c = np.empty(w.shape, dtype=float)
+
+    for gender in np.unique(g):
+        try:
+            W,C = d[gender]
+        except KeyError:
+            raise KeyError, 'Gender "%s" not recognised' % gender
+
+        mask = g == gender
+        w_ = w[mask]
+
+        # Closest weight is either side of the insertion point, preferring
+        # the lower on a tie (as `np.argmin` does)
+        upper = np.clip(np.searchsorted(W, w_), 1, len(W) - 1)
+        lower = upper - 1
+        use_lower = np.abs(w_ - W[lower]) <= np.abs(w_ - W[upper])
+        index = np.where(use_lower, lower, upper)
+
+        c[mask] = C[index]
+
+    return c
+
 # points
 def points(g, w, total):
     return coefficient(g, w) * total
 
+# points_array
+def points_array(g, w, total):
+    return coefficients(g, w) * total
+
 # required_total
 def required_total(g, w, points):
     return float(points) / coefficient(g, w)